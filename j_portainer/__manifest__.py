@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'Portainer Integration',
-    'version': '1.0',
+    'version': '1.3',
     'summary': 'Odoo integration with Portainer CE',
     'description': """
         Portainer Integration System
@@ -68,9 +68,16 @@
         'wizards/restore_wizard_views.xml',
         'views/portainer_backup_schedule_views.xml',
         'views/portainer_backup_history_views.xml',
+        'views/portainer_sync_run_views.xml',
         
         'views/menu_views.xml',
     ],
+    'assets': {
+        'web.assets_backend': [
+            'j_portainer/static/src/js/container_logs_field.js',
+            'j_portainer/static/src/xml/container_logs_field.xml',
+        ],
+    },
     'demo': [],
     'installable': True,
     'application': True,
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Run the sync schedule runner every minute for sub-daily schedules
+
+    The cron record is in a noupdate block, so its new interval is not
+    applied by the module update itself.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    cron = env.ref('j_portainer.ir_cron_sync_schedule_runner', raise_if_not_found=False)
+    if cron:
+        cron.write({'interval_number': 1, 'interval_type': 'minutes'})
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Convert the day-based sync schedule interval to interval number and unit"""
+    cr.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'j_portainer_sync_schedule' AND column_name = 'sync_days'
+    """)
+    if not cr.fetchone():
+        return
+
+    cr.execute("""
+        ALTER TABLE j_portainer_sync_schedule
+            ADD COLUMN IF NOT EXISTS interval_number integer,
+            ADD COLUMN IF NOT EXISTS interval_type varchar
+    """)
+    cr.execute("""
+        UPDATE j_portainer_sync_schedule
+           SET interval_number = GREATEST(COALESCE(sync_days, 1), 1),
+               interval_type = 'days'
+    """)
+    _logger.info(f"Converted the interval of {cr.rowcount} Portainer sync schedules")
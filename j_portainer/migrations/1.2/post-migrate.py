@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+SIZE_RE = re.compile(r'^(\d+\.?\d*)\s*([KMGT]?)B?$')
+MULTIPLIERS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+
+def migrate(cr, version):
+    """Convert the human-readable usage of volume mappings to byte counts
+
+    usage_size is now computed from usage_bytes; its former column is still
+    present in the database and holds values such as '4.0K' or 'Error'.
+    """
+    cr.execute("""
+        SELECT 1 FROM information_schema.columns
+         WHERE table_name = 'j_portainer_container_volume' AND column_name = 'usage_size'
+    """)
+    if not cr.fetchone():
+        return
+
+    cr.execute("""
+        SELECT id, usage_size FROM j_portainer_container_volume
+         WHERE usage_size IS NOT NULL AND size_check_state IS NULL
+    """)
+    for mapping_id, usage_size in cr.fetchall():
+        match = SIZE_RE.match(usage_size.upper().strip())
+        if match:
+            usage_bytes = int(float(match.group(1)) * MULTIPLIERS[match.group(2)])
+            cr.execute("""
+                UPDATE j_portainer_container_volume
+                   SET usage_bytes = %s, size_check_state = 'ok'
+                 WHERE id = %s
+            """, [usage_bytes, mapping_id])
+        elif usage_size in ('Error', 'N/A'):
+            cr.execute("""
+                UPDATE j_portainer_container_volume SET size_check_state = 'error' WHERE id = %s
+            """, [mapping_id])
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+# Former text columns moved to content-addressed storage, with the field now referencing the body
+MOVED_COLUMNS = [
+    ('j_portainer_customtemplate', '"fileContent"', 'file_content_id'),
+    ('j_portainer_stack', 'file_content', 'file_content_id'),
+    ('j_portainer_stack', 'content', 'content_id'),
+]
+
+
+def migrate(cr, version):
+    """Move template and stack file bodies to j_portainer.file.content
+
+    The bodies are no longer stored on the records; their former columns are
+    still present in the database. Each distinct body is stored once, keyed
+    by its SHA-256.
+    """
+    for table, column, reference in MOVED_COLUMNS:
+        cr.execute("""
+            SELECT 1 FROM information_schema.columns
+             WHERE table_name = %s AND column_name = %s
+        """, [table, column.strip('"')])
+        if not cr.fetchone():
+            continue
+
+        cr.execute(f"""
+            INSERT INTO j_portainer_file_content (checksum, content, size, create_date, write_date)
+            SELECT DISTINCT encode(sha256(convert_to({column}, 'UTF8')), 'hex'), {column},
+                   octet_length({column}), now() at time zone 'UTC', now() at time zone 'UTC'
+              FROM {table}
+             WHERE {column} IS NOT NULL AND {column} != '' AND {reference} IS NULL
+            ON CONFLICT (checksum) DO NOTHING
+        """)
+        cr.execute(f"""
+            UPDATE {table} record
+               SET {reference} = blob.id
+              FROM j_portainer_file_content blob
+             WHERE record.{reference} IS NULL AND record.{column} IS NOT NULL AND record.{column} != ''
+               AND blob.checksum = encode(sha256(convert_to(record.{column}, 'UTF8')), 'hex')
+        """)
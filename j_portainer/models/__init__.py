@@ -1,15 +1,18 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from . import portainer_sync_mixin
 from . import portainer_server
 from . import portainer_api
 from . import portainer_container
 from . import portainer_image
+from . import portainer_image_history
 from . import portainer_image_tag
 from . import portainer_volume
 from . import portainer_network
 from . import portainer_template_mixin
 from . import portainer_template
+from . import portainer_file_content
 from . import portainer_custom_template
 from . import portainer_template_category
 from . import portainer_git_credentials
@@ -26,5 +29,6 @@ from . import portainer_container_env
 from . import portainer_container_port
 from . import portainer_resource_type
 from . import portainer_sync_schedule
+from . import portainer_sync_run
 from . import portainer_backup_schedule
 from . import portainer_backup_history
\ No newline at end of file
@@ -6,6 +6,7 @@ from odoo.exceptions import UserError
 import logging
 import json
 import io
+import shlex
 import uuid
 import urllib.request
 import urllib.parse
@@ -25,6 +26,11 @@ try:
 except ImportError:
     MULTIPART_ENCODER_AVAILABLE = False
 
+from ..tools.container_exec import ExecRequest
+from ..tools.docker_logs import (
+    DEFAULT_PAGE_MAX_BYTES, READ_CHUNK_SIZE, decode_cursor, iter_log_lines, read_log_page, to_docker_time,
+)
+
 _logger = logging.getLogger(__name__)
 
 class PortainerAPI(models.AbstractModel):
@@ -40,6 +46,115 @@ class PortainerAPI(models.AbstractModel):
     _name = 'j_portainer.api'
     _description = 'Portainer API Client'
     
+    def _get_log_page_max_bytes(self):
+        """Return the maximum number of log bytes returned in one page"""
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            'j_portainer.log_page_max_bytes', str(DEFAULT_PAGE_MAX_BYTES))
+        try:
+            return max(int(value), 0)
+        except (ValueError, TypeError):
+            return DEFAULT_PAGE_MAX_BYTES
+    
+    def _get_exec_settings(self):
+        """Return the default command timeout, per-host and total concurrency of container execs"""
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        settings = []
+        for key, default in (('j_portainer.exec_timeout', 60),
+                             ('j_portainer.exec_max_per_host', 4),
+                             ('j_portainer.exec_max_workers', 16)):
+            try:
+                settings.append(max(int(get_param(key, str(default))), 1))
+            except (ValueError, TypeError):
+                settings.append(default)
+        return tuple(settings)
+    
+    def container_logs_page(self, server_id, environment_id, container_id, lines=100, direction='tail',
+                            cursor=None, since=None, until=None, stdout=True, stderr=True,
+                            timestamps=True, max_bytes=None):
+        """Read one page of container logs without loading the whole log
+        
+        The log is streamed from Docker and demultiplexed frame by frame.
+        Reading stops as soon as the page is full, and at most ``max_bytes``
+        of text are kept in memory whatever the size of the log.
+        
+        Args:
+            server_id (int): ID of the Portainer server
+            environment_id (int): ID of the environment
+            container_id (str): Container ID
+            lines (int): Number of lines of the page (0 for no limit other than the byte cap)
+            direction (str): 'tail' for the latest lines of the window, 'older' for
+                the lines before ``cursor``, 'newer' for the lines after ``cursor``
+            cursor (str, optional): Older or newer cursor of the previous page
+            since (int|str, optional): Start of the window (Unix time)
+            until (int|str, optional): End of the window (Unix time)
+            stdout (bool): Include standard output
+            stderr (bool): Include standard error
+            timestamps (bool): Prefix the returned text with the timestamp of each line
+            max_bytes (int, optional): Byte cap of the page (default: system parameter)
+            
+        Returns:
+            dict: 'text', 'lines' (list of (stream, timestamp, text)), 'older_cursor',
+                'newer_cursor' and 'truncated', or 'error'
+        """
+        server = self.env['j_portainer.server'].browse(server_id)
+        if not server:
+            return {'error': 'Server not found'}
+        if max_bytes is None:
+            max_bytes = self._get_log_page_max_bytes()
+        
+        cursor_timestamp, cursor_count = decode_cursor(cursor)
+        query_params = {
+            'stdout': 1 if stdout else 0,
+            'stderr': 1 if stderr else 0,
+            # Timestamps are always requested, they delimit the pages
+            'timestamps': 1,
+            'follow': 0,
+        }
+        if since:
+            query_params['since'] = since
+        if until:
+            query_params['until'] = until
+        
+        skip_first = skip_last = None
+        keep = 'tail'
+        page_lines = lines
+        if direction == 'newer' and cursor_timestamp:
+            # Lines at the cursor timestamp were already returned
+            query_params['since'] = to_docker_time(cursor_timestamp)
+            skip_first = (cursor_timestamp, cursor_count)
+            keep = 'head'
+        elif direction == 'older' and cursor_timestamp:
+            query_params['until'] = to_docker_time(cursor_timestamp)
+            query_params['tail'] = lines + cursor_count if lines else 'all'
+            skip_last = (cursor_timestamp, cursor_count)
+            page_lines = lines + cursor_count if lines else 0
+        else:
+            query_params['tail'] = lines if lines else 'all'
+        
+        logs_endpoint = f'/api/endpoints/{environment_id}/docker/containers/{container_id}/logs'
+        with server._stream_api_request(logs_endpoint, params=query_params,
+                                        headers={'Accept': 'application/octet-stream'}) as response:
+            if response.status_code != 200:
+                return {'error': f'Failed to get logs: {response.text}'}
+            page = read_log_page(
+                iter_log_lines(response.iter_content(chunk_size=READ_CHUNK_SIZE)),
+                max_lines=page_lines, max_bytes=max_bytes, keep=keep,
+                skip_first=skip_first, skip_last=skip_last,
+            )
+        
+        if not timestamps:
+            text = '\n'.join(line.text for line in page.lines)
+        else:
+            text = page.format()
+        return {
+            'success': True,
+            'text': text.replace('\x00', ''),
+            'lines': [tuple(line) for line in page.lines],
+            'older_cursor': page.older_cursor,
+            'newer_cursor': page.newer_cursor,
+            'truncated': page.truncated,
+        }
+    
     def container_action(self, server_id, environment_id, container_id, action, params=None):
         """Perform action on a container
         
@@ -108,33 +223,20 @@ class PortainerAPI(models.AbstractModel):
                 return {'error': f'Failed to start exec instance: {start_response.text}'}
         
         elif action == 'logs':
-            # Get container logs
-            logs_endpoint = f'/api/endpoints/{environment_id}/docker/containers/{container_id}/logs'
-            query_params = {
-                'stdout': 1,
-                'stderr': 1
-            }
-            
-            # Add optional parameters
-            if params:
-                if 'tail' in params:
-                    query_params['tail'] = params['tail']
-                if 'since' in params:
-                    query_params['since'] = params['since']
-                if 'until' in params:
-                    query_params['until'] = params['until']
-                if 'timestamps' in params:
-                    query_params['timestamps'] = 1 if params['timestamps'] else 0
-                if 'follow' in params:
-                    query_params['follow'] = 1 if params['follow'] else 0
-            
-            response = server._make_api_request(logs_endpoint, 'GET', params=query_params, 
-                                              headers={'Accept': 'text/plain'})
-            
-            if response.status_code == 200:
-                return {'success': True, 'logs': response.text}
-            else:
-                return {'error': f'Failed to get logs: {response.text}'}
+            # Get container logs, streamed and capped to one page
+            params = params or {}
+            tail = params.get('tail', 'all')
+            page = self.container_logs_page(
+                server_id, environment_id, container_id,
+                lines=0 if tail == 'all' else int(tail),
+                since=params.get('since'),
+                until=params.get('until'),
+                timestamps=params.get('timestamps', False),
+            )
+            if page.get('error'):
+                return page
+            return {'success': True, 'logs': page['text'], 'truncated': page['truncated'],
+                    'older_cursor': page['older_cursor'], 'newer_cursor': page['newer_cursor']}
         
         elif action == 'rename':
             if not params or 'name' not in params:
@@ -1176,45 +1278,81 @@ class PortainerAPI(models.AbstractModel):
         return None
         
     def _execute_single_command(self, server, environment_id, container_id, command):
-        """Execute a single command in container"""
+        """Execute a single command in container
+        
+        Returns:
+            str: Standard output and error of the command or None if it could not be run
+        """
         try:
-            # Step 1: Create exec instance in the container
-            exec_endpoint = f'/api/endpoints/{environment_id}/docker/containers/{container_id}/exec'
-            exec_data = {
-                'AttachStdout': True,
-                'AttachStderr': True,
-                'Cmd': command.split(),
-                'Tty': False
-            }
-            
-            exec_response = server._make_api_request(exec_endpoint, 'POST', data=exec_data)
-            
-            if exec_response.status_code != 201:
+            result = server._exec_many([
+                ExecRequest(0, environment_id, container_id, shlex.split(command)),
+            ])[0]
+            if result.error:
                 return None
-                
-            exec_result = exec_response.json()
-            exec_id = exec_result.get('Id')
-            
-            if not exec_id:
-                return None
-                
-            # Step 2: Start the exec instance and capture output
-            start_endpoint = f'/api/endpoints/{environment_id}/docker/exec/{exec_id}/start'
-            start_data = {
-                'Detach': False,
-                'Tty': False
-            }
-            
-            start_response = server._make_api_request(start_endpoint, 'POST', data=start_data)
-            
-            if start_response.status_code == 200:
-                return start_response.text.strip()
-            else:
-                return None
-                
+            return (result.stdout + result.stderr).strip()
         except Exception as e:
             return None
             
+    def execute_commands(self, commands, timeout=None, max_per_host=None):
+        """Run commands in many containers concurrently
+        
+        The execs of each server run in a thread pool, with at most
+        ``max_per_host`` execs at a time on the same environment. Each command
+        is waited for at most ``timeout`` seconds.
+        
+        Args:
+            commands (list): (container, command) pairs, where container is a
+                j_portainer.container record and command a string or a list of arguments
+            timeout (int, optional): Timeout in seconds of each command
+                (default: j_portainer.exec_timeout parameter, 60)
+            max_per_host (int, optional): Maximum concurrent execs per environment
+                (default: j_portainer.exec_max_per_host parameter, 4)
+            
+        Returns:
+            list: One dict per pair, in order, with the keys container, command,
+                exit_code, stdout, stderr, error, timed_out and duration_ms
+        """
+        default_timeout, default_max_per_host, max_workers = self._get_exec_settings()
+        timeout = timeout or default_timeout
+        max_per_host = max_per_host or default_max_per_host
+        
+        results = [None] * len(commands)
+        requests_by_server = {}
+        for index, (container, command) in enumerate(commands):
+            cmd = shlex.split(command) if isinstance(command, str) else list(command)
+            requests_by_server.setdefault(container.server_id, []).append(ExecRequest(
+                index, container.environment_id.environment_id, container.container_id, cmd, timeout,
+            ))
+        
+        for server, requests_list in requests_by_server.items():
+            hosts = len({request.environment_id for request in requests_list})
+            try:
+                exec_results = server._exec_many(
+                    requests_list,
+                    max_workers=min(max_per_host * hosts, max_workers),
+                    max_per_host=max_per_host,
+                )
+            except Exception as e:
+                _logger.error(f"Error running commands on server {server.name}: {str(e)}")
+                exec_results = {}
+            
+            for request in requests_list:
+                result = exec_results.get(request.key)
+                results[request.key] = {
+                    'container': commands[request.key][0],
+                    'command': request.cmd,
+                    'exit_code': result.exit_code if result else None,
+                    'stdout': result.stdout if result else '',
+                    'stderr': result.stderr if result else '',
+                    'error': result.error if result else _('Command could not be run'),
+                    'timed_out': result.timed_out if result else False,
+                    'duration_ms': result.duration_ms if result else 0,
+                }
+        
+        failed = sum(1 for result in results if result['error'] or result['exit_code'])
+        _logger.info(f"Executed {len(results)} container commands, {failed} failed")
+        return results
+    
     def _is_command_not_found_error(self, output):
         """Check if output indicates command not found"""
         if not output:
@@ -1255,55 +1393,18 @@ class PortainerAPI(models.AbstractModel):
             # Use Docker Image History API endpoint
             endpoint = f'/api/endpoints/{environment_id}/docker/images/{image_id}/history'
             
-            _logger.info(f"Fetching image history for image {image_id} in environment {environment_id}")
+            _logger.debug(f"Fetching image history for image {image_id} in environment {environment_id}")
             response = server._make_api_request(endpoint, 'GET')
             
             if response.status_code == 200:
                 history_data = response.json()
                 
-                # Log the raw response structure for debugging
-                _logger.info(f"Raw Docker API response type: {type(history_data)}")
-                _logger.debug(f"Raw Docker API response: {history_data}")
-                
                 # Validate that we received a list of layer objects
                 if not isinstance(history_data, list):
                     _logger.error(f"Expected list of layers, got {type(history_data)}: {history_data}")
                     return None
                 
-                if not history_data:
-                    _logger.warning(f"Empty layer history received for image {image_id}")
-                    return []
-                
-                # Process and clean the history data
-                processed_layers = []
-                for i, layer in enumerate(history_data):
-                    try:
-                        # Validate that each layer is a dictionary
-                        if not isinstance(layer, dict):
-                            _logger.error(f"Layer {i} is not a dict, got {type(layer)}: {layer}")
-                            continue
-                        
-                        # Extract layer information with safe access
-                        layer_info = {
-                            'command': str(layer.get('CreatedBy', '')).strip(),
-                            'size': int(layer.get('Size', 0)) if layer.get('Size') is not None else 0,
-                            'created': str(layer.get('Created', '')),
-                            'hash': str(layer.get('Id', '')),
-                            'empty_layer': int(layer.get('Size', 0)) == 0
-                        }
-                        
-                        # Clean up the command for better readability using advanced parsing
-                        command = layer_info['command']
-                        layer_info['command'] = self._clean_docker_command(command)
-                        
-                        processed_layers.append(layer_info)
-                        
-                    except Exception as e:
-                        _logger.error(f"Error processing layer {i}: {str(e)} - Layer data: {layer}")
-                        continue
-                
-                _logger.info(f"Successfully processed {len(processed_layers)} out of {len(history_data)} layers for image {image_id}")
-                return processed_layers
+                return self._process_image_history(history_data, image_id)
                 
             else:
                 _logger.error(f"Failed to get image history: {response.status_code} - {response.text}")
@@ -1313,6 +1414,52 @@ class PortainerAPI(models.AbstractModel):
             _logger.error(f"Error getting image history for {image_id}: {str(e)}")
             return None
     
+    def _process_image_history(self, history_data, image_id):
+        """
+        Convert a Docker Image History API response into layer objects
+        
+        Args:
+            history_data (list): Layers returned by the history endpoint
+            image_id (str): Docker image ID, for logging
+            
+        Returns:
+            list: Layer objects with command, size, created, hash and empty_layer keys
+        """
+        if not history_data:
+            _logger.warning(f"Empty layer history received for image {image_id}")
+            return []
+        
+        # Process and clean the history data
+        processed_layers = []
+        for i, layer in enumerate(history_data):
+            try:
+                # Validate that each layer is a dictionary
+                if not isinstance(layer, dict):
+                    _logger.error(f"Layer {i} is not a dict, got {type(layer)}: {layer}")
+                    continue
+                
+                # Extract layer information with safe access
+                layer_info = {
+                    'command': str(layer.get('CreatedBy', '')).strip(),
+                    'size': int(layer.get('Size', 0)) if layer.get('Size') is not None else 0,
+                    'created': str(layer.get('Created', '')),
+                    'hash': str(layer.get('Id', '')),
+                    'empty_layer': int(layer.get('Size', 0)) == 0
+                }
+                
+                # Clean up the command for better readability using advanced parsing
+                command = layer_info['command']
+                layer_info['command'] = self._clean_docker_command(command)
+                
+                processed_layers.append(layer_info)
+                
+            except Exception as e:
+                _logger.error(f"Error processing layer {i}: {str(e)} - Layer data: {layer}")
+                continue
+        
+        _logger.debug(f"Processed {len(processed_layers)} out of {len(history_data)} layers for image {image_id}")
+        return processed_layers
+    
     def _clean_docker_command(self, command):
         """
         Advanced Docker command cleaning to match Portainer's display exactly.
@@ -1470,14 +1617,14 @@ class PortainerAPI(models.AbstractModel):
             else:
                 raise UserError(_("Invalid build method: %s") % build_method)
             
-            # Make build request using requests directly (not _make_api_request for binary data)
-            import requests
+            # Make build request on the pooled session directly (not _make_api_request for binary data)
             url = server.url.rstrip('/') + f"/api/endpoints/{environment_id}/docker/build"
+            session = server._get_http_session()
             
             if data:
-                response = requests.post(url, headers=headers, data=data, params=params, verify=server.verify_ssl, timeout=60)
+                response = session.post(url, headers=headers, data=data, params=params, verify=server.verify_ssl, timeout=60)
             else:
-                response = requests.post(url, headers=headers, params=params, verify=server.verify_ssl, timeout=60)
+                response = session.post(url, headers=headers, params=params, verify=server.verify_ssl, timeout=60)
             
             if response.status_code in [200, 201]:
                 # Docker build API returns streaming JSON, not a single JSON object
@@ -1804,7 +1951,7 @@ class PortainerAPI(models.AbstractModel):
                         _logger.info(f"Files: {list(files.keys())}")
                         
                         # Send the multipart request
-                        response = requests.post(
+                        response = server._get_http_session().post(
                             url=url,
                             headers=req_headers,
                             data=form_data,
@@ -1,11 +1,50 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api, _
+from odoo import models, fields, api, SUPERUSER_ID, _
+from functools import partial
 import json
 import logging
+import random
 from datetime import datetime
 
+from ..tools import api_log_buffer
+
+_logger = logging.getLogger(__name__)
+
+# Number of buffered entries triggering a flush before the end of the transaction
+API_LOG_FLUSH_THRESHOLD = 200
+
+API_LOG_MODES = [
+    ('off', 'Disabled'),
+    ('errors', 'Errors Only'),
+    ('sampled', 'Errors and Sampled Successes'),
+    ('full', 'All Requests'),
+]
+
+
+def flush_api_log_buffer(registry, dbname):
+    """Write the buffered API logs of a database in a separate transaction
+
+    Args:
+        registry: Registry of the database
+        dbname (str): Database name
+
+    Returns:
+        int: Number of logs written
+    """
+    entries = api_log_buffer.drain(dbname)
+    if not entries:
+        return 0
+    try:
+        with registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            env['j_portainer.api_log'].create(entries)
+    except Exception as e:
+        _logger.warning(f"Could not write {len(entries)} buffered API logs: {str(e)}")
+        return 0
+    return len(entries)
+
 
 class PortainerApiLog(models.Model):
     _name = 'j_portainer.api_log'
@@ -40,8 +79,132 @@ class PortainerApiLog(models.Model):
     request_data = fields.Text('Request Data', help="Data sent with the request")
     response_data = fields.Text('Response Data', help="Data received in the response")
     
+    # Large bodies are stored zlib compressed instead of in the text fields
+    request_data_compressed = fields.Binary('Compressed Request Data', attachment=False)
+    response_data_compressed = fields.Binary('Compressed Response Data', attachment=False)
+    request_size = fields.Integer('Request Size (bytes)', help="Size of the request body before truncation")
+    response_size = fields.Integer('Response Size (bytes)', help="Size of the response body before truncation")
+    truncated = fields.Boolean('Truncated', help="The request or response body exceeded the maximum logged size")
+    
+    request_display = fields.Text('Request', compute='_compute_display_data')
+    response_display = fields.Text('Response', compute='_compute_display_data')
+    
     # Operation type field has been removed as requested
     
+    def _compute_display_data(self):
+        """Decompress and pretty-print the logged bodies"""
+        for log in self:
+            log.request_display = self._format_body(
+                api_log_buffer.unpack_body(log.request_data, log.request_data_compressed))
+            log.response_display = self._format_body(
+                api_log_buffer.unpack_body(log.response_data, log.response_data_compressed))
+    
+    @api.model
+    def _format_body(self, text):
+        """Pretty-print a JSON body, returning other bodies unchanged"""
+        if not text:
+            return False
+        try:
+            return json.dumps(json.loads(text), indent=2)
+        except ValueError:
+            return text
+    
+    @api.model
+    def _get_log_settings(self):
+        """Read the API logging settings from the system parameters
+        
+        Returns:
+            dict: mode, sample_rate, max_body_size and compress_threshold
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        mode = ICP.get_param('j_portainer.api_log_mode', 'full')
+        if mode not in dict(API_LOG_MODES):
+            mode = 'full'
+        try:
+            sample_rate = min(max(float(ICP.get_param('j_portainer.api_log_sample_rate', '0.1')), 0.0), 1.0)
+        except (ValueError, TypeError):
+            sample_rate = 0.1
+        try:
+            max_body_size = max(int(ICP.get_param('j_portainer.api_log_max_body_size', '65536')), 0)
+        except (ValueError, TypeError):
+            max_body_size = 65536
+        try:
+            compress_threshold = max(int(ICP.get_param('j_portainer.api_log_compress_threshold', '4096')), 0)
+        except (ValueError, TypeError):
+            compress_threshold = 4096
+        return {
+            'mode': mode,
+            'sample_rate': sample_rate,
+            'max_body_size': max_body_size,
+            'compress_threshold': compress_threshold,
+        }
+    
+    @api.model
+    def _should_log(self, status_code):
+        """Check whether a request with the given status code must be logged
+        
+        Failed requests are logged in every mode except 'off'. Successful
+        requests are logged in 'full' mode and, in 'sampled' mode, with the
+        configured probability.
+        
+        Args:
+            status_code (int): HTTP status code, 0 when no response was received
+            
+        Returns:
+            bool: True if the request must be logged
+        """
+        settings = self._get_log_settings()
+        mode = settings['mode']
+        if mode == 'off':
+            return False
+        if not status_code or status_code >= 300 or mode == 'full':
+            return True
+        if mode == 'sampled':
+            return random.random() < settings['sample_rate']
+        return False
+    
+    @api.model
+    def _log_request(self, vals, request_body=None, response_body=None):
+        """Queue an API log entry for asynchronous, batched writing
+        
+        Callers are expected to check ``_should_log`` first so that bodies
+        are only serialized for requests actually logged. Bodies are capped
+        to the maximum logged size and compressed when large. Entries are
+        written in a separate transaction when the current one ends, whether
+        it is committed or rolled back, or as soon as enough entries are
+        buffered.
+        
+        Args:
+            vals (dict): Log values (server_id, endpoint, method, status_code, ...)
+            request_body (str, optional): Serialized request
+            response_body (str, optional): Raw response body
+        """
+        settings = self._get_log_settings()
+        max_size = settings['max_body_size']
+        threshold = settings['compress_threshold']
+        
+        vals = dict(vals)
+        plain, compressed, size, request_truncated = api_log_buffer.pack_body(request_body, max_size, threshold)
+        vals.update(request_data=plain, request_data_compressed=compressed, request_size=size)
+        plain, compressed, size, response_truncated = api_log_buffer.pack_body(response_body, max_size, threshold)
+        vals.update(response_data=plain, response_data_compressed=compressed, response_size=size)
+        vals['truncated'] = request_truncated or response_truncated
+        if vals.get('error_message') and max_size and len(vals['error_message']) > max_size:
+            vals['error_message'] = vals['error_message'][:max_size] + api_log_buffer.TRUNCATED_MARKER
+        
+        cr = self.env.cr
+        dbname = cr.dbname
+        count = api_log_buffer.append(dbname, vals)
+        
+        if count >= API_LOG_FLUSH_THRESHOLD:
+            flush_api_log_buffer(self.env.registry, dbname)
+        elif not cr.postcommit.data.get('j_portainer_api_log_flush'):
+            # Flush once the transaction ends, whatever its outcome
+            cr.postcommit.data['j_portainer_api_log_flush'] = True
+            flush = partial(flush_api_log_buffer, self.env.registry, dbname)
+            cr.postcommit.add(flush)
+            cr.postrollback.add(flush)
+    
     @api.depends('status_code')
     def _compute_status(self):
         """Compute the status based on the HTTP status code"""
@@ -113,7 +276,6 @@ class PortainerApiLog(models.Model):
             old_logs.unlink()
             
         # Log the purge operation
-        _logger = logging.getLogger(__name__)
         _logger.info(f"Purged {count} API logs older than {days} days")
             
         return count
\ No newline at end of file
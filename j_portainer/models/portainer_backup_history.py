@@ -4,6 +4,10 @@
 from odoo import models, fields, api, _
 from datetime import datetime
 import logging
+import os
+import tempfile
+
+from ..tools.backup_stream import BACKUP_CHUNK_SIZE, COMPRESSIONS, COMPRESSION_FORMATS, write_backup_stream
 
 _logger = logging.getLogger(__name__)
 
@@ -20,6 +24,9 @@ class PortainerBackupHistory(models.Model):
     backup_file = fields.Many2one('ir.attachment', string='Backup File',
                                  help="The backup archive file")
     file_size = fields.Integer('File Size (Bytes)', help="Backup file size in bytes")
+    stored_size = fields.Integer('Stored Size (Bytes)', help="Size of the stored file, after compression")
+    compression = fields.Selection(COMPRESSIONS, string='Compression', default='none')
+    checksum_sha256 = fields.Char('SHA-256', readonly=True, help="SHA-256 checksum of the stored backup file")
     file_size_mb = fields.Float('File Size (MB)', compute='_compute_file_size_mb', store=True)
     status = fields.Selection([
         ('in_progress', 'In Progress'),
@@ -116,6 +123,75 @@ class PortainerBackupHistory(models.Model):
         }
         return status_colors.get(self.status, 'secondary')
     
+    @api.model
+    def _store_backup_stream(self, response, filename, compression='none', res_model=None, res_id=None,
+                             description=None):
+        """Store a streamed backup download as an attachment
+        
+        The response is read chunk by chunk and written straight to a file in
+        the filestore, compressed on the fly, while its size and checksums are
+        computed. The archive is never fully loaded in memory, except when
+        attachments are stored in the database.
+        
+        Args:
+            response (requests.Response): Streamed backup response
+            filename (str): Name of the archive, without compression extension
+            compression (str): 'none', 'gzip' or 'zstd'
+            res_model (str, optional): Model the attachment is linked to
+            res_id (int, optional): Record the attachment is linked to
+            description (str, optional): Attachment description
+            
+        Returns:
+            tuple: (ir.attachment record, BackupStreamResult)
+        """
+        Attachment = self.env['ir.attachment'].sudo()
+        extension, mimetype = COMPRESSION_FORMATS.get(compression, COMPRESSION_FORMATS['none'])
+        vals = {
+            'name': filename + extension,
+            'type': 'binary',
+            'res_model': res_model,
+            'res_id': res_id,
+            'mimetype': mimetype,
+            'description': description,
+        }
+        chunks = response.iter_content(chunk_size=BACKUP_CHUNK_SIZE)
+        
+        if Attachment._storage() != 'file':
+            # Database storage needs the content in memory
+            with tempfile.TemporaryFile() as tmp:
+                result = write_backup_stream(chunks, tmp, compression)
+                tmp.seek(0)
+                vals['raw'] = tmp.read()
+            return Attachment.create(vals), result
+        
+        # Write to a temporary file of the filestore, then move it in place
+        filestore = Attachment._filestore()
+        os.makedirs(filestore, exist_ok=True)
+        tmp = tempfile.NamedTemporaryFile(dir=filestore, prefix='.portainer_backup_', delete=False)
+        try:
+            with tmp:
+                result = write_backup_stream(chunks, tmp, compression)
+            fname = f"{result.sha1[:2]}/{result.sha1}"
+            full_path = Attachment._full_path(fname)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            if os.path.exists(full_path):
+                os.unlink(tmp.name)
+            else:
+                os.replace(tmp.name, full_path)
+        except Exception:
+            if os.path.exists(tmp.name):
+                os.unlink(tmp.name)
+            raise
+        
+        # Collected by the filestore garbage collector if the transaction fails
+        Attachment._mark_for_gc(fname)
+        vals.update({
+            'store_fname': fname,
+            'checksum': result.sha1,
+            'file_size': result.stored_size,
+        })
+        return Attachment.create(vals), result
+    
     @api.model
     def cleanup_old_backups(self, server_id, keep_count=10):
         """Clean up old backup files, keeping only the most recent ones
@@ -125,22 +201,17 @@ class PortainerBackupHistory(models.Model):
             keep_count (int): Number of recent backups to keep
         """
         try:
-            # Get all successful backups for this server, ordered by date desc
-            backups = self.search([
+            # Only the IDs of the backups beyond the retention count are loaded
+            old_backups = self.search([
                 ('server_id', '=', server_id),
                 ('status', '=', 'success')
-            ], order='backup_date desc')
-            
-            # Keep only the most recent backups
-            old_backups = backups[keep_count:]
+            ], order='backup_date desc', offset=keep_count)
             
             if old_backups:
                 _logger.info(f"Cleaning up {len(old_backups)} old backup files for server ID {server_id}")
                 
-                # Delete associated files first
-                for backup in old_backups:
-                    if backup.backup_file:
-                        backup.backup_file.unlink()
+                # Delete associated files with a single unlink, without reading their content
+                old_backups.mapped('backup_file').sudo().unlink()
                 
                 # Delete backup history records
                 old_backups.unlink()
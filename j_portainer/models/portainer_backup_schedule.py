@@ -6,6 +6,8 @@ from odoo.exceptions import UserError
 from datetime import datetime, timedelta
 import logging
 
+from ..tools.backup_stream import COMPRESSIONS, compression_available
+
 _logger = logging.getLogger(__name__)
 
 class PortainerBackupSchedule(models.Model):
@@ -20,6 +22,11 @@ class PortainerBackupSchedule(models.Model):
                                   help="Interval in days between automated backups")
     active = fields.Boolean('Enable Automated Backups', default=True,
                            help="Enable or disable automated backup scheduling")
+    compression = fields.Selection(COMPRESSIONS, string='Compression', default='none', required=True,
+                                   help="Compress backup archives while they are stored. Zstandard requires "
+                                        "the zstandard Python package")
+    retention_count = fields.Integer('Backups to Keep', default=10, required=True,
+                                     help="Number of most recent successful backups kept for the server")
     last_backup = fields.Datetime('Last Backup', readonly=True,
                                  help="Date and time of the last successful backup")
     next_backup = fields.Datetime('Next Backup', compute='_compute_next_backup', store=True,
@@ -109,42 +116,44 @@ class PortainerBackupSchedule(models.Model):
                 'manual_backup': False,
             })
             
+            if not compression_available(self.compression):
+                raise UserError(_("The zstandard Python package is required for Zstandard compression."))
+            
             # Prepare backup payload
             backup_payload = {
                 'password': self.backup_password
             }
             
-            # Make API request to create backup
-            response = self.server_id._make_api_request(
-                '/api/backup',
-                method='POST',
-                data=backup_payload
-            )
+            # Stream the backup archive straight to the filestore
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"portainer_backup_{self.server_id.name}_{timestamp}_scheduled.tar"
+            with self.server_id._stream_api_request('/api/backup', method='POST', data=backup_payload,
+                                                    timeout=300) as response:
+                if response.status_code == 200:
+                    attachment, result = backup_history._store_backup_stream(
+                        response, filename,
+                        compression=self.compression,
+                        res_model='j_portainer.backup.history',
+                        res_id=backup_history.id,
+                        description=f'Scheduled backup created on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}',
+                    )
+                else:
+                    attachment = result = None
+                    error_msg = f"HTTP {response.status_code}"
+                    try:
+                        error_detail = response.json().get('message', response.text)
+                        error_msg += f": {error_detail}"
+                    except:
+                        error_msg += f": {response.text}"
             
-            if response.status_code == 200:
-                # Get backup content
-                backup_content = response.content
-                
-                # Generate filename with timestamp
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"portainer_backup_{self.server_id.name}_{timestamp}_scheduled.tar"
-                
-                # Create attachment
-                attachment = self.env['ir.attachment'].create({
-                    'name': filename,
-                    'type': 'binary',
-                    'datas': backup_content,
-                    'res_model': 'j_portainer.backup.history',
-                    'res_id': backup_history.id,
-                    'mimetype': 'application/x-tar',
-                    'description': f'Scheduled backup created on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
-                })
-                
+            if attachment:
                 # Update backup history with success
                 backup_history.write({
                     'backup_file': attachment.id,
-                    'file_size': len(backup_content),
-                    'file_size_mb': len(backup_content) / (1024 * 1024),
+                    'file_size': result.size,
+                    'stored_size': result.stored_size,
+                    'compression': self.compression,
+                    'checksum_sha256': result.sha256,
                     'status': 'success',
                 })
                 
@@ -153,17 +162,11 @@ class PortainerBackupSchedule(models.Model):
                     'last_backup': datetime.now()
                 })
                 
-                _logger.info(f"Scheduled backup completed successfully: {filename} (Size: {len(backup_content)} bytes)")
+                _logger.info(f"Scheduled backup completed successfully: {attachment.name} "
+                             f"(Size: {result.size} bytes, stored: {result.stored_size} bytes)")
                 return True
                 
             else:
-                error_msg = f"HTTP {response.status_code}"
-                try:
-                    error_detail = response.json().get('message', response.text)
-                    error_msg += f": {error_detail}"
-                except:
-                    error_msg += f": {response.text}"
-                
                 backup_history.write({
                     'status': 'failed',
                     'error_message': error_msg,
@@ -6,12 +6,16 @@ from odoo.exceptions import UserError
 import json
 import logging
 
+from ..tools.payload_digest import payload_digest
+
 _logger = logging.getLogger(__name__)
 
 class PortainerContainer(models.Model):
     _name = 'j_portainer.container'
     _description = 'Portainer Container'
     _order = 'name'
+    _inherit = ['j_portainer.sync.mixin']
+    _sync_key_fields = ('environment_id', 'container_id')
     
     @api.model_create_multi
     def create(self, vals_list):
@@ -237,6 +241,8 @@ class PortainerContainer(models.Model):
     has_pending_changes = fields.Boolean('Has Pending Changes', default=False)
     pending_changes_message = fields.Text('Pending Changes Message', compute='_compute_pending_changes_message')
     original_config = fields.Text('Original Configuration', help="JSON of original configuration for change tracking")
+    sync_section_digests = fields.Text('Sync Section Digests', copy=False, readonly=True,
+                                       help="JSON digests of the child collections of the last synced inspect payload")
     
     server_id = fields.Many2one('j_portainer.server', string='Server', required=True, default=lambda self: self._default_server_id())
     environment_id = fields.Many2one('j_portainer.environment', string='Environment', required=True, 
@@ -1403,6 +1409,7 @@ class PortainerContainer(models.Model):
             self._smart_sync_networks(details)
             self._smart_sync_env_vars(details)
             self._smart_sync_labels(details)
+            self._auto_check_volume_sizes()
             
             # Return success notification
             return {
@@ -1419,6 +1426,47 @@ class PortainerContainer(models.Model):
             _logger.error(f"Error refreshing container {self.name}: {str(e)}")
             raise UserError(_("Error refreshing container: %s") % str(e))
 
+    def _get_sync_sections(self, portainer_data):
+        """Split a container inspect payload into the sections mirrored by child records
+
+        Returns:
+            list: (smart sync method name, section payload) tuples in sync order
+        """
+        host_config = portainer_data.get('HostConfig') or {}
+        config = portainer_data.get('Config') or {}
+        return [
+            ('_smart_sync_labels', config.get('Labels')),
+            ('_smart_sync_volumes', portainer_data.get('Mounts')),
+            ('_smart_sync_networks', (portainer_data.get('NetworkSettings') or {}).get('Networks')),
+            ('_smart_sync_env_vars', config.get('Env')),
+            ('_smart_sync_ports', [host_config.get('PortBindings'), config.get('ExposedPorts')]),
+        ]
+
+    def _smart_sync_changed_sections(self, portainer_data):
+        """Run the smart sync of each child collection whose section changed since the last sync
+
+        A section digest is only stored once its smart sync succeeded, so a
+        failed section is synced again on the next run.
+        """
+        self.ensure_one()
+        try:
+            stored_digests = json.loads(self.sync_section_digests or '{}')
+        except ValueError:
+            stored_digests = {}
+
+        digests = dict(stored_digests)
+        for method_name, section in self._get_sync_sections(portainer_data):
+            digest = payload_digest(section)
+            if stored_digests.get(method_name) == digest:
+                continue
+            if getattr(self, method_name)(portainer_data):
+                digests[method_name] = digest
+
+        if digests != stored_digests:
+            self.with_context(sync_from_portainer=True).write({
+                'sync_section_digests': json.dumps(digests, sort_keys=True),
+            })
+
     def _smart_sync_ports(self, portainer_data):
         """Smart sync port mappings - only modify changed records"""
         try:
@@ -1515,9 +1563,12 @@ class PortainerContainer(models.Model):
             for port_data in ports_to_create:
                 port_data['container_id'] = self.id
                 self.env['j_portainer.container.port'].with_context(sync_from_portainer=True).create(port_data)
-                
+
+            return True
+
         except Exception as e:
             _logger.warning(f"Error syncing ports for container {self.name}: {str(e)}")
+            return False
 
     def _smart_sync_volumes(self, portainer_data):
         """Smart sync volume mappings - only modify changed records"""
@@ -1616,13 +1667,12 @@ class PortainerContainer(models.Model):
             for volume_data in volumes_to_create:
                 volume_data['container_id'] = self.id
                 self.env['j_portainer.container.volume'].with_context(sync_from_portainer=True).create(volume_data)
-            
-            # Automatically check volume sizes for running containers
-            if self.state == 'running':
-                self._auto_check_volume_sizes()
-                
+
+            return True
+
         except Exception as e:
             _logger.warning(f"Error syncing volumes for container {self.name}: {str(e)}")
+            return False
 
     def _smart_sync_networks(self, portainer_data):
         """Smart sync network connections - only modify changed records"""
@@ -1680,9 +1730,12 @@ class PortainerContainer(models.Model):
             for network_data in networks_to_create:
                 network_data['container_id'] = self.id
                 self.env['j_portainer.container.network'].with_context(sync_from_portainer=True).create(network_data)
-                
+
+            return True
+
         except Exception as e:
             _logger.warning(f"Error syncing networks for container {self.name}: {str(e)}")
+            return False
 
     def _smart_sync_env_vars(self, portainer_data):
         """Smart sync environment variables - only modify changed records"""
@@ -1748,9 +1801,12 @@ class PortainerContainer(models.Model):
             for env_var_data in env_vars_to_create:
                 env_var_data['container_id'] = self.id
                 self.env['j_portainer.container.env'].with_context(sync_from_portainer=True).create(env_var_data)
-                
+
+            return True
+
         except Exception as e:
             _logger.warning(f"Error syncing environment variables for container {self.name}: {str(e)}")
+            return False
 
     def _smart_sync_labels(self, portainer_data):
         """Smart sync labels - only modify changed records"""
@@ -1809,9 +1865,12 @@ class PortainerContainer(models.Model):
             for label_data in labels_to_create:
                 label_data['container_id'] = self.id
                 self.env['j_portainer.container.label'].with_context(sync_from_portainer=True).create(label_data)
-                
+
+            return True
+
         except Exception as e:
             _logger.warning(f"Error syncing labels for container {self.name}: {str(e)}")
+            return False
     
     def action_view_logs(self):
         """View container logs"""
@@ -2381,65 +2440,14 @@ class PortainerContainer(models.Model):
             }
     
     def _auto_check_volume_sizes(self):
-        """Automatically check volume sizes for running containers during sync"""
-        self.ensure_one()
-        
-        if self.state != 'running':
-            return
+        """Automatically check volume sizes of running containers during sync
         
+        Only the volumes whose check interval has elapsed are measured, with one
+        exec per container covering all of its due mount points.
+        """
         try:
-            # Get all volume mappings for this container
-            volume_mappings = self.volume_ids.filtered(lambda v: v.type == 'volume')
-            
-            for volume_mapping in volume_mappings:
-                try:
-                    # Skip if volume size was checked recently (within last hour)
-                    if volume_mapping.last_size_check:
-                        from datetime import datetime, timedelta
-                        now = fields.Datetime.now()
-                        one_hour_ago = now - timedelta(hours=1)
-                        if volume_mapping.last_size_check > one_hour_ago:
-                            continue
-                    
-                    # Check volume size using du command
-                    du_command = f"du -sh {volume_mapping.container_path}"
-                    
-                    # Get API client and execute command
-                    api = self.env['j_portainer.api']
-                    raw_result = api.execute_container_command(
-                        self.server_id.id,
-                        self.container_id,
-                        self.environment_id.environment_id,
-                        du_command
-                    )
-                    
-                    if raw_result:
-                        # Clean the output by removing non-printable characters
-                        import re
-                        cleaned_result = re.sub(r'[^\x20-\x7E\t]', '', raw_result).strip()
-                        
-                        # Update size check timestamp and details
-                        update_vals = {
-                            'size_description': cleaned_result or 'Empty output after cleaning',
-                            'last_size_check': fields.Datetime.now()
-                        }
-                        
-                        # Check if this looks like an error message
-                        if volume_mapping._is_error_message(cleaned_result):
-                            update_vals['usage_size'] = 'Error'
-                        else:
-                            # Try to extract size from successful output
-                            size_parts = cleaned_result.split()
-                            if size_parts:
-                                size_value = size_parts[0]
-                                update_vals['usage_size'] = size_value
-                        
-                        # Update the volume mapping record
-                        volume_mapping.with_context(sync_from_portainer=True).write(update_vals)
-                        
-                except Exception as e:
-                    _logger.warning(f"Failed to check size for volume {volume_mapping.name} in container {self.name}: {str(e)}")
-                    continue
-                    
+            volume_mappings = self.filtered(lambda c: c.state == 'running').volume_ids.filtered(
+                lambda v: v.type == 'volume')
+            volume_mappings._filter_size_check_due()._check_sizes()
         except Exception as e:
-            _logger.warning(f"Error during automatic volume size check for container {self.name}: {str(e)}")
\ No newline at end of file
+            _logger.warning(f"Error during automatic volume size check for containers {self.mapped('name')}: {str(e)}")
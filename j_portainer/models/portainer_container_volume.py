@@ -2,8 +2,13 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
+from collections import defaultdict
+from datetime import timedelta
 import logging
 
+from ..tools.container_exec import ExecRequest
+from ..tools.volume_usage import DEFAULT_SIZE_CHECK_INTERVAL, build_usage_command, format_size, parse_usage_output
+
 _logger = logging.getLogger(__name__)
 
 class PortainerContainerVolume(models.Model):
@@ -57,8 +62,15 @@ class PortainerContainerVolume(models.Model):
     driver = fields.Char('Driver', help="Driver used for this volume")
     
     # Volume size tracking fields
-    usage_size = fields.Char('Volume Usage Size', readonly=True, 
-                            help="Clean volume size (e.g., '40M', '1.2G') or status ('Error', 'N/A')")
+    usage_bytes = fields.Float('Volume Usage (Bytes)', digits=(20, 0), readonly=True,
+                               help="Disk usage of the mount point in bytes")
+    size_check_state = fields.Selection([
+        ('ok', 'Measured'),
+        ('error', 'Error'),
+    ], string='Size Check Status', readonly=True,
+        help="Result of the last size check, the usage is only meaningful when measured")
+    usage_size = fields.Char('Volume Usage Size', compute='_compute_usage_size',
+                            help="Clean volume size (e.g., '40M', '1.2G') or status ('Error')")
     size_description = fields.Text('Size Check Details', readonly=True,
                                   help="Complete output from size check command including any error messages")
     last_size_check = fields.Datetime('Last Size Check', readonly=True,
@@ -66,6 +78,55 @@ class PortainerContainerVolume(models.Model):
     
     display_name = fields.Char('Display Name', compute='_compute_display_name')
     
+    @api.depends('usage_bytes', 'size_check_state')
+    def _compute_usage_size(self):
+        """Format the measured usage for display"""
+        for volume in self:
+            if volume.size_check_state == 'ok':
+                volume.usage_size = format_size(int(volume.usage_bytes))
+            elif volume.size_check_state == 'error':
+                volume.usage_size = 'Error'
+            else:
+                volume.usage_size = ''
+    
+    @api.model
+    def _get_usage_totals(self, group_by, ids):
+        """Return the volume count and measured usage of stacks or environments
+        
+        Each volume is counted once per group, whatever the number of
+        containers mounting it. Volumes without a successful size check are
+        counted but add nothing to the usage.
+        
+        Args:
+            group_by (str): 'stack' or 'environment'
+            ids (list): IDs of the stacks or environments
+            
+        Returns:
+            dict: (volume count, usage in bytes) per stack or environment ID
+        """
+        ids = [record_id for record_id in ids if isinstance(record_id, int)]
+        if not ids:
+            return {}
+        
+        self.flush_model(['container_id', 'environment_id', 'type', 'volume_id', 'usage_bytes', 'size_check_state'])
+        self.env['j_portainer.container'].flush_model(['stack_id'])
+        group_column = 'c.stack_id' if group_by == 'stack' else 'm.environment_id'
+        self.env.cr.execute(f"""
+            SELECT group_id, COUNT(*), COALESCE(SUM(usage_bytes), 0)
+              FROM (
+                    SELECT {group_column} AS group_id, m.volume_id,
+                           MAX(m.usage_bytes) FILTER (WHERE m.size_check_state = 'ok') AS usage_bytes
+                      FROM j_portainer_container_volume m
+                      JOIN j_portainer_container c ON c.id = m.container_id
+                     WHERE m.type = 'volume'
+                       AND m.volume_id IS NOT NULL
+                       AND {group_column} IN %s
+                  GROUP BY {group_column}, m.volume_id
+                   ) per_volume
+          GROUP BY group_id
+        """, [tuple(ids)])
+        return {group_id: (count, int(usage)) for group_id, count, usage in self.env.cr.fetchall()}
+    
     @api.depends('type', 'name', 'container_path')
     def _compute_display_name(self):
         """Compute display name for volume mappings"""
@@ -79,7 +140,7 @@ class PortainerContainerVolume(models.Model):
                 
     def action_check_volume_size(self):
         """
-        Check volume usage size by executing 'du -sh' command inside the container
+        Check volume usage size by executing 'du' inside the container
         This method requires the container to be running and have 'du' command available
         """
         self.ensure_one()
@@ -97,100 +158,15 @@ class PortainerContainerVolume(models.Model):
                 }
             }
         
-        # Prepare the du command to check volume size
-        du_command = f"du -sh {self.container_path}"
-        
         try:
-            # Get API client and execute command inside container
-            api = self.env['j_portainer.api']
-            raw_result = api.execute_container_command(
-                self.container_id.server_id.id,
-                self.container_id.container_id,
-                self.container_id.environment_id.environment_id,
-                du_command
-            )
-            
-            if raw_result:
-                # Clean the output by removing all non-printable characters
-                # Docker exec API often returns control characters, escape sequences, and binary data
-                import re
-                cleaned_result = re.sub(r'[^\x20-\x7E\t]', '', raw_result).strip()
-                
-                # Store the cleaned result for debugging (no NUL characters)
-                self.write({
-                    'size_description': cleaned_result or 'Empty output after cleaning',
-                    'last_size_check': fields.Datetime.now()
-                })
-                
-                # Check if this looks like an error message
-                if self._is_error_message(cleaned_result):
-                    # Store error status in usage_size field
-                    self.write({'usage_size': 'Error'})
-                    
-                    return {
-                        'type': 'ir.actions.client',
-                        'tag': 'display_notification',
-                        'params': {
-                            'title': _('Command Failed'),
-                            'message': _('Size check failed. Check Size Details field for full error message.'),
-                            'sticky': False,
-                            'type': 'warning',
-                        }
-                    }
-                else:
-                    # Try to extract size from successful output
-                    size_parts = cleaned_result.split()
-                    if size_parts:
-                        size_value = size_parts[0]
-                        self.write({'usage_size': size_value})
-                        
-                        return {
-                            'type': 'ir.actions.client',
-                            'tag': 'display_notification',
-                            'params': {
-                                'title': _('Volume Size Updated'),
-                                'message': _('Volume usage: %s') % size_value,
-                                'sticky': False,
-                                'type': 'success',
-                            }
-                        }
-                    else:
-                        self.write({'usage_size': 'N/A'})
-                        return {
-                            'type': 'ir.actions.client',
-                            'tag': 'display_notification',
-                            'params': {
-                                'title': _('Unexpected Output'),
-                                'message': _('Could not parse size from command output. Check Size Details field.'),
-                                'sticky': False,
-                                'type': 'warning',
-                            }
-                        }
-            else:
-                # No output received
-                self.write({
-                    'usage_size': 'N/A',
-                    'size_description': 'No output received from command',
-                    'last_size_check': fields.Datetime.now()
-                })
-                return {
-                    'type': 'ir.actions.client',
-                    'tag': 'display_notification',
-                    'params': {
-                        'title': _('No Output'),
-                        'message': _('No output received from du command'),
-                        'sticky': False,
-                        'type': 'warning',
-                    }
-                }
-                
+            self._check_sizes()
         except Exception as e:
             error_msg = str(e)
             _logger.error(f"Error checking volume size for {self.container_path}: {error_msg}")
             
             # Store error details
             self.write({
-                'usage_size': 'Error',
+                'size_check_state': 'error',
                 'size_description': f'Exception occurred: {error_msg}',
                 'last_size_check': fields.Datetime.now()
             })
@@ -205,6 +181,91 @@ class PortainerContainerVolume(models.Model):
                     'type': 'danger',
                 }
             }
+        
+        if self.size_check_state == 'error':
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': _('Command Failed'),
+                    'message': _('Size check failed. Check Size Details field for full error message.'),
+                    'sticky': False,
+                    'type': 'warning',
+                }
+            }
+        
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Volume Size Updated'),
+                'message': _('Volume usage: %s') % self.usage_size,
+                'sticky': False,
+                'type': 'success',
+            }
+        }
+    
+    def _filter_size_check_due(self):
+        """Return the mappings whose last size check is older than the check interval of their volume
+        
+        A volume with an interval of 0 is never checked automatically.
+        """
+        now = fields.Datetime.now()
+        
+        def is_due(mapping):
+            interval = mapping.volume_id.size_check_interval if mapping.volume_id else DEFAULT_SIZE_CHECK_INTERVAL
+            if not interval:
+                return False
+            return not mapping.last_size_check or mapping.last_size_check <= now - timedelta(minutes=interval)
+        
+        return self.filtered(is_due)
+    
+    def _check_sizes(self):
+        """Measure the disk usage of the mappings of running containers
+        
+        All mount points of a container are measured by a single exec, and
+        the containers of each server are probed concurrently.
+        """
+        now = fields.Datetime.now()
+        mappings = self.filtered(lambda m: m.container_id.state == 'running' and m.container_path)
+        
+        for server in mappings.server_id:
+            mappings_by_container = defaultdict(lambda: self.browse())
+            for mapping in mappings.filtered(lambda m: m.server_id == server):
+                mappings_by_container[mapping.container_id] |= mapping
+            
+            results = server._exec_many([
+                ExecRequest(
+                    container.id,
+                    container.environment_id.environment_id,
+                    container.container_id,
+                    build_usage_command(sorted(set(container_mappings.mapped('container_path')))),
+                ) for container, container_mappings in mappings_by_container.items()
+            ])
+            
+            for container, container_mappings in mappings_by_container.items():
+                result = results.get(container.id)
+                sizes = None if result.error else parse_usage_output(result.stdout)
+                if sizes is None:
+                    _logger.warning(f"Failed to check volume sizes in container {container.name}: "
+                                    f"{result.error or result.stderr.strip() or result.stdout.strip()}")
+                
+                for mapping in container_mappings:
+                    size = sizes.get(mapping.container_path) if sizes else None
+                    if size is None:
+                        vals = {
+                            'size_check_state': 'error',
+                            'size_description': (result.error or result.stderr.strip()
+                                                 or 'The du command is not available in this container'),
+                        }
+                    else:
+                        vals = {
+                            'size_check_state': 'ok',
+                            'usage_bytes': size,
+                            'size_description': f"{size} bytes used by {mapping.container_path}",
+                        }
+                    vals['last_size_check'] = now
+                    mapping.with_context(sync_from_portainer=True).write(vals)
     
     def _is_error_message(self, text):
         """
@@ -12,7 +12,8 @@ class PortainerCustomTemplate(models.Model):
     _name = 'j_portainer.customtemplate'
     _description = 'Portainer Custom Template'
     _order = 'title'
-    _inherit = ['j_portainer.template.mixin']
+    _inherit = ['j_portainer.template.mixin', 'j_portainer.sync.mixin']
+    _sync_key_fields = ('template_id',)
     _copy_default_excluded_fields = [
         'template_id', 
         'fileContent',
@@ -78,7 +79,11 @@ class PortainerCustomTemplate(models.Model):
     git_credential_name = fields.Char('Credential Name')
     
     # Editor method fields
-    fileContent = fields.Text('File Content', help="Content of the template file (Docker Compose or Stack file)")
+    file_content_id = fields.Many2one('j_portainer.file.content', string='Stored File Content', index=True,
+                                      readonly=True, copy=False)
+    file_content_hash = fields.Char('File Content Hash', related='file_content_id.checksum')
+    fileContent = fields.Text('File Content', compute='_compute_file_content', inverse='_inverse_file_content',
+                              help="Content of the template file (Docker Compose or Stack file)")
     
     # File upload method fields
     upload_file = fields.Binary('Upload File', help="File to upload for template creation")
@@ -86,8 +91,7 @@ class PortainerCustomTemplate(models.Model):
     compose_file = fields.Text('Compose File', 
                               help="Docker Compose file content when using the editor build method (deprecated, use fileContent)",
                               compute='_compute_compose_file',
-                              inverse='_inverse_compose_file',
-                              store=True)
+                              inverse='_inverse_compose_file')
     
     # Additional Info
     app_template_variables = fields.Text('App Template Variables', help="Variables for app template deployments")
@@ -200,6 +204,21 @@ class PortainerCustomTemplate(models.Model):
     # The formatting functions for environment variables, volumes, and
     # categories are now inherited from j_portainer.template.mixin
     
+    @api.depends('file_content_id')
+    def _compute_file_content(self):
+        """Read the template file from its content-addressed storage"""
+        for template in self:
+            template.fileContent = template.file_content_id.content or False
+    
+    def _inverse_file_content(self):
+        """Store the template file once per distinct content"""
+        contents = self.env['j_portainer.file.content']._store_many(self.mapped('fileContent'))
+        for template in self:
+            file_content = contents.get(template.fileContent) or self.env['j_portainer.file.content']
+            if template.file_content_id != file_content:
+                # The caller's write already takes care of Portainer
+                template.with_context(skip_portainer_update=True).file_content_id = file_content
+    
     @api.depends('fileContent')
     def _compute_compose_file(self):
         """Copy content from fileContent to compose_file field for backward compatibility"""
@@ -661,7 +680,7 @@ class PortainerCustomTemplate(models.Model):
             _logger.info(f"Template data: {data}")
             
             # Make the request with SSL verification as configured in server
-            response = requests.post(
+            response = server._get_http_session().post(
                 url, 
                 headers=headers,
                 data=data,
@@ -961,7 +980,7 @@ class PortainerCustomTemplate(models.Model):
                                     break
                         
                         # Send the POST request with SSL verification as configured in server
-                        res = requests.post(url, headers=headers, data=data, files=files, verify=server_info.verify_ssl)
+                        res = server_info._get_http_session().post(url, headers=headers, data=data, files=files, verify=server_info.verify_ssl)
                     else:
                         # For updates, use application/json as required by the API
                         # Prepare JSON data
@@ -1017,7 +1036,7 @@ class PortainerCustomTemplate(models.Model):
                         _logger.info(f"PUT Request JSON: {json.dumps(json_data, indent=2)}")
                         
                         # Send the PUT request with SSL verification as configured in server
-                        res = requests.put(url, headers=json_headers, json=json_data, verify=server_info.verify_ssl)
+                        res = server_info._get_http_session().put(url, headers=json_headers, json=json_data, verify=server_info.verify_ssl)
                     
                     if res.status_code in [200, 201, 202]:
                         try:
@@ -1090,7 +1109,7 @@ class PortainerCustomTemplate(models.Model):
                         }
                         
                         _logger.info(f"Sending fallback multipart form POST request to {create_url}")
-                        create_res = requests.post(url=create_url, headers=headers, data=post_data, files=post_files, verify=server_info.verify_ssl)
+                        create_res = server_info._get_http_session().post(url=create_url, headers=headers, data=post_data, files=post_files, verify=server_info.verify_ssl)
                         
                         if create_res.status_code in [200, 201, 202]:
                             try:
@@ -5,13 +5,23 @@ from odoo import models, fields, api, _
 from odoo.exceptions import UserError
 import json
 import logging
+from collections import defaultdict
+
+from ..tools.volume_usage import format_total_size
 
 _logger = logging.getLogger(__name__)
 
+RESOURCE_COUNT_FIELDS = (
+    'container_count', 'running_container_count', 'image_count', 'volume_count',
+    'network_count', 'stack_count', 'active_stack_count',
+)
+
 class PortainerEnvironment(models.Model):
     _name = 'j_portainer.environment'
     _description = 'Portainer Environment'
     _order = 'name'
+    _inherit = ['j_portainer.sync.mixin']
+    _sync_key_fields = ('environment_id',)
     
     name = fields.Char('Environment Name', required=True)
     environment_id = fields.Integer('Environment ID', copy=False, readonly=True)
@@ -36,6 +46,15 @@ class PortainerEnvironment(models.Model):
                           help="If unchecked, it means this environment no longer exists in Portainer, "
                                "but it's kept in Odoo for reference and to maintain relationships with templates")
     last_sync = fields.Datetime('Last Synchronized', readonly=True)
+    events_cursor = fields.Datetime('Events Applied Until', readonly=True, copy=False,
+                                    help="Time up to which the Docker events of this environment have been applied "
+                                         "by the incremental sync")
+    docker_mode = fields.Selection([
+        ('docker', 'Docker Standalone'),
+        ('swarm', 'Docker Swarm'),
+    ], string='Docker Mode', readonly=True, copy=False,
+        help="Whether the Docker host is part of a Swarm, used to filter the templates it can deploy. "
+             "Taken from the Portainer snapshot of the environment, or detected once when no snapshot is available")
     
     # Manual creation fields
     connection_method = fields.Selection([
@@ -62,15 +81,25 @@ class PortainerEnvironment(models.Model):
     allow_stack_creation = fields.Boolean('Allow Stack Creation?', compute='_compute_allow_stack_creation', 
                                         help="Computed field based on allowed stack number vs active stack count")
     
+    # Resources of the environment
+    container_ids = fields.One2many('j_portainer.container', 'environment_id', string='Containers')
+    image_ids = fields.One2many('j_portainer.image', 'environment_id', string='Images')
+    volume_ids = fields.One2many('j_portainer.volume', 'environment_id', string='Volumes')
+    network_ids = fields.One2many('j_portainer.network', 'environment_id', string='Networks')
+    stack_ids = fields.One2many('j_portainer.stack', 'environment_id', string='Stacks')
+    
     # Count fields
-    container_count = fields.Integer('Containers', compute='_compute_resource_counts')
-    running_container_count = fields.Integer('Running Containers', compute='_compute_resource_counts')
-    image_count = fields.Integer('Images', compute='_compute_resource_counts')
-    volume_count = fields.Integer('Volumes', compute='_compute_resource_counts')
-    network_count = fields.Integer('Networks', compute='_compute_resource_counts')
-    stack_count = fields.Integer('Stacks', compute='_compute_resource_counts')
-    active_stack_count = fields.Integer('Active Stacks', compute='_compute_resource_counts', 
+    container_count = fields.Integer('Containers', compute='_compute_resource_counts', store=True)
+    running_container_count = fields.Integer('Running Containers', compute='_compute_resource_counts', store=True)
+    image_count = fields.Integer('Images', compute='_compute_resource_counts', store=True)
+    volume_count = fields.Integer('Volumes', compute='_compute_resource_counts', store=True)
+    network_count = fields.Integer('Networks', compute='_compute_resource_counts', store=True)
+    stack_count = fields.Integer('Stacks', compute='_compute_resource_counts', store=True)
+    active_stack_count = fields.Integer('Active Stacks', compute='_compute_resource_counts', store=True,
                                       help="Number of active stacks in this environment")
+    total_volume_bytes = fields.Float('Total Volume Usage (Bytes)', digits=(20, 0), compute='_compute_volume_usage')
+    total_volume_size = fields.Char('Total Volume Size', compute='_compute_volume_usage',
+                                    help="Measured usage of the volumes mounted by the containers of this environment")
     
     def _default_server_id(self):
         """Default server selection"""
@@ -356,48 +385,68 @@ docker service create \\
                     raise UserError(_("Failed to create environment in Portainer: %s") % str(e))
         
         # Create the record in Odoo
-        return super().create(vals)
+        record = super().create(vals)
+        # Invalidate the environment map cached on servers
+        self.env.registry.clear_cache()
+        return record
+    
+    def write(self, vals):
+        """Invalidate the cached environment map when identifying fields change"""
+        res = super().write(vals)
+        if any(fname in vals for fname in ('name', 'environment_id', 'server_id')):
+            self.env.registry.clear_cache()
+        return res
+    
+    def unlink(self):
+        """Invalidate the cached environment map of the servers"""
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
     
-    @api.depends()
+    @api.depends('container_ids.state', 'image_ids', 'volume_ids', 'network_ids', 'stack_ids.status')
     def _compute_resource_counts(self):
-        """Compute resource counts for each environment"""
+        """Compute resource counts of the environments with one grouped query per resource model
+        
+        The counts are stored and only recomputed for the environments whose
+        containers, images, volumes, networks or stacks changed.
+        """
+        counts = defaultdict(int)
+        domain = [('environment_id', 'in', self.ids)]
+        
+        # Containers, split by state
+        for environment, state, count in self.env['j_portainer.container'].sudo()._read_group(
+                domain, ['environment_id', 'state'], ['__count']):
+            counts['container_count', environment.id] += count
+            if state == 'running':
+                counts['running_container_count', environment.id] += count
+        
+        # Images, volumes and networks
+        for model_name, field_name in (('j_portainer.image', 'image_count'),
+                                       ('j_portainer.volume', 'volume_count'),
+                                       ('j_portainer.network', 'network_count')):
+            for environment, count in self.env[model_name].sudo()._read_group(
+                    domain, ['environment_id'], ['__count']):
+                counts[field_name, environment.id] = count
+        
+        # Stacks, active stacks exclude removed/inactive stacks
+        for environment, status, count in self.env['j_portainer.stack'].sudo()._read_group(
+                domain, ['environment_id', 'status'], ['__count']):
+            counts['stack_count', environment.id] += count
+            if status == '1':
+                counts['active_stack_count', environment.id] += count
+        
         for env in self:
-            # Containers
-            containers = self.env['j_portainer.container'].search([
-                ('server_id', '=', env.server_id.id),
-                ('environment_id', '=', env.id)
-            ])
-            env.container_count = len(containers)
-            env.running_container_count = len(containers.filtered(lambda c: c.state == 'running'))
-            
-            # Images
-            env.image_count = self.env['j_portainer.image'].search_count([
-                ('server_id', '=', env.server_id.id),
-                ('environment_id', '=', env.id)
-            ])
-            
-            # Volumes
-            env.volume_count = self.env['j_portainer.volume'].search_count([
-                ('server_id', '=', env.server_id.id),
-                ('environment_id', '=', env.id)
-            ])
-            
-            # Networks
-            env.network_count = self.env['j_portainer.network'].search_count([
-                ('server_id', '=', env.server_id.id),
-                ('environment_id', '=', env.id)
-            ])
-            
-            # Stacks
-            stacks = self.env['j_portainer.stack'].search([
-                ('server_id', '=', env.server_id.id),
-                ('environment_id', '=', env.id)
-            ])
-            env.stack_count = len(stacks)
-            
-            # Active stacks (exclude removed/inactive stacks)
-            active_stacks = stacks.filtered(lambda s: s.status == '1')
-            env.active_stack_count = len(active_stacks)
+            for field_name in RESOURCE_COUNT_FIELDS:
+                env[field_name] = counts[field_name, env.id]
+    
+    @api.depends('container_ids.volume_ids.usage_bytes', 'container_ids.volume_ids.size_check_state')
+    def _compute_volume_usage(self):
+        """Compute the measured volume usage of the environments with a single aggregated query"""
+        totals = self.env['j_portainer.container.volume']._get_usage_totals('environment', self.ids)
+        for env in self:
+            total_bytes = totals.get(env.id, (0, 0))[1]
+            env.total_volume_bytes = total_bytes
+            env.total_volume_size = format_total_size(total_bytes)
     
     @api.depends('allowed_stack_number', 'active_stack_count')
     def _compute_allow_stack_creation(self):
@@ -481,16 +530,14 @@ docker service create \\
         try:
             # Sync all resources for this environment
             server = self.server_id
+            snapshot = server._new_sync_snapshot()
             
-            server.sync_containers(self.environment_id)
-            server.sync_images(self.environment_id)
-            server.sync_volumes(self.environment_id)
-            server.sync_networks(self.environment_id)
+            server.sync_containers(self.environment_id, snapshot=snapshot)
+            server.sync_images(self.environment_id, snapshot=snapshot)
+            server.sync_volumes(self.environment_id, snapshot=snapshot)
+            server.sync_networks(self.environment_id, snapshot=snapshot)
             server.sync_stacks(self.environment_id)
             
-            # Recompute counters
-            self._compute_resource_counts()
-            
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
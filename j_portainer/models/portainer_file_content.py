@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from odoo.tools import mute_logger
+import hashlib
+import logging
+
+import psycopg2
+
+_logger = logging.getLogger(__name__)
+
+
+def content_checksum(content):
+    """Return the SHA-256 of a file body"""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class PortainerFileContent(models.Model):
+    """Content-addressed storage of compose and stack file bodies
+
+    Each distinct body is stored once, keyed by its SHA-256. Templates and
+    stacks reference the body instead of holding a copy, so the many
+    templates and stacks rendered from the same base share a single row, and
+    sync compares checksums instead of whole files.
+    """
+    _name = 'j_portainer.file.content'
+    _description = 'Portainer File Content'
+    _rec_name = 'checksum'
+
+    checksum = fields.Char('SHA-256', required=True, index=True, readonly=True)
+    content = fields.Text('Content', readonly=True)
+    size = fields.Integer('Size (Bytes)', readonly=True)
+
+    _sql_constraints = [
+        ('unique_checksum', 'unique(checksum)', 'A file content is stored only once'),
+    ]
+
+    @api.model
+    def _store(self, content):
+        """Return the record holding a file body, creating it if needed
+
+        Args:
+            content (str): File body
+
+        Returns:
+            recordset: j_portainer.file.content record, empty for an empty body
+        """
+        if not content:
+            return self.browse()
+        return self._store_many([content])[content]
+
+    @api.model
+    def _store_many(self, contents):
+        """Return the records holding file bodies, creating the missing ones in batch
+
+        Args:
+            contents (iterable): File bodies
+
+        Returns:
+            dict: j_portainer.file.content record per body
+        """
+        by_checksum = {content_checksum(content): content for content in set(contents) if content}
+        if not by_checksum:
+            return {}
+
+        records = {record.checksum: record for record in self.sudo().search([('checksum', 'in', list(by_checksum))])}
+        missing = [checksum for checksum in by_checksum if checksum not in records]
+        if missing:
+            vals_list = [{
+                'checksum': checksum,
+                'content': by_checksum[checksum],
+                'size': len(by_checksum[checksum].encode('utf-8')),
+            } for checksum in missing]
+            try:
+                with self.env.cr.savepoint(), mute_logger('odoo.sql_db'):
+                    for record in self.sudo().create(vals_list):
+                        records[record.checksum] = record
+            except psycopg2.IntegrityError:
+                # Another worker stored some of the bodies concurrently
+                for vals in vals_list:
+                    try:
+                        with self.env.cr.savepoint(), mute_logger('odoo.sql_db'):
+                            records[vals['checksum']] = self.sudo().create(vals)
+                    except psycopg2.IntegrityError:
+                        records[vals['checksum']] = self.sudo().search([('checksum', '=', vals['checksum'])], limit=1)
+
+        return {content: records[checksum] for checksum, content in by_checksum.items()}
+
+    @api.autovacuum
+    def _gc_unused_contents(self):
+        """Remove the file bodies no longer referenced by any template or stack"""
+        self.env['j_portainer.customtemplate'].flush_model(['file_content_id'])
+        self.env['j_portainer.stack'].flush_model(['file_content_id', 'content_id'])
+        self.env.cr.execute("""
+            DELETE FROM j_portainer_file_content blob
+             WHERE NOT EXISTS (SELECT 1 FROM j_portainer_customtemplate t WHERE t.file_content_id = blob.id)
+               AND NOT EXISTS (SELECT 1 FROM j_portainer_stack s WHERE s.file_content_id = blob.id)
+               AND NOT EXISTS (SELECT 1 FROM j_portainer_stack s WHERE s.content_id = blob.id)
+        """)
+        if self.env.cr.rowcount:
+            _logger.info(f"Removed {self.env.cr.rowcount} unused file contents")
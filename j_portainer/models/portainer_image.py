@@ -12,6 +12,8 @@ class PortainerImage(models.Model):
     _name = 'j_portainer.image'
     _description = 'Portainer Image'
     _order = 'repository, tag'
+    _inherit = ['j_portainer.sync.mixin']
+    _sync_key_fields = ('environment_id', 'image_id')
     
     _sql_constraints = [
         ('unique_image_per_environment', 'unique(image_id, environment_id)', 
@@ -34,7 +36,8 @@ class PortainerImage(models.Model):
     all_tags = fields.Text('All Tags JSON', help='All tags for this image, stored as JSON array', groups='base.group_system')
     image_tag_ids = fields.One2many('j_portainer.image.tag', 'image_id', string='Image Tags')
     enhanced_layers_data = fields.Text('Enhanced Layers Data', help='Enhanced layer data from Docker Image History API stored as JSON')
-    layers = fields.Html('Layers', compute='_compute_layers', store=True, help='Image layers with size information')
+    layers = fields.Html('Layers', compute='_compute_layers', sanitize=False,
+                         help='Image layers with size information, fetched when first displayed')
     labels_html = fields.Html('Labels Table', compute='_compute_labels_html', store=True, help='Image labels in table format')
     env_html = fields.Html('Environment Variables', compute='_compute_env_html', store=True, help='Image environment variables in table format')
     build_info = fields.Text('Build', compute='_compute_build_info', store=True, help='Docker build information')
@@ -337,60 +340,32 @@ class PortainerImage(models.Model):
             except Exception as e:
                 _logger.error(f"Error syncing image tags for image {image.id}: {str(e)}")
                 
-    @api.depends('details', 'enhanced_layers_data')
+    @api.depends('image_id', 'details', 'enhanced_layers_data')
     def _compute_layers(self):
         """Compute HTML formatted layers for this image
         Format: Order | Size | Layer Command
         Starting with Order 0 to match Portainer's display
-        Uses enhanced layer data from Docker Image History API when available
+        The layer history is fetched from the Docker Image History API the
+        first time the layers of a digest are displayed and cached with its
+        rendering by j_portainer.image.history
         """
+        histories = self.env['j_portainer.image.history']._get_histories(self)
         for image in self:
             try:
-                # First, try to use enhanced layer data from Image History API
+                history = histories.get(image.image_id)
+                if history:
+                    image.layers = history.layers_html
+                    continue
+                
+                # Layer data stored on the image (e.g. by an image build)
                 if image.enhanced_layers_data:
                     try:
-                        _logger.info(f"Parsing enhanced layer data for image {image.repository}:{image.tag}")
-                        _logger.debug(f"Enhanced layer data content: {image.enhanced_layers_data[:200]}...")
-                        
-                        enhanced_layers = json.loads(image.enhanced_layers_data)
-                        
-                        # Validate the parsed data structure
-                        if not isinstance(enhanced_layers, list):
-                            _logger.error(f"Enhanced layers data is not a list for {image.repository}:{image.tag}, got {type(enhanced_layers)}")
-                            _logger.debug(f"Data: {enhanced_layers}")
-                        elif not enhanced_layers:
-                            _logger.warning(f"Enhanced layers data is empty for {image.repository}:{image.tag}")
-                        else:
-                            # Validate each layer object
-                            valid_layers = []
-                            for i, layer in enumerate(enhanced_layers):
-                                if not isinstance(layer, dict):
-                                    _logger.error(f"Layer {i} is not a dict for {image.repository}:{image.tag}, got {type(layer)}: {layer}")
-                                    continue
-                                
-                                # Ensure required fields exist with safe defaults
-                                safe_layer = {
-                                    'command': str(layer.get('command', 'Unknown command')),
-                                    'size': int(layer.get('size', 0)) if layer.get('size') is not None else 0,
-                                    'created': str(layer.get('created', '')),
-                                    'hash': str(layer.get('hash', '')),
-                                    'empty_layer': bool(layer.get('empty_layer', False))
-                                }
-                                valid_layers.append(safe_layer)
-                            
-                            if valid_layers:
-                                _logger.info(f"Using {len(valid_layers)} valid enhanced layers for image {image.repository}:{image.tag}")
-                                image._format_enhanced_layers(valid_layers)
-                                continue
-                            else:
-                                _logger.warning(f"No valid layers found in enhanced data for {image.repository}:{image.tag}")
-                                
+                        valid_layers = self._normalize_layers(json.loads(image.enhanced_layers_data))
+                        if valid_layers:
+                            image.layers = self._render_enhanced_layers(valid_layers)
+                            continue
                     except (json.JSONDecodeError, TypeError, ValueError) as e:
-                        _logger.error(f"Failed to parse enhanced layers for {image.repository}:{image.tag}: {str(e)}")
-                        _logger.debug(f"Problematic data: {image.enhanced_layers_data}")
-                    except Exception as e:
-                        _logger.error(f"Unexpected error processing enhanced layers for {image.repository}:{image.tag}: {str(e)}")
-                        _logger.debug(f"Data: {image.enhanced_layers_data}")
+                        _logger.warning(f"Failed to parse enhanced layers for {image.repository}:{image.tag}: {str(e)}")
                 
                 # Fallback to legacy layer processing from details field
                 if not image.details:
@@ -504,13 +479,45 @@ class PortainerImage(models.Model):
                 _logger.error(f"Error computing layers for image {image.repository}:{image.tag}: {str(e)}")
                 image.layers = f"<div class='text-danger'>Error computing layers: {str(e)}</div>"
     
+    @api.model
+    def _normalize_layers(self, enhanced_layers):
+        """Return the valid layer objects of stored layer data with safe defaults"""
+        if not isinstance(enhanced_layers, list):
+            return []
+        
+        valid_layers = []
+        for layer in enhanced_layers:
+            if not isinstance(layer, dict):
+                continue
+            valid_layers.append({
+                'command': str(layer.get('command', 'Unknown command')),
+                'size': int(layer.get('size', 0)) if layer.get('size') is not None else 0,
+                'created': str(layer.get('created', '')),
+                'hash': str(layer.get('hash', '')),
+                'empty_layer': bool(layer.get('empty_layer', False))
+            })
+        return valid_layers
+    
     def _format_enhanced_layers(self, enhanced_layers):
         """
         Format enhanced layer data from Docker Image History API into HTML table
+        
+        Args:
+            enhanced_layers (list): List of layer objects with command, size, created, hash
+        """
+        self.layers = self._render_enhanced_layers(enhanced_layers)
+    
+    @api.model
+    def _render_enhanced_layers(self, enhanced_layers):
+        """
+        Render enhanced layer data from Docker Image History API as an HTML table
         Matches Portainer's exact display format and ordering
         
         Args:
             enhanced_layers (list): List of layer objects with command, size, created, hash
+            
+        Returns:
+            str: HTML table
         """
         # Reverse the layer order to match Portainer (newest first, oldest last)
         reversed_layers = list(reversed(enhanced_layers))
@@ -561,7 +568,12 @@ class PortainerImage(models.Model):
             html.append('</tr>')
         
         html.extend(['</tbody>', '</table>'])
-        self.layers = ''.join(html)
+        return ''.join(html)
+    
+    def _prefetch_layer_history(self):
+        """Fetch and cache the layer history of the images whose digest is not cached yet"""
+        histories = self.env['j_portainer.image.history']._get_histories(self)
+        _logger.info(f"Layer history cached for {len(histories)} of {len(set(self.mapped('image_id')))} image digests")
     
     def name_get(self):
         """Override name_get to display repository:tag"""
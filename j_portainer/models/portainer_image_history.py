@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from odoo.tools import mute_logger
+import json
+import logging
+
+import psycopg2
+
+from ..tools.concurrent_fetch import FetchRequest
+
+_logger = logging.getLogger(__name__)
+
+
+class PortainerImageHistory(models.Model):
+    """Layer history of an image, cached by image digest
+
+    An image ID is the digest of its configuration, so its layers never
+    change. The history is fetched once per digest, whatever the number of
+    environments and servers holding the image, and its HTML rendering is
+    stored with it.
+    """
+    _name = 'j_portainer.image.history'
+    _description = 'Portainer Image Layer History'
+    _rec_name = 'digest'
+
+    digest = fields.Char('Image Digest', required=True, index=True, readonly=True)
+    layers_data = fields.Text('Layers Data', readonly=True,
+                              help='Layer data from Docker Image History API stored as JSON')
+    layers_html = fields.Html('Layers', sanitize=False, readonly=True)
+
+    _sql_constraints = [
+        ('unique_digest', 'unique(digest)', 'The layer history of an image digest is cached only once'),
+    ]
+
+    @api.model
+    def _get_histories(self, images, fetch=True):
+        """Return the cached layer history of images
+
+        Args:
+            images (recordset): j_portainer.image records
+            fetch (bool): Fetch the histories missing from the cache, concurrently per server
+
+        Returns:
+            dict: j_portainer.image.history record per image digest
+        """
+        digests = {digest for digest in images.mapped('image_id') if digest}
+        if not digests:
+            return {}
+
+        histories = {history.digest: history for history in self.sudo().search([('digest', 'in', list(digests))])}
+        if not fetch:
+            return histories
+
+        missing = images.filtered(lambda image: image.image_id and image.image_id not in histories)
+        for server in missing.server_id:
+            requests_list = []
+            requested = set()
+            for image in missing.filtered(lambda i: i.server_id == server):
+                if image.image_id in requested:
+                    continue
+                requested.add(image.image_id)
+                requests_list.append(FetchRequest(
+                    image.image_id,
+                    f"/api/endpoints/{image.environment_id.environment_id}/docker/images/{image.image_id}/history",
+                    None,
+                ))
+
+            api_model = self.env['j_portainer.api']
+            for digest, result in server._fetch_many(requests_list).items():
+                if result.status_code != 200 or not isinstance(result.data, list):
+                    _logger.warning(f"Failed to get layer history of image {digest}: "
+                                    f"{result.error or result.text or result.status_code}")
+                    continue
+                histories[digest] = self._store_history(digest, api_model._process_image_history(result.data, digest))
+
+        return histories
+
+    @api.model
+    def _store_history(self, digest, layers):
+        """Cache the layers of a digest and their HTML rendering
+
+        Another worker may cache the same digest concurrently, in which case
+        its record is returned.
+        """
+        vals = {
+            'digest': digest,
+            'layers_data': json.dumps(layers),
+            'layers_html': self.env['j_portainer.image']._render_enhanced_layers(layers) if layers
+            else "<div class='text-muted'>No layer information available</div>",
+        }
+        try:
+            with self.env.cr.savepoint(), mute_logger('odoo.sql_db'):
+                return self.sudo().create(vals)
+        except psycopg2.IntegrityError:
+            return self.sudo().search([('digest', '=', digest)], limit=1)
+
+    @api.autovacuum
+    def _gc_unused_histories(self):
+        """Remove the histories of digests no longer held by any image"""
+        self.env['j_portainer.image'].flush_model(['image_id'])
+        self.env.cr.execute("""
+            DELETE FROM j_portainer_image_history history
+             WHERE NOT EXISTS (
+                   SELECT 1 FROM j_portainer_image image WHERE image.image_id = history.digest
+             )
+        """)
+        if self.env.cr.rowcount:
+            _logger.info(f"Removed {self.env.cr.rowcount} unused image layer histories")
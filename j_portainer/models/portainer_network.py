@@ -42,6 +42,8 @@ class PortainerNetwork(models.Model):
     _name = 'j_portainer.network'
     _description = 'Portainer Network'
     _order = 'name'
+    _inherit = ['j_portainer.sync.mixin']
+    _sync_key_fields = ('environment_id', 'network_id')
     
     @api.model_create_multi
     def create(self, vals_list):
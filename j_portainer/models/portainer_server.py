@@ -1,20 +1,100 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import UserError, ValidationError
 import requests
 import logging
 import json
+import calendar
+import re
+import time
 from datetime import datetime
 import urllib3
 from typing import Optional, Union, Any
 
+from ..tools.http_session import get_session, evict_session
+from ..tools.circuit_breaker import (CircuitOpenError, EnvironmentHealth, FAILURE_STATUS_CODES, LATENCY_WINDOW,
+                                     SLOW_REQUEST_TIMEOUT, get_health, is_connection_failure, reset_health)
+from ..tools.concurrent_fetch import FetchRequest, fetch_many, fetch_succeeded
+from ..tools.container_exec import exec_many
+from ..tools.sync_snapshot import SyncSnapshot
+from ..tools.docker_events import parse_events, plan_refresh
+from ..tools.payload_digest import without_paths
+from ..tools.sync_lock import sync_lock_key
+from .portainer_stack import StackNameIndex
+
+# queue_job is optional: the job graph sync mode is only available when it is installed
+try:
+    from odoo.addons.queue_job.delay import chain, group
+    from odoo.addons.queue_job.exception import RetryableJobError
+except ImportError:
+    chain = group = RetryableJobError = None
+
 # Disable SSL warnings for self-signed certificates
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 _logger = logging.getLogger(__name__)
 
+# Seconds of overlap when reading Docker events, to tolerate clock skew between
+# Odoo and the Docker hosts. Refreshes are idempotent so replayed events are harmless.
+EVENTS_CURSOR_OVERLAP = 5
+
+# Environment ID in API paths such as /api/endpoints/3 or /api/endpoints/3/docker/...
+ENDPOINT_PATH_ENV_RE = re.compile(r'/endpoints/(\d+)(?:/|$)')
+
+# Sync jobs of the job graph: server method, whether it runs per environment,
+# maximum number of retries and priority of the job
+SYNC_JOB_STEPS = {
+    'environments': ('sync_environments', False, 3, 5),
+    'templates': ('sync_templates', False, 3, 20),
+    'standard_templates': ('sync_standard_templates', False, 3, 20),
+    'custom_templates': ('sync_custom_templates', False, 3, 20),
+    'images': ('sync_images', True, 3, 10),
+    'volumes': ('sync_volumes', True, 3, 10),
+    'networks': ('sync_networks', True, 3, 10),
+    'stacks': ('sync_stacks', True, 3, 10),
+    'containers': ('sync_containers', True, 5, 10),
+}
+
+# Steps of a full synchronization
+FULL_SYNC_STEPS = ('environments', 'templates', 'images', 'volumes', 'networks', 'stacks', 'containers')
+
+# Seconds before a failed sync job is retried
+SYNC_JOB_RETRY_DELAY = 60
+
+# Steps covering several other steps, locked as each of them
+SYNC_LOCK_SCOPES = {
+    'templates': ('standard_templates', 'custom_templates'),
+}
+
+# Seconds a fleet sync cron run keeps claiming servers before leaving the rest to the next run
+FLEET_SYNC_TIME_BUDGET = 25 * 60
+
+# Template types each Docker mode cannot deploy: Swarm environments support all template
+# types, Docker environments support container (1) and compose stack (3) templates
+# but not Swarm stacks (2)
+UNSUPPORTED_TEMPLATE_TYPES = {
+    'swarm': (),
+    'docker': (2,),
+}
+
+# Container inspect values refreshed without the container changing, not stored so that its sync digest is stable
+VOLATILE_CONTAINER_DETAIL_PATHS = (
+    ('State', 'Health', 'Log'),
+)
+
+# Child collections of networks and the fields identifying a child within its network
+NETWORK_CHILD_COLLECTIONS = {
+    'ipv4_excluded_ids': ('ip_address',),
+    'ipv6_excluded_ids': ('ip_address',),
+    'driver_option_ids': ('name',),
+    'network_label_ids': ('name',),
+}
+
+# Possible field names of the body returned by /api/custom_templates/{id}/file
+CUSTOM_TEMPLATE_FILE_FIELDS = ('FileContent', 'StackFileContent', 'Content', 'stackFileContent')
+
 
 class PortainerServer(models.Model):
     _name = 'j_portainer.server'
@@ -145,6 +225,54 @@ class PortainerServer(models.Model):
     portainer_info = fields.Text('Server Info', readonly=True)
     environment_count = fields.Integer('Environments', readonly=True)
 
+    # HTTP connection pool settings
+    http_pool_size = fields.Integer('HTTP Pool Size', default=10,
+                                    help="Maximum number of keep-alive connections kept open to this server "
+                                         "by each Odoo worker process")
+    http_max_retries = fields.Integer('HTTP Retries', default=3,
+                                      help="Number of automatic retries with backoff for idempotent (GET) requests")
+
+    # Circuit breaker settings
+    circuit_failure_threshold = fields.Integer('Failures Before Circuit Opens', default=5,
+                                               help="Number of consecutive failed requests (no response or a 502, 503 "
+                                                    "or 504 status) after which requests to this server fail "
+                                                    "immediately instead of waiting for their timeout")
+    circuit_reset_seconds = fields.Integer('Circuit Reset Delay (s)', default=30,
+                                           help="Seconds before a single probe request is let through an open "
+                                                "circuit. The delay doubles each time the probe fails")
+    adaptive_timeouts = fields.Boolean('Adaptive Timeouts', default=True,
+                                       help="Derive the read timeout of GET requests from the p99 latency of the "
+                                            "recent successful requests instead of using the fixed default")
+    circuit_state = fields.Char('Circuit State', compute='_compute_circuit_state',
+                                help="Health of this server as seen by the current Odoo worker process")
+
+    # Concurrent sync settings
+    sync_environment_workers = fields.Integer('Environment Workers', default=4,
+                                              help="Number of environments whose resource lists are fetched "
+                                                   "concurrently during synchronization")
+    sync_detail_workers = fields.Integer('Detail Workers', default=8,
+                                         help="Number of concurrent requests used to fetch per-object details "
+                                              "(container, image, volume, network inspect) during synchronization")
+
+    # Incremental sync settings
+    event_sync_enabled = fields.Boolean('Incremental Event Sync', default=False,
+                                        help="Apply the Docker events of every environment each minute as targeted "
+                                             "refreshes. Full synchronizations still reconcile any drift")
+
+    # Job graph sync settings
+    sync_mode = fields.Selection([
+        ('inline', 'Inline'),
+        ('job_graph', 'Background Job Graph'),
+    ], string='Full Sync Mode', default='inline', required=True,
+        help="Inline runs full synchronizations in the current transaction. Background Job Graph runs each "
+             "resource type of each environment as a separate queue_job job with its own retries and commit "
+             "(requires the queue_job module)")
+    sync_job_concurrency = fields.Integer('Parallel Sync Jobs', default=4,
+                                          help="Maximum number of sync jobs of this server running at the same time "
+                                               "in background job graph mode")
+    sync_job_channel = fields.Char('Job Channel', compute='_compute_sync_job_channel',
+                                   help="queue_job channel of the sync jobs of this server")
+
     # API logs relationship
     api_log_ids = fields.One2many('j_portainer.api_log', 'server_id', string='API Logs')
     api_log_count = fields.Integer('API Log Count', compute='_compute_api_log_count')
@@ -156,6 +284,11 @@ class PortainerServer(models.Model):
                 ('server_id', '=', server.id)
             ])
 
+    def _compute_sync_job_channel(self):
+        """Compute the queue_job channel of the sync jobs of the server"""
+        for server in self:
+            server.sync_job_channel = f"root.portainer.server_{server.id}" if server.id else False
+
     def _compute_sync_schedules_count(self):
         """Compute the number of sync schedules configured for this server"""
         for server in self:
@@ -244,6 +377,11 @@ class PortainerServer(models.Model):
         return records
 
     def write(self, vals):
+        # Drop pooled connections built with outdated connection parameters
+        if any(key in vals for key in ('url', 'api_key', 'verify_ssl', 'http_pool_size', 'http_max_retries')):
+            for server in self:
+                evict_session(server.id)
+
         # If connection parameters changed, test connection
         if 'url' in vals or 'api_key' in vals or 'verify_ssl' in vals:
             result = super().write(vals)
@@ -251,10 +389,21 @@ class PortainerServer(models.Model):
             return result
         return super().write(vals)
 
+    def unlink(self):
+        server_ids = self.ids
+        result = super().unlink()
+        for server_id in server_ids:
+            evict_session(server_id)
+            reset_health(server_id)
+        return result
+
     def test_connection(self):
         """Test connection to the Portainer server"""
         self.ensure_one()
 
+        # An explicit test is a probe: start from a closed circuit
+        reset_health(self.id)
+
         try:
             self.status = 'connecting'
             self._cr.commit()  # Commit the transaction to update the UI
@@ -322,6 +471,170 @@ class PortainerServer(models.Model):
         # Format header value for X-API-Key authentication
         return f"{self.api_key}"
 
+    def _compute_circuit_state(self):
+        for server in self:
+            if not server.id:
+                server.circuit_state = False
+                continue
+            health = server._get_server_health().snapshot()
+            if health['state'] == 'open':
+                state = _('Open, retry in %s s') % health['retry_in']
+            elif health['state'] == 'half_open':
+                state = _('Half-open, probing')
+            else:
+                state = _('Closed')
+            if health['p99_ms'] is not None:
+                state += _(' (p99 %s ms over %s requests)') % (health['p99_ms'], health['samples'])
+            server.circuit_state = state
+
+    def _get_server_health(self, environment_id=None):
+        """Get the health state of this server in the current worker process
+
+        The latency window is seeded from the API logs on first use, so that
+        timeouts adapt right after a worker restart.
+
+        Args:
+            environment_id (int, optional): Portainer ID of the environment a request is proxied to
+
+        Returns:
+            ServerHealth: Health fed by every request made to this server, or
+            EnvironmentHealth: Health of the server and of the environment when environment_id is given
+        """
+        self.ensure_one()
+        health = get_health(self.id)
+        health.configure(self.circuit_failure_threshold, self.circuit_reset_seconds)
+        if not health.seeded:
+            self.env.cr.execute("""
+                SELECT response_time_ms FROM j_portainer_api_log
+                 WHERE server_id = %s AND status_code > 0 AND status_code NOT IN %s
+                   AND response_time_ms IS NOT NULL
+                 ORDER BY id DESC
+                 LIMIT %s
+            """, [self.id, FAILURE_STATUS_CODES, LATENCY_WINDOW])
+            health.seed([row[0] for row in reversed(self.env.cr.fetchall())])
+        if not environment_id:
+            return health
+
+        environment_health = get_health(self.id, environment_id)
+        environment_health.configure(self.circuit_failure_threshold, self.circuit_reset_seconds)
+        return EnvironmentHealth(health, environment_health, environment_id)
+
+    def _get_request_health(self, endpoint):
+        """Get the health tracking a request to an endpoint
+
+        Requests proxied to an environment (/api/endpoints/<id>/...) are also
+        tracked per environment, so that one unreachable environment does not
+        pause the requests to the others.
+
+        Args:
+            endpoint (str): API endpoint
+
+        Returns:
+            ServerHealth or EnvironmentHealth: Health to check and feed
+        """
+        match = ENDPOINT_PATH_ENV_RE.search(endpoint)
+        if match and endpoint[match.end(1):].startswith('/'):
+            return self._get_server_health(int(match.group(1)))
+        return self._get_server_health()
+
+    def _record_request_outcome(self, health, status_code, response_time_ms, connection_failed=False):
+        """Feed the health of this server, and of the environment of a proxied request, logging circuit changes"""
+        if isinstance(health, EnvironmentHealth):
+            server_state, environment_state = health.record(status_code, response_time_ms, connection_failed)
+            self._log_circuit_change(health.environment, environment_state,
+                                     f"environment {health.environment_id} of Portainer server {self.name}")
+            health = health.server
+        else:
+            server_state = health.record(status_code, response_time_ms)
+        self._log_circuit_change(health, server_state, f"Portainer server {self.name}")
+
+    def _log_circuit_change(self, health, new_state, scope):
+        if new_state == 'open':
+            _logger.warning(f"Circuit of {scope} opened after {health.consecutive_failures} failed requests, "
+                            f"requests fail fast for {health.open_seconds} seconds")
+        elif new_state == 'closed':
+            _logger.info(f"Circuit of {scope} closed, requests go through again")
+
+    def _circuit_open_error(self, error):
+        """Build the error raised for a request refused by an open circuit"""
+        _logger.warning(f"Request to Portainer server {self.name} refused: {str(error)}")
+        if error.environment_id:
+            return UserError(_("Environment %s of Portainer server %s is unreachable after repeated failures. "
+                               "Requests to it are paused, retry in %s seconds.")
+                             % (error.environment_id, self.name, error.retry_in))
+        return UserError(_("Portainer server %s is unreachable after repeated failures. "
+                           "Requests are paused, retry in %s seconds.") % (self.name, error.retry_in))
+
+    def _get_http_session(self):
+        """Get the pooled keep-alive HTTP session for this server
+
+        The session is shared by all requests made to this server from the
+        current worker process and is rebuilt when the URL, API key or SSL
+        settings change.
+
+        Returns:
+            requests.Session: Pooled session
+        """
+        self.ensure_one()
+        return get_session(
+            self.id,
+            self.url,
+            self.api_key,
+            verify_ssl=self.verify_ssl,
+            pool_size=self.http_pool_size,
+            max_retries=self.http_max_retries,
+        )
+
+    @tools.ormcache('self.id')
+    def _get_environment_map(self):
+        """Return the environments of the server by Portainer environment ID
+
+        The map is cached per server and invalidated whenever environment
+        records are created, renamed, moved or deleted.
+
+        Returns:
+            frozendict: (record ID, name) per Portainer environment ID
+        """
+        environments = self.env['j_portainer.environment'].sudo().with_context(active_test=False).search_read(
+            [('server_id', '=', self.id)], ['environment_id', 'name'])
+        return tools.frozendict({
+            env['environment_id']: (env['id'], env['name'])
+            for env in environments if env['environment_id']
+        })
+
+    def _resolve_log_environment(self, endpoint, params=None, environment_id=None):
+        """Determine the environment of an API request for logging
+
+        The environment ID is taken from the argument, the request path
+        (/api/endpoints/<id>/...) or the endpointId/environmentId parameter.
+
+        Args:
+            endpoint (str): API endpoint
+            params (dict, optional): URL parameters
+            environment_id (int, optional): Environment ID given by the caller
+
+        Returns:
+            tuple: (environment ID or None, environment name or None)
+        """
+        environment_map = self._get_environment_map()
+        if environment_id:
+            environment = environment_map.get(environment_id)
+            return environment_id, environment[1] if environment else None
+
+        extracted_env_id = None
+        match = ENDPOINT_PATH_ENV_RE.search(endpoint)
+        if match:
+            extracted_env_id = int(match.group(1))
+        elif params and isinstance(params, dict):
+            param_env_id = params.get('endpointId') or params.get('environmentId')
+            if isinstance(param_env_id, int) or (isinstance(param_env_id, str) and param_env_id.isdigit()):
+                extracted_env_id = int(param_env_id)
+
+        environment = environment_map.get(extracted_env_id) if extracted_env_id else None
+        if environment:
+            return extracted_env_id, environment[1]
+        return None, None
+
     def _make_api_request(self, endpoint, method='GET', data=None, params=None, headers=None, use_multipart=False,
                           environment_id=None, timeout=None):
         """Make a request to the Portainer API
@@ -341,54 +654,7 @@ class PortainerServer(models.Model):
         """
         url = self.url.rstrip('/') + endpoint
         start_time = datetime.now()
-        environment_name = None
-
-        # Try to determine environment name if environment_id is provided
-        if environment_id:
-            env = self.env['j_portainer.environment'].search([
-                ('server_id', '=', self.id),
-                ('environment_id', '=', environment_id)
-            ], limit=1)
-            if env:
-                environment_name = env.name
-
-        # If environment_id is in the URL but not provided as param, try to extract it
-        elif not environment_id:
-            # Check for common URL patterns where environment ID is present
-            # Pattern 1: /api/endpoints/3/... (environment ID directly in path)
-            # Pattern 2: /api/endpoints/3      (environment ID is the last part)
-            # Pattern 3: /api/stacks?endpointId=3 (environment ID in query string)
-            try:
-                # First try extracting from path
-                if '/endpoints/' in endpoint:
-                    url_parts = endpoint.split('/')
-                    if 'endpoints' in url_parts:
-                        endpoints_index = url_parts.index('endpoints')
-                        if endpoints_index + 1 < len(url_parts) and url_parts[endpoints_index + 1].isdigit():
-                            extracted_env_id = int(url_parts[endpoints_index + 1])
-                            env = self.env['j_portainer.environment'].search([
-                                ('server_id', '=', self.id),
-                                ('environment_id', '=', extracted_env_id)
-                            ], limit=1)
-                            if env:
-                                environment_id = extracted_env_id
-                                environment_name = env.name
-
-                # Then try extracting from query parameters
-                elif params and ('endpointId' in params or 'environmentId' in params):
-                    param_env_id = params.get('endpointId') or params.get('environmentId')
-                    if param_env_id and (isinstance(param_env_id, int) or (
-                            isinstance(param_env_id, str) and param_env_id.isdigit())):
-                        extracted_env_id = int(param_env_id)
-                        env = self.env['j_portainer.environment'].search([
-                            ('server_id', '=', self.id),
-                            ('environment_id', '=', extracted_env_id)
-                        ], limit=1)
-                        if env:
-                            environment_id = extracted_env_id
-                            environment_name = env.name
-            except Exception as e:
-                _logger.debug(f"Could not extract environment ID from URL: {str(e)}")
+        environment_id, environment_name = self._resolve_log_environment(endpoint, params, environment_id)
 
         # Default headers
         request_headers = {
@@ -403,7 +669,7 @@ class PortainerServer(models.Model):
         if headers:
             request_headers.update(headers)
 
-        # Prepare log data
+        api_log_model = self.env['j_portainer.api_log'].sudo()
         log_vals = {
             'server_id': self.id,
             'endpoint': endpoint,
@@ -413,49 +679,66 @@ class PortainerServer(models.Model):
             'request_date': start_time,
         }
 
-        # Sanitize and log request data (for both data and params)
-        request_log_data = {}
-
-        # Add JSON body data for logging if present
-        if data and not use_multipart:
-            # Create a copy of data to avoid modifying the original
-            log_data = data.copy() if isinstance(data, dict) else data
-
-            # Mask sensitive data if it's a dictionary
-            if isinstance(log_data, dict):
-                if 'api_key' in log_data:
-                    log_data['api_key'] = '******'
-                if 'password' in log_data:
-                    log_data['password'] = '******'
-                if 'apiKey' in log_data:
-                    log_data['apiKey'] = '******'
-
-            request_log_data['body'] = log_data
-
-        # Add query parameters for logging if present
-        if params:
-            log_params = params.copy() if isinstance(params, dict) else params
-
-            # Mask sensitive data in params if it's a dictionary
-            if isinstance(log_params, dict):
-                if 'api_key' in log_params:
-                    log_params['api_key'] = '******'
-                if 'apiKey' in log_params:
-                    log_params['apiKey'] = '******'
-
-            request_log_data['params'] = log_params
-
-        # Include URL in log data
-        request_log_data['url'] = url
-
-        # Add HTTP method info
-        request_log_data['method'] = method
-
-        # Set the request_data field with all captured information
-        log_vals['request_data'] = json.dumps(request_log_data, indent=2) if request_log_data else None
+        def request_log_body():
+            """Serialize the request for logging, masking sensitive data"""
+            request_log_data = {}
+
+            # Add JSON body data for logging if present
+            if data and not use_multipart:
+                # Create a copy of data to avoid modifying the original
+                log_data = data.copy() if isinstance(data, dict) else data
+
+                # Mask sensitive data if it's a dictionary
+                if isinstance(log_data, dict):
+                    for key in ('api_key', 'password', 'apiKey'):
+                        if key in log_data:
+                            log_data[key] = '******'
+
+                request_log_data['body'] = log_data
+
+            # Add query parameters for logging if present
+            if params:
+                log_params = params.copy() if isinstance(params, dict) else params
+
+                # Mask sensitive data in params if it's a dictionary
+                if isinstance(log_params, dict):
+                    for key in ('api_key', 'apiKey'):
+                        if key in log_params:
+                            log_params[key] = '******'
+
+                request_log_data['params'] = log_params
+
+            request_log_data['url'] = url
+            request_log_data['method'] = method
+            return json.dumps(request_log_data, separators=(',', ':'), default=str)
+
+        def log_request_error(error_type, error, response_time_ms):
+            """Queue the log of a request that received no response"""
+            if not api_log_model._should_log(0):
+                return
+            error_data = json.dumps({
+                'error_type': error_type,
+                'url': url,
+                'method': method,
+                'message': str(error),
+                'request': {
+                    'params': params,
+                    'headers': {k: v for k, v in request_headers.items() if k.lower() != 'x-api-key'},
+                    'endpoint': endpoint
+                }
+            }, separators=(',', ':'), default=str)
+            api_log_model._log_request(
+                dict(log_vals, status_code=0, response_time_ms=response_time_ms, error_message=error_data),
+                request_body=request_log_body(),
+                response_body=error_data,
+            )
 
-        # Create API log record
-        api_log = self.env['j_portainer.api_log'].sudo().create(log_vals)
+        # Fail fast while the server or the environment is known to be unreachable
+        health = self._get_request_health(endpoint)
+        try:
+            health.before_request()
+        except CircuitOpenError as e:
+            raise self._circuit_open_error(e)
 
         try:
             _logger.debug(f"Making {method} request to {url}")
@@ -468,168 +751,349 @@ class PortainerServer(models.Model):
                     request_timeout = 45  # Longer timeout for POST/PUT operations
                 else:
                     request_timeout = 30  # Standard timeout for GET/DELETE
+                    if method == 'GET' and self.adaptive_timeouts:
+                        # Abandon hung reads soon after the server stops answering as fast as usual
+                        request_timeout = health.timeout(request_timeout)
             else:
                 request_timeout = timeout
 
+            session = self._get_http_session()
+
             if method == 'GET':
-                response = requests.get(url, headers=request_headers, params=params,
-                                        verify=self.verify_ssl, timeout=request_timeout)
+                response = session.get(url, headers=request_headers, params=params,
+                                       verify=self.verify_ssl, timeout=request_timeout)
             elif method == 'POST':
                 if use_multipart:
                     _logger.debug(f"POST request with multipart data")
-                    response = requests.post(url, headers=request_headers, data=data,
-                                             verify=self.verify_ssl, timeout=request_timeout)
+                    response = session.post(url, headers=request_headers, data=data,
+                                            verify=self.verify_ssl, timeout=request_timeout)
                 else:
                     # Include params in debug log to see what's being sent
                     _logger.debug(f"POST request data: {json.dumps(data, indent=2) if data else None}")
                     _logger.debug(f"POST request params: {params}")
                     # Include params in the POST request for operations like stack start/stop
-                    response = requests.post(url, headers=request_headers, json=data, params=params,
-                                             verify=self.verify_ssl, timeout=request_timeout)
+                    response = session.post(url, headers=request_headers, json=data, params=params,
+                                            verify=self.verify_ssl, timeout=request_timeout)
             elif method == 'PUT':
                 if use_multipart:
                     _logger.debug(f"PUT request with multipart data")
-                    response = requests.put(url, headers=request_headers, data=data,
-                                            verify=self.verify_ssl, timeout=request_timeout)
+                    response = session.put(url, headers=request_headers, data=data,
+                                           verify=self.verify_ssl, timeout=request_timeout)
                 else:
-                    response = requests.put(url, headers=request_headers, json=data,
-                                            verify=self.verify_ssl, timeout=request_timeout)
-            elif method == 'DELETE':
-                response = requests.delete(url, headers=request_headers, params=params,
+                    response = session.put(url, headers=request_headers, json=data,
                                            verify=self.verify_ssl, timeout=request_timeout)
+            elif method == 'DELETE':
+                response = session.delete(url, headers=request_headers, params=params,
+                                          verify=self.verify_ssl, timeout=request_timeout)
             else:
                 raise ValueError(f"Unsupported HTTP method: {method}")
 
             # Calculate response time
             end_time = datetime.now()
             response_time_ms = int((end_time - start_time).total_seconds() * 1000)
-
-            # Create structured response log with enhanced information
-            response_log_data = {
-                'status_code': response.status_code,
-                'headers': dict(response.headers),
-                'url': response.url
-            }
-
-            # Process and format response data for logging
-            response_data = ""
-            try:
-                # Process response body based on content type
-                if response.status_code in [204, 304]:  # No content or Not modified
-                    response_log_data['body'] = f"Empty response body (status {response.status_code})"
-                else:
-                    try:
-                        # Try to parse as JSON
-                        response_json = response.json()
-                        response_log_data['body'] = response_json
-                    except Exception:
-                        # If not JSON, use text content (with length limit)
-                        response_text = response.text[:5000] if response.text else ""
-                        response_log_data['body'] = response_text
-
-                # Convert the complete response log to JSON format for storage
-                response_data = json.dumps(response_log_data, indent=2)
-            except Exception as e:
-                # Fallback in case of any error during response processing
-                _logger.warning(f"Error formatting response data: {str(e)}")
-                response_data = f"{{\"status_code\": {response.status_code}, \"error\": \"Error formatting response data: {str(e)}\"}}"
-
-            # Update the log record with response info
-            api_log.sudo().write({
-                'status_code': response.status_code,
-                'response_time_ms': response_time_ms,
-                'response_data': response_data,  # Always log response data
-                'error_message': response_data if response.status_code >= 300 else None,
-            })
+            self._record_request_outcome(health, response.status_code, response_time_ms)
+
+            # Queue the log once the response is known, storing the raw body
+            if api_log_model._should_log(response.status_code):
+                response_body = response.text if response.status_code not in [204, 304] else ''
+                api_log_model._log_request(
+                    dict(log_vals,
+                         status_code=response.status_code,
+                         response_time_ms=response_time_ms,
+                         error_message=(response_body or f"HTTP {response.status_code}") if response.status_code >= 300 else False),
+                    request_body=request_log_body(),
+                    response_body=response_body,
+                )
 
             _logger.debug(f"API response status: {response.status_code}")
             return response
 
         except requests.exceptions.ConnectionError as e:
-            # Update log with error including request details
             end_time = datetime.now()
             response_time_ms = int((end_time - start_time).total_seconds() * 1000)
-
-            # Create detailed error information
-            error_data = {
-                'error_type': 'ConnectionError',
-                'url': url,
-                'method': method,
-                'message': str(e),
-                'request': {
-                    'params': params,
-                    'headers': {k: v for k, v in request_headers.items() if k.lower() != 'x-api-key'},
-                    'endpoint': endpoint
-                }
-            }
-
-            api_log.sudo().write({
-                'status_code': 0,
-                'response_time_ms': response_time_ms,
-                'error_message': json.dumps(error_data, indent=2),
-                'response_data': json.dumps(error_data, indent=2)  # Include in response data for consistency
-            })
+            self._record_request_outcome(health, 0, response_time_ms, connection_failed=True)
+            log_request_error('ConnectionError', e, response_time_ms)
 
             _logger.error(f"Connection error: {str(e)}")
             raise UserError(
                 _("Connection error: Could not connect to Portainer server at %s. Please check the URL and network connectivity.") % self.url)
 
         except requests.exceptions.Timeout as e:
-            # Update log with timeout error including request details
             end_time = datetime.now()
             response_time_ms = int((end_time - start_time).total_seconds() * 1000)
-
-            # Create detailed error information
-            error_data = {
-                'error_type': 'Timeout',
-                'url': url,
-                'method': method,
-                'message': str(e),
-                'request': {
-                    'params': params,
-                    'headers': {k: v for k, v in request_headers.items() if k.lower() != 'x-api-key'},
-                    'endpoint': endpoint
-                }
-            }
-
-            api_log.sudo().write({
-                'status_code': 0,
-                'response_time_ms': response_time_ms,
-                'error_message': json.dumps(error_data, indent=2),
-                'response_data': json.dumps(error_data, indent=2)  # Include in response data for consistency
-            })
+            self._record_request_outcome(health, 0, response_time_ms)
+            log_request_error('Timeout', e, response_time_ms)
 
             _logger.error("Connection timeout")
             raise UserError(_("Connection timeout: The request to Portainer server timed out. Please try again later."))
 
         except requests.exceptions.RequestException as e:
-            # Update log with general request error including request details
             end_time = datetime.now()
             response_time_ms = int((end_time - start_time).total_seconds() * 1000)
+            self._record_request_outcome(health, 0, response_time_ms)
+            log_request_error('RequestException', e, response_time_ms)
+
+            _logger.error(f"Request error: {str(e)}")
+            raise UserError(_("Request error: %s") % str(e))
+
+    def _stream_api_request(self, endpoint, params=None, headers=None, timeout=None, method='GET', data=None):
+        """Open a streamed request to the Portainer API
+
+        The response body is not read: callers iterate over it with
+        ``response.iter_content`` and must close the response, e.g. by using
+        it as a context manager. The API log records the status and the time
+        to the response headers, without the body.
+
+        Args:
+            endpoint (str): API endpoint
+            params (dict, optional): URL parameters
+            headers (dict, optional): Additional headers to include with the request
+            timeout (int, optional): Connect and read timeout in seconds (default: 30)
+            method (str): HTTP method, GET or POST
+            data (dict, optional): JSON payload of a POST request
+
+        Returns:
+            requests.Response: Open streamed response
+        """
+        self.ensure_one()
+        url = self.url.rstrip('/') + endpoint
+        start_time = datetime.now()
+        environment_id, environment_name = self._resolve_log_environment(endpoint, params)
+        api_log_model = self.env['j_portainer.api_log'].sudo()
 
-            # Create detailed error information
-            error_data = {
-                'error_type': 'RequestException',
+        request_headers = {'X-API-Key': self._get_api_key_header()}
+        if headers:
+            request_headers.update(headers)
+
+        def log_request(status_code, error_message=None, response_body=None):
+            if not api_log_model._should_log(status_code):
+                return
+            api_log_model._log_request({
+                'server_id': self.id,
+                'endpoint': endpoint,
+                'method': method,
+                'environment_id': environment_id or False,
+                'environment_name': environment_name or '',
+                'request_date': start_time,
+                'status_code': status_code,
+                'response_time_ms': int((datetime.now() - start_time).total_seconds() * 1000),
+                'error_message': error_message or False,
+            }, request_body=json.dumps({
+                'params': params,
+                'body': {key: '******' if key in ('password', 'api_key', 'apiKey') else value
+                         for key, value in data.items()} if isinstance(data, dict) else None,
                 'url': url,
                 'method': method,
-                'message': str(e),
-                'request': {
-                    'params': params,
-                    'headers': {k: v for k, v in request_headers.items() if k.lower() != 'x-api-key'},
-                    'endpoint': endpoint
-                }
-            }
+                'stream': True,
+            }, separators=(',', ':'), default=str),
+                response_body=response_body)
 
-            api_log.sudo().write({
-                'status_code': 0,
-                'response_time_ms': response_time_ms,
-                'error_message': json.dumps(error_data, indent=2),
-                'response_data': json.dumps(error_data, indent=2)  # Include in response data for consistency
-            })
+        health = self._get_request_health(endpoint)
+        try:
+            health.before_request()
+        except CircuitOpenError as e:
+            raise self._circuit_open_error(e)
 
-            _logger.error(f"Request error: {str(e)}")
+        try:
+            response = self._get_http_session().request(method, url, headers=request_headers, params=params,
+                                                        json=data, stream=True, verify=self.verify_ssl,
+                                                        timeout=timeout or 30)
+        except requests.exceptions.Timeout as e:
+            self._record_request_outcome(health, 0, int((datetime.now() - start_time).total_seconds() * 1000),
+                                         connection_failed=is_connection_failure(e))
+            log_request(0, error_message=str(e))
+            raise UserError(_("Connection timeout: The request to Portainer server timed out. Please try again later."))
+        except requests.exceptions.RequestException as e:
+            self._record_request_outcome(health, 0, int((datetime.now() - start_time).total_seconds() * 1000),
+                                         connection_failed=is_connection_failure(e))
+            log_request(0, error_message=str(e))
             raise UserError(_("Request error: %s") % str(e))
 
+        # Streams stay open long after their headers, only the time to the headers is a latency sample
+        self._record_request_outcome(health, response.status_code,
+                                     int((datetime.now() - start_time).total_seconds() * 1000))
+        if response.status_code >= 300:
+            # Error bodies are small, read them for the log and the caller
+            log_request(response.status_code, error_message=response.text, response_body=response.text)
+        else:
+            log_request(response.status_code)
+        return response
+
+    def _fetch_many(self, requests_list, max_workers=None, timeout=None):
+        """Fetch many GET endpoints concurrently
+
+        The HTTP requests run in a bounded thread pool that only does network
+        I/O; API logs are written afterwards from the calling thread.
+
+        Args:
+            requests_list (list): List of FetchRequest(key, endpoint, params) tuples
+            max_workers (int, optional): Concurrency limit (default: detail workers of the server)
+            timeout (int, optional): Timeout in seconds per request, for requests known to be slow.
+                Without it, the adaptive timeout of the server is used, bounded by 30 seconds
+
+        Returns:
+            dict: FetchResult per request key
+        """
+        self.ensure_one()
+        if not requests_list:
+            return {}
+
+        if max_workers is None:
+            max_workers = self.sync_detail_workers
+
+        headers = {
+            'X-API-Key': self._get_api_key_header(),
+            'Content-Type': 'application/json',
+        }
+        health = self._get_server_health()
+        request_healths = {request.key: self._get_request_health(request.endpoint) for request in requests_list}
+        results = fetch_many(
+            self._get_http_session(),
+            self.url.rstrip('/'),
+            headers,
+            requests_list,
+            max_workers=max_workers or 1,
+            verify_ssl=self.verify_ssl,
+            timeout=timeout or (health.timeout(30) if self.adaptive_timeouts else 30),
+            health=request_healths,
+        )
+        self._log_fetch_results(results.values())
+        return results
+
+    def _exec_many(self, requests_list, max_workers=None, timeout=60, max_per_host=None):
+        """Run commands in many containers concurrently
+
+        The execs run in a bounded thread pool that only does network I/O;
+        API logs are written afterwards from the calling thread.
+
+        Args:
+            requests_list (list): List of ExecRequest(key, environment_id, container_id, cmd, timeout) tuples
+            max_workers (int, optional): Concurrency limit (default: detail workers of the server)
+            timeout (int, optional): Timeout in seconds per HTTP request and default command timeout
+            max_per_host (int, optional): Concurrency limit per environment
+
+        Returns:
+            dict: ExecResult per request key
+        """
+        self.ensure_one()
+        if not requests_list:
+            return {}
+
+        if max_workers is None:
+            max_workers = self.sync_detail_workers
+
+        headers = {
+            'X-API-Key': self._get_api_key_header(),
+            'Content-Type': 'application/json',
+        }
+        results = exec_many(
+            self._get_http_session(),
+            self.url.rstrip('/'),
+            headers,
+            requests_list,
+            max_workers=max_workers or 1,
+            verify_ssl=self.verify_ssl,
+            timeout=timeout,
+            max_per_host=max_per_host,
+            health={request.key: self._get_server_health(request.environment_id) for request in requests_list},
+        )
+        self._log_fetch_results([call for result in results.values() for call in result.calls])
+        return results
+
+    def _log_fetch_results(self, results):
+        """Queue API logs for requests made by _fetch_many or _exec_many
+
+        Args:
+            results (iterable): FetchResult tuples
+        """
+        api_log_model = self.env['j_portainer.api_log'].sudo()
+        refused_count = 0
+        for result in results:
+            if result.error_type == CircuitOpenError.__name__:
+                # Refused without reaching the network, summarized below instead of one log each
+                refused_count += 1
+                continue
+            status_code = 0 if result.error else result.status_code
+            if not api_log_model._should_log(status_code):
+                continue
+
+            environment_id, environment_name = self._resolve_log_environment(result.endpoint, result.params)
+
+            if result.error:
+                response_body = json.dumps({
+                    'error_type': result.error_type,
+                    'url': result.url,
+                    'method': result.method,
+                    'message': result.error,
+                }, separators=(',', ':'))
+            elif result.text or result.data is None:
+                response_body = result.text or ''
+            else:
+                # The response was already parsed, serialize it compactly
+                response_body = json.dumps(result.data, separators=(',', ':'), default=str)
+
+            api_log_model._log_request({
+                'server_id': self.id,
+                'endpoint': result.endpoint,
+                'method': result.method,
+                'environment_id': environment_id or False,
+                'environment_name': environment_name or '',
+                'request_date': result.request_date,
+                'status_code': status_code,
+                'response_time_ms': result.response_time_ms,
+                'error_message': response_body if (result.error or result.status_code >= 300) else False,
+            }, request_body=json.dumps({
+                'params': result.params,
+                'url': result.url,
+                'method': result.method,
+            }, separators=(',', ':'), default=str), response_body=response_body)
+
+        if refused_count:
+            _logger.warning(f"{refused_count} requests to Portainer server {self.name} refused by its open circuit")
+
+    def _fetch_error(self, result):
+        """Describe why a request of _fetch_many did not return its object"""
+        if result is None:
+            return 'not requested'
+        return result.error or result.text or f"HTTP {result.status_code}"
+
+    def _new_sync_snapshot(self):
+        """Create an empty resource snapshot for one sync run
+
+        The snapshot fetches the container, image, volume and network list of
+        each environment at most once and is shared by the sync methods that
+        receive it.
+
+        Returns:
+            SyncSnapshot: Snapshot bound to this server
+        """
+        self.ensure_one()
+        return SyncSnapshot(self)
+
+    def _sync_environment_domain(self, synced_environments, environment_id=None):
+        """Return the domain of the records reconciled by an environment resource sync
+
+        Records of environments whose resource list could not be fetched are
+        left untouched. A full sync also covers records of environments that no
+        longer belong to the server so that they get cleaned up.
+
+        Args:
+            synced_environments (recordset): Environments whose resources were fetched
+            environment_id (int, optional): Portainer environment ID the sync is limited to
+
+        Returns:
+            list: Domain on a model having server_id and environment_id fields
+        """
+        self.ensure_one()
+        if environment_id:
+            return [('server_id', '=', self.id), ('environment_id', 'in', synced_environments.ids)]
+        return [
+            ('server_id', '=', self.id),
+            '|',
+            ('environment_id', 'in', synced_environments.ids),
+            ('environment_id', 'not in', self.environment_ids.ids),
+        ]
+
     def sync_environments(self):
         """Sync environments from Portainer"""
         self.ensure_one()
@@ -641,9 +1105,7 @@ class PortainerServer(models.Model):
                 raise UserError(_("Failed to get environments: %s") % response.text)
 
             environments = response.json()
-            synced_env_ids = []  # Track which environment IDs we've synced
-            created_count = 0
-            updated_count = 0
+            env_vals_list = []
 
             for env in environments:
                 env_id = env.get('Id')
@@ -651,16 +1113,10 @@ class PortainerServer(models.Model):
 
                 # Get endpoint details
                 details_response = self._make_api_request(f'/api/endpoints/{env_id}', 'GET', environment_id=env_id)
-                details = details_response.json() if details_response.status_code == 200 else {}
-
-                # Check if environment already exists in Odoo
-                existing_env = self.env['j_portainer.environment'].search([
-                    ('server_id', '=', self.id),
-                    ('environment_id', '=', env_id)
-                ], limit=1)
+                details = details_response.json() if details_response.status_code == 200 else None
 
                 # Prepare environment data
-                env_data = {
+                env_vals_list.append({
                     'server_id': self.id,
                     'environment_id': env_id,
                     'name': env_name,
@@ -672,29 +1128,32 @@ class PortainerServer(models.Model):
                     'group_name': env.get('GroupName', ''),
                     'tags': ','.join(env.get('Tags', [])) if isinstance(env.get('Tags', []), list) else '',
                     'details': json.dumps(details, indent=2) if details else '',
-                }
-
-                if existing_env:
-                    # Update existing environment
-                    existing_env.write(env_data)
-                    updated_count += 1
-                    synced_env_ids.append(existing_env.id)
-                else:
-                    # Create new environment
-                    new_env = self.env['j_portainer.environment'].create(env_data)
-                    created_count += 1
-                    synced_env_ids.append(new_env.id)
+                    'active': True,
+                })
+                if details is None:
+                    # Keep the details already stored rather than blanking them
+                    del env_vals_list[-1]['details']
+                # Keep the Docker mode up to date from the latest snapshot, without querying the host
+                snapshots = env.get('Snapshots') or []
+                if snapshots and isinstance(snapshots[-1], dict) and 'Swarm' in snapshots[-1]:
+                    env_vals_list[-1]['docker_mode'] = 'swarm' if snapshots[-1]['Swarm'] else 'docker'
 
             # Mark environments that no longer exist in Portainer as inactive
             # Instead of deleting them (which would break foreign key constraints)
-            obsolete_envs = self.environment_ids.filtered(lambda e: e.id not in synced_env_ids)
-            if obsolete_envs:
-                obsolete_envs.write({'active': False})
-                _logger.info(f"Marked {len(obsolete_envs)} obsolete environments as inactive")
+            result = self.env['j_portainer.environment']._sync_reconcile(
+                [('server_id', '=', self.id)],
+                env_vals_list,
+                obsolete_vals={'active': False},
+            )
+            created_count = result.created_count
+            updated_count = result.updated_count
+            if result.removed_count:
+                _logger.info(f"Marked {result.removed_count} obsolete environments as inactive")
 
             # Update environment-specific last_sync timestamps
             now = fields.Datetime.now()
-            synced_environments = self.env['j_portainer.environment'].browse(synced_env_ids)
+            synced_environments = self.env['j_portainer.environment'].browse(
+                [record.id for record in result.records_by_key.values()])
             if synced_environments:
                 synced_environments.write({'last_sync': now})
 
@@ -721,59 +1180,117 @@ class PortainerServer(models.Model):
             _logger.error(f"Error syncing environments: {str(e)}")
             raise UserError(_("Error syncing environments: %s") % str(e))
 
-    def sync_containers(self, environment_id=None):
+    def sync_containers(self, environment_id=None, snapshot=None, container_ids=None, events_cursor=None):
         """Sync containers from Portainer
 
         Args:
             environment_id (int, optional): Environment ID to sync containers for.
                 If not provided, syncs containers for all environments.
+            snapshot (SyncSnapshot, optional): Resource snapshot shared by the sync run.
+                A new one is created if not provided.
+            container_ids (iterable, optional): Docker container IDs to refresh. Only
+                these containers are fetched and reconciled; the ones that no longer
+                exist are removed.
+            events_cursor (datetime, optional): Start of a full sync, set as the Docker events
+                cursor of the environments whose containers were all synced. Events of the other
+                environments are still applied by the next incremental sync.
         """
         self.ensure_one()
 
         try:
-            # Keep track of synced container IDs to mark missing ones as inactive
-            synced_container_ids = []
-
             # Get environments to sync
             if environment_id:
                 environments = self.environment_ids.filtered(lambda e: e.environment_id == environment_id)
             else:
                 environments = self.environment_ids
 
-            container_count = 0
-            updated_count = 0
-            created_count = 0
-
-            # Sync containers for each environment
+            env_container_lists = {}
+            if container_ids is not None:
+                # Targeted refresh: only list the requested containers
+                container_ids = list(container_ids)
+                list_results = self._fetch_many([
+                    FetchRequest(
+                        env.id,
+                        f"/api/endpoints/{env.environment_id}/docker/containers/json",
+                        {'all': True, 'filters': json.dumps({'id': container_ids})},
+                    ) for env in environments
+                ], max_workers=self.sync_environment_workers, timeout=SLOW_REQUEST_TIMEOUT)
+                for env in environments:
+                    list_result = list_results.get(env.id)
+                    if list_result.status_code == 200:
+                        env_container_lists[env.id] = list_result.data or []
+                    else:
+                        env_container_lists[env.id] = None
+                        _logger.warning(f"Failed to get containers for environment {env.name}: "
+                                        f"{list_result.text or list_result.error}")
+            else:
+                # Fetch container lists of all environments once for the whole run
+                snapshot = snapshot or self._new_sync_snapshot()
+                snapshot.load(environments, ['containers'])
+                for env in environments:
+                    env_snapshot = snapshot.get(env)
+                    env_container_lists[env.id] = env_snapshot.containers
+                    if env_snapshot.containers is None:
+                        _logger.warning(f"Failed to get containers for environment {env.name}: "
+                                        f"{env_snapshot.errors.get('containers')}")
+
+            env_containers = {}
+            detail_requests = []
             for env in environments:
-                endpoint_id = env.environment_id
+                if env_container_lists.get(env.id) is None:
+                    continue
+
+                env_containers[env.id] = env_container_lists[env.id]
+                for container in env_containers[env.id]:
+                    detail_requests.append(FetchRequest(
+                        (env.id, container.get('Id')),
+                        f"/api/endpoints/{env.environment_id}/docker/containers/{container.get('Id')}/json",
+                        None,
+                    ))
+
+            # Fetch container details concurrently, then write everything from this thread. Inspecting
+            # containers is much slower than most requests, it is not held to the adaptive timeout
+            detail_results = self._fetch_many(detail_requests, timeout=SLOW_REQUEST_TIMEOUT)
+            synced_environments = environments.filtered(lambda e: e.id in env_containers)
+
+            # Index images of the synced environments to link containers without one query each
+            images_by_key = {
+                (image.environment_id.id, image.image_id): image
+                for image in self.env['j_portainer.image'].search([
+                    ('server_id', '=', self.id),
+                    ('environment_id', 'in', synced_environments.ids),
+                ])
+            }
 
-                # Get all containers for this endpoint
-                response = self._make_api_request(f'/api/endpoints/{endpoint_id}/docker/containers/json', 'GET',
-                                                  params={'all': True})
+            # Index stacks of the synced environments to link containers without one query each
+            stack_index = StackNameIndex(self.env['j_portainer.stack'].search([
+                ('server_id', '=', self.id),
+                ('environment_id', 'in', synced_environments.ids),
+            ]))
 
-                if response.status_code != 200:
-                    _logger.warning(f"Failed to get containers for environment {env.name}: {response.text}")
-                    continue
+            container_vals_list = []
+            container_details = {}
+            # Containers whose details could not be fetched keep their records as they are
+            unfetched_keys = []
 
-                containers = response.json()
+            # Sync containers for each environment
+            for env in environments:
+                if env.id not in env_containers:
+                    continue
+                containers = env_containers[env.id]
 
                 for container in containers:
                     container_id = container.get('Id')
                     container_name = container.get('Names', ['Unknown'])[0].lstrip('/')
 
-                    # Check if container already exists in Odoo
-                    existing_container = self.env['j_portainer.container'].search([
-                        ('server_id', '=', self.id),
-                        ('environment_id', '=', env.id),
-                        ('container_id', '=', container_id)
-                    ], limit=1)
-
                     # Get container details
-                    details_response = self._make_api_request(
-                        f'/api/endpoints/{endpoint_id}/docker/containers/{container_id}/json', 'GET')
-
-                    details = details_response.json() if details_response.status_code == 200 else {}
+                    details_result = detail_results.get((env.id, container_id))
+                    if not fetch_succeeded(details_result):
+                        _logger.warning(f"Skipping container {container_name} of environment {env.name}, "
+                                        f"failed to get its details: {self._fetch_error(details_result)}")
+                        unfetched_keys.append((env.id, container_id))
+                        continue
+                    details = without_paths(details_result.data or {}, VOLATILE_CONTAINER_DETAIL_PATHS)
 
                     # Get container state
                     state = details.get('State', {})
@@ -802,21 +1319,7 @@ class PortainerServer(models.Model):
                         )
 
                         if stack_name:
-                            # Try exact match first - use the Odoo environment record ID
-                            stack = self.env['j_portainer.stack'].search([
-                                ('server_id', '=', self.id),
-                                ('environment_id', '=', env.id),
-                                ('name', '=', stack_name)
-                            ], limit=1)
-
-                            # If no exact match, try case-insensitive search
-                            if not stack:
-                                stack = self.env['j_portainer.stack'].search([
-                                    ('server_id', '=', self.id),
-                                    ('environment_id', '=', env.id),
-                                    ('name', 'ilike', stack_name)
-                                ], limit=1)
-
+                            stack = stack_index.match(env.id, stack_name)
                             if stack:
                                 stack_id = stack.id
                                 _logger.debug(
@@ -910,14 +1413,8 @@ class PortainerServer(models.Model):
                                     capabilities[field_name] = True
 
                     # Find or create image record for this container
-                    image_record = False
                     image_id_value = container.get('ImageID', '')
-                    if image_id_value:
-                        image_record = self.env['j_portainer.image'].search([
-                            ('server_id', '=', self.id),
-                            ('environment_id', '=', env.id),
-                            ('image_id', '=', image_id_value)
-                        ], limit=1)
+                    image_record = images_by_key.get((env.id, image_id_value)) if image_id_value else False
 
                     # Prepare data for create/update
                     container_data = {
@@ -992,75 +1489,51 @@ class PortainerServer(models.Model):
                         'cap_wake_alarm': capabilities.get('cap_wake_alarm', False)
                     }
 
-                    # Process container creation/update
-                    if existing_container:
-                        # Update existing container record
-                        existing_container.write(container_data)
-                        container_record = existing_container
-                        updated_count += 1
-                    else:
-                        # Create new container record - mark as sync operation
-                        container_record = self.env['j_portainer.container'].with_context(
-                            sync_from_portainer=True).create(container_data)
-                        created_count += 1
-
-                    # Process container labels as separate records
-                    # Smart sync labels using container's smart sync method
-                    labels_dict = container.get('Labels', {})
-                    container_record._smart_sync_labels(details)
-
-                    # Smart sync volumes using container's smart sync method
-                    container_record._smart_sync_volumes(details)
-
-                    # Smart sync networks using container's smart sync method
-                    container_record._smart_sync_networks(details)
-
-                    # Smart sync environment variables using container's smart sync method
-                    container_record._smart_sync_env_vars(details)
-
-                    # Smart sync ports using container's smart sync method
-                    container_record._smart_sync_ports(details)
-
-                    synced_container_ids.append((endpoint_id, container_id))
-                    container_count += 1
-
-            # Clean up containers that no longer exist in Portainer
-            # Get containers for this server (filtered by environment if specified)
-            if environment_id:
-                all_containers = self.env['j_portainer.container'].search([
-                    ('server_id', '=', self.id),
-                    ('environment_id.environment_id', '=', environment_id)
-                ])
-            else:
-                all_containers = self.env['j_portainer.container'].search([
-                    ('server_id', '=', self.id)
-                ])
-
-            # Filter containers that should be removed (not found in Portainer)
-            containers_to_remove = all_containers.filtered(
-                lambda c: (c.environment_id.environment_id, c.container_id) not in synced_container_ids
+                    container_vals_list.append(container_data)
+                    container_details[(env.id, container_id)] = details
+
+            # Reconcile container records with Portainer in one pass
+            domain = self._sync_environment_domain(synced_environments, environment_id)
+            if container_ids is not None:
+                domain = [('container_id', 'in', container_ids)] + domain
+            result = self.env['j_portainer.container']._sync_reconcile(
+                domain,
+                container_vals_list,
+                create_context={'sync_from_portainer': True},
+                write_context={'sync_from_portainer': True},
+                sync_date_field='last_sync',
+                kept_keys=unfetched_keys,
             )
+            container_count = result.total_count
+            created_count = result.created_count
+            updated_count = result.updated_count
+            removed_count = result.removed_count
+
+            # Containers whose digest did not change are skipped completely, the others
+            # only smart sync the child collections whose own section changed
+            unchanged_ids = set(result.unchanged.ids)
+            for key, details in container_details.items():
+                container_record = result.get(key)
+                if not container_record or container_record.id in unchanged_ids:
+                    continue
+                container_record._smart_sync_changed_sections(details)
 
-            # Remove obsolete containers
-            if containers_to_remove:
-                removed_count = len(containers_to_remove)
-                _logger.info(f"Removing {removed_count} obsolete containers from Odoo (already removed from Portainer)")
-                containers_to_remove.unlink()
-            else:
-                removed_count = 0
+            # Measure the volumes of running containers whose size check is due, in one batch
+            synced_containers = self.env['j_portainer.container'].browse([
+                result.get(key).id for key in container_details if result.get(key)
+            ])
+            synced_containers._auto_check_volume_sizes()
+
+            if events_cursor and container_ids is None:
+                unfetched_environment_ids = {key[0] for key in unfetched_keys}
+                synced_environments.filtered(lambda e: e.id not in unfetched_environment_ids).write({
+                    'events_cursor': events_cursor,
+                })
 
             # Log the statistics
             _logger.info(
                 f"Container sync complete: {container_count} total containers, {created_count} created, {updated_count} updated, {removed_count} removed")
 
-            # Update container-specific last_sync
-            now = fields.Datetime.now()
-            containers = self.env['j_portainer.container'].search([
-                ('server_id', '=', self.id)
-            ])
-            if containers:
-                containers.write({'last_sync': now})
-
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -1077,43 +1550,57 @@ class PortainerServer(models.Model):
             _logger.error(f"Error syncing containers: {str(e)}")
             raise UserError(_("Error syncing containers: %s") % str(e))
 
-    def sync_images(self, environment_id=None):
+    def sync_images(self, environment_id=None, snapshot=None):
         """Sync images from Portainer
 
         Args:
             environment_id (int, optional): Environment ID to sync images for.
                 If not provided, syncs images for all environments.
+            snapshot (SyncSnapshot, optional): Resource snapshot shared by the sync run.
+                A new one is created if not provided.
         """
         self.ensure_one()
 
         try:
-            # Keep track of synced image IDs
-            synced_image_ids = []
-
             # Get environments to sync
             if environment_id:
                 environments = self.environment_ids.filtered(lambda e: e.environment_id == environment_id)
             else:
                 environments = self.environment_ids
 
-            image_count = 0
-            updated_count = 0
-            created_count = 0
+            # Fetch image and container lists of all environments once for the whole run
+            snapshot = snapshot or self._new_sync_snapshot()
+            snapshot.load(environments, ['images', 'containers'])
 
-            # Sync images for each environment
+            env_images = {}
+            detail_requests = []
             for env in environments:
-                endpoint_id = env.environment_id
-
-                # Get all images for this endpoint
-                # response = self._make_api_request(f'/api/docker/{endpoint_id}/images', 'GET')
-                response = self._make_api_request(f'/api/endpoints/{endpoint_id}/docker/images/json', 'GET')
-                print('response, ', response)
-                if response.status_code != 200:
-                    _logger.warning(f"Failed to get images for environment {env.name}: {response.text}")
+                env_snapshot = snapshot.get(env)
+                if env_snapshot.images is None:
+                    _logger.warning(f"Failed to get images for environment {env.name}: "
+                                    f"{env_snapshot.errors.get('images')}")
                     continue
 
-                images = response.json()
-                print('images, ', images)
+                env_images[env.id] = env_snapshot.images
+                for image in env_images[env.id]:
+                    detail_requests.append(FetchRequest(
+                        (env.id, image.get('Id')),
+                        f"/api/endpoints/{env.environment_id}/docker/images/{image.get('Id')}/json",
+                        None,
+                    ))
+
+            # Fetch image details concurrently, then write everything from this thread
+            detail_results = self._fetch_many(detail_requests)
+            synced_environments = environments.filtered(lambda e: e.id in env_images)
+            image_vals_list = []
+            # Images whose details could not be fetched keep their records as they are
+            unfetched_keys = []
+
+            # Sync images for each environment
+            for env in environments:
+                if env.id not in env_images:
+                    continue
+                images = env_images[env.id]
 
                 for image in images:
                     image_id = image.get('Id')
@@ -1123,27 +1610,16 @@ class PortainerServer(models.Model):
                     repo_digests = image.get('RepoDigests', [])
 
                     # Get image details
-                    details_response = self._make_api_request(
-                        f'/api/endpoints/{endpoint_id}/docker/images/{image_id}/json', 'GET')
-
-                    details = details_response.json() if details_response.status_code == 200 else {}
-
-                    # Get containers to check if image is in use
-                    containers_response = self._make_api_request(
-                        f'/api/endpoints/{endpoint_id}/docker/containers/json', 'GET',
-                        params={'all': True}  # Get all containers, including stopped ones
-                    )
-
-                    containers = containers_response.json() if containers_response.status_code == 200 else []
+                    details_result = detail_results.get((env.id, image_id))
+                    if not fetch_succeeded(details_result):
+                        _logger.warning(f"Skipping image {image_id} of environment {env.name}, "
+                                        f"failed to get its details: {self._fetch_error(details_result)}")
+                        unfetched_keys.append((env.id, image_id))
+                        continue
+                    details = details_result.data or {}
 
-                    # Check if this image is used by any container
-                    in_use = False
-                    for container in containers:
-                        container_image_id = container.get('ImageID', '')
-                        # Docker sometimes uses short IDs in containers, so check if the image ID is contained
-                        if image_id in container_image_id or container_image_id in image_id:
-                            in_use = True
-                            break
+                    # Check if this image is used by any container (all containers, including stopped ones)
+                    in_use = bool(snapshot.get(env).containers_for_image(image_id))
 
                     # Prepare base image data
                     # Use size values directly from the API response without any conversion
@@ -1170,13 +1646,6 @@ class PortainerServer(models.Model):
                         else:
                             primary_repository, primary_tag = primary_repo, 'latest'
 
-                        # Check if this image already exists in Odoo
-                        existing_image = self.env['j_portainer.image'].search([
-                            ('server_id', '=', self.id),
-                            ('environment_id', '=', env.id),
-                            ('image_id', '=', image_id)
-                        ], limit=1)
-
                         # Prepare all tags information
                         tag_list = []
                         for repo in repos:
@@ -1190,30 +1659,14 @@ class PortainerServer(models.Model):
                                 'tag': tag_name
                             })
 
-                        # Get enhanced layer information using Docker Image History API
-                        enhanced_layers = self._get_enhanced_image_layers(endpoint_id, image_id)
-
                         # Prepare image data with primary repository and tag plus all tags
                         image_data = dict(base_image_data)
                         image_data.update({
                             'repository': primary_repository,
                             'tag': primary_tag,
                             'all_tags': json.dumps(tag_list),
-                            'enhanced_layers_data': json.dumps(enhanced_layers) if enhanced_layers else ''
                         })
-
-                        if existing_image:
-                            # Update existing image record
-                            existing_image.write(image_data)
-                            updated_count += 1
-                        else:
-                            # Create new image record
-                            self.env['j_portainer.image'].with_context(sync_operation=True).create(image_data)
-                            created_count += 1
-
-                        image_count += 1
-                        # Add all combinations to synced_image_ids to prevent cleanup of valid images
-                        synced_image_ids.append((image_id, primary_repository, primary_tag))
+                        image_vals_list.append(image_data)
                     elif repo_digests:
                         # Image has digests but no tags - extract repository from digest
                         # Format is usually repo@sha256:hash
@@ -1222,51 +1675,23 @@ class PortainerServer(models.Model):
                                 repository = digest.split('@')[0]
                                 tag = '<none>'  # Use '<none>' as tag for images with digest only to match Portainer
 
-                                # Check if this image already exists in Odoo
-                                existing_image = self.env['j_portainer.image'].search([
-                                    ('server_id', '=', self.id),
-                                    ('environment_id', '=', env.id),
-                                    ('image_id', '=', image_id)
-                                ], limit=1)
-
                                 # Prepare tag information
                                 tag_list = [{
                                     'repository': repository,
                                     'tag': tag
                                 }]
 
-                                # Get enhanced layer information using Docker Image History API
-                                enhanced_layers = self._get_enhanced_image_layers(endpoint_id, image_id)
-
                                 # Prepare specific image data with repository from digest
                                 image_data = dict(base_image_data)
                                 image_data.update({
                                     'repository': repository,
                                     'tag': tag,
                                     'all_tags': json.dumps(tag_list),
-                                    'enhanced_layers_data': json.dumps(enhanced_layers) if enhanced_layers else ''
                                 })
-
-                                if existing_image:
-                                    # Update existing image record
-                                    existing_image.write(image_data)
-                                    updated_count += 1
-                                else:
-                                    # Create new image record
-                                    self.env['j_portainer.image'].with_context(sync_operation=True).create(image_data)
-                                    created_count += 1
-
-                                image_count += 1
-                                synced_image_ids.append((image_id, repository, tag))
+                                image_vals_list.append(image_data)
                                 break  # Just use the first digest
                     else:
                         # Truly untagged image with no digests either
-                        # Check if this untagged image already exists in Odoo
-                        existing_image = self.env['j_portainer.image'].search([
-                            ('server_id', '=', self.id),
-                            ('environment_id', '=', env.id),
-                            ('image_id', '=', image_id)
-                        ], limit=1)
 
                         # Prepare tag information for untagged image
                         tag_list = [{
@@ -1281,61 +1706,34 @@ class PortainerServer(models.Model):
                             'tag': '<none>',
                             'all_tags': json.dumps(tag_list)
                         })
-
-                        if existing_image:
-                            # Update existing image record
-                            existing_image.write(image_data)
-                            updated_count += 1
-                        else:
-                            # Create new image record
-                            self.env['j_portainer.image'].with_context(sync_operation=True).create(image_data)
-                            created_count += 1
-
-                        image_count += 1
-                        synced_image_ids.append((image_id, '<none>', '<none>'))
-
-            # Clean up images that no longer exist in Portainer
-            # Get images for this server (filtered by environment if specified)
-            if environment_id:
-                all_images = self.env['j_portainer.image'].search([
-                    ('server_id', '=', self.id),
-                    ('environment_id.environment_id', '=', environment_id)
-                ])
-            else:
-                all_images = self.env['j_portainer.image'].search([
-                    ('server_id', '=', self.id)
-                ])
-
-            # Collect all synced image IDs (without repository/tag)
-            synced_ids = set()
-            for image_tuple in synced_image_ids:
-                synced_ids.add(image_tuple[0])  # Just extract the image_id part
-
-            # Filter images that should be removed (not found in Portainer)
-            images_to_remove = all_images.filtered(
-                lambda img: img.image_id not in synced_ids
+                        image_vals_list.append(image_data)
+
+            # Reconcile image records with Portainer, removing images that no longer exist
+            result = self.env['j_portainer.image']._sync_reconcile(
+                self._sync_environment_domain(synced_environments, environment_id),
+                image_vals_list,
+                create_context={'sync_operation': True},
+                sync_date_field='last_sync',
+                kept_keys=unfetched_keys,
             )
-
-            # Remove obsolete images
-            if images_to_remove:
-                removed_count = len(images_to_remove)
-                _logger.info(f"Removing {removed_count} obsolete images from Odoo (already removed from Portainer)")
-                images_to_remove.unlink()
-            else:
-                removed_count = 0
+            image_count = result.total_count
+            created_count = result.created_count
+            updated_count = result.updated_count
+            removed_count = result.removed_count
+
+            # Layer histories are fetched when an image is displayed, or by a
+            # background job for new images when sync jobs are available
+            if result.created and self._use_job_graph():
+                result.created.delayable(
+                    channel=self.sync_job_channel,
+                    priority=30,
+                    description=f"Portainer {self.name}: cache image layer history",
+                )._prefetch_layer_history().delay()
 
             # Log the statistics
             _logger.info(
                 f"Image sync complete: {image_count} total images, {created_count} created, {updated_count} updated, {removed_count} removed")
 
-            # Update image-specific last_sync
-            now = fields.Datetime.now()
-            images = self.env['j_portainer.image'].search([
-                ('server_id', '=', self.id)
-            ])
-            if images:
-                images.write({'last_sync': now})
-
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -1352,122 +1750,73 @@ class PortainerServer(models.Model):
             _logger.error(f"Error syncing images: {str(e)}")
             raise UserError(_("Error syncing images: %s") % str(e))
 
-    def _get_enhanced_image_layers(self, environment_id, image_id):
-        """
-        Get enhanced layer information using Docker Image History API
-
-        Args:
-            environment_id (int): Environment ID
-            image_id (str): Docker image ID
-
-        Returns:
-            list: Enhanced layer information with commands, sizes, and metadata
-        """
-        try:
-            # Use the API client to get image history
-            api = self.env['j_portainer.api']
-            history_layers = api.get_image_history(self.id, environment_id, image_id)
-
-            if history_layers:
-                _logger.info(f"Retrieved {len(history_layers)} enhanced layers for image {image_id}")
-                return history_layers
-            else:
-                _logger.warning(f"No enhanced layers retrieved for image {image_id}, keeping existing layer data")
-                return None
-
-        except Exception as e:
-            _logger.error(f"Error getting enhanced layers for image {image_id}: {str(e)}")
-            return None
-
-    def sync_volumes(self, environment_id=None):
+    def sync_volumes(self, environment_id=None, snapshot=None):
         """Sync volumes from Portainer
 
         Args:
             environment_id (int, optional): Environment ID to sync volumes for.
                 If not provided, syncs volumes for all environments.
+            snapshot (SyncSnapshot, optional): Resource snapshot shared by the sync run.
+                A new one is created if not provided.
         """
         self.ensure_one()
 
         try:
-            # Keep track of synced volumes
-            synced_volume_names = []
-
             # Get environments to sync
             if environment_id:
                 environments = self.environment_ids.filtered(lambda e: e.environment_id == environment_id)
             else:
                 environments = self.environment_ids
 
-            volume_count = 0
-            updated_count = 0
-            created_count = 0
+            # Fetch volume and container lists of all environments once for the whole run
+            snapshot = snapshot or self._new_sync_snapshot()
+            snapshot.load(environments, ['volumes', 'containers'])
 
-            # Sync volumes for each environment
+            env_volumes = {}
+            detail_requests = []
             for env in environments:
-                endpoint_id = env.environment_id
+                env_snapshot = snapshot.get(env)
+                if env_snapshot.volumes is None:
+                    _logger.warning(f"Failed to get volumes for environment {env.name}: "
+                                    f"{env_snapshot.errors.get('volumes')}")
+                    continue
 
-                # Get all volumes for this endpoint
-                response = self._make_api_request(f'/api/endpoints/{endpoint_id}/docker/volumes', 'GET')
+                env_volumes[env.id] = env_snapshot.volumes
+                for volume in env_volumes[env.id]:
+                    detail_requests.append(FetchRequest(
+                        (env.id, volume.get('Name')),
+                        f"/api/endpoints/{env.environment_id}/docker/volumes/{volume.get('Name')}",
+                        None,
+                    ))
+
+            # Fetch volume details concurrently, then write everything from this thread
+            detail_results = self._fetch_many(detail_requests)
+            synced_environments = environments.filtered(lambda e: e.id in env_volumes)
+            volume_vals_list = []
+            # Volumes whose details could not be fetched keep their records as they are
+            unfetched_keys = []
 
-                if response.status_code != 200:
-                    _logger.warning(f"Failed to get volumes for environment {env.name}: {response.text}")
+            # Sync volumes for each environment
+            for env in environments:
+                if env.id not in env_volumes:
                     continue
-
-                volumes_data = response.json()
-                print('volumes_data .... ', volumes_data)
-                volumes = volumes_data.get('Volumes', [])
-                print('volumes .... ', volumes)
+                volumes = env_volumes[env.id]
 
                 for volume in volumes:
                     volume_name = volume.get('Name')
 
-                    # Check if this volume already exists in Odoo
-                    existing_volume = self.env['j_portainer.volume'].search([
-                        ('server_id', '=', self.id),
-                        ('environment_id.environment_id', '=', endpoint_id),
-                        ('name', '=', volume_name)
-                    ], limit=1)
-
                     # Get detailed info for this volume
-                    details_response = self._make_api_request(
-                        f'/api/endpoints/{endpoint_id}/docker/volumes/{volume_name}', 'GET')
-
-                    details = details_response.json() if details_response.status_code == 200 else {}
-
-                    # Get containers to check if volume is in use
-                    containers_response = self._make_api_request(
-                        f'/api/endpoints/{endpoint_id}/docker/containers/json', 'GET',
-                        params={'all': True}  # Get all containers, including stopped ones
-                    )
-
-                    containers = containers_response.json() if containers_response.status_code == 200 else []
-
-                    # Check if this volume is used by any container
-                    in_use = False
-                    connected_containers = []
-                    for container in containers:
-                        mounts = container.get('Mounts', [])
-                        for mount in mounts:
-                            # Check for volume mounts (named volumes)
-                            if mount.get('Type') == 'volume' and mount.get('Name') == volume_name:
-                                in_use = True
-                                connected_containers.append({
-                                    'container_name': container.get('Names', [''])[0].lstrip('/'),
-                                    'container_id': container.get('Id', ''),
-                                    'destination': mount.get('Destination', ''),
-                                    'mode': mount.get('Mode', 'rw')
-                                })
-                            # Also check for bind mounts where source matches volume mountpoint
-                            elif mount.get('Type') == 'bind' and mount.get('Source') == volume.get('Mountpoint'):
-                                in_use = True
-                                connected_containers.append({
-                                    'container_name': container.get('Names', [''])[0].lstrip('/'),
-                                    'container_id': container.get('Id', ''),
-                                    'destination': mount.get('Destination', ''),
-                                    'mode': mount.get('Mode', 'rw')
-                                })
-                        if in_use:
-                            break
+                    details_result = detail_results.get((env.id, volume_name))
+                    if not fetch_succeeded(details_result):
+                        _logger.warning(f"Skipping volume {volume_name} of environment {env.name}, "
+                                        f"failed to get its details: {self._fetch_error(details_result)}")
+                        unfetched_keys.append((env.id, volume_name))
+                        continue
+                    details = details_result.data or {}
+
+                    # Check if this volume is used by any container, either as a named volume
+                    # or as a bind mount of the volume mountpoint (all containers, including stopped ones)
+                    in_use = bool(snapshot.get(env).mounts_for_volume(volume_name, volume.get('Mountpoint')))
 
                     # Prepare volume data
                     volume_data = {
@@ -1483,55 +1832,25 @@ class PortainerServer(models.Model):
                         'in_use': in_use,  # Add in_use field based on container usage
                     }
 
-                    if existing_volume:
-                        # Update existing volume - don't update created date for existing records
-                        existing_volume.write(volume_data)
-                        updated_count += 1
-                    else:
-                        # Create new volume record - mark as sync operation
-                        self.env['j_portainer.volume'].with_context(sync_from_portainer=True).create(volume_data)
-                        created_count += 1
-
-                    synced_volume_names.append((endpoint_id, volume_name))
-                    volume_count += 1
-
-            # Clean up volumes that no longer exist in Portainer
-            # Get volumes for this server (filtered by environment if specified)
-            if environment_id:
-                all_volumes = self.env['j_portainer.volume'].search([
-                    ('server_id', '=', self.id),
-                    ('environment_id.environment_id', '=', environment_id)
-                ])
-            else:
-                all_volumes = self.env['j_portainer.volume'].search([
-                    ('server_id', '=', self.id)
-                ])
+                    volume_vals_list.append(volume_data)
 
-            # Filter volumes that should be removed (not found in Portainer)
-            volumes_to_remove = all_volumes.filtered(
-                lambda v: (v.environment_id.environment_id, v.name) not in synced_volume_names
+            # Reconcile volume records with Portainer, removing volumes that no longer exist
+            result = self.env['j_portainer.volume']._sync_reconcile(
+                self._sync_environment_domain(synced_environments, environment_id),
+                volume_vals_list,
+                create_context={'sync_from_portainer': True},
+                sync_date_field='last_sync',
+                kept_keys=unfetched_keys,
             )
-
-            # Remove obsolete volumes
-            if volumes_to_remove:
-                removed_count = len(volumes_to_remove)
-                _logger.info(f"Removing {removed_count} obsolete volumes from Odoo (already removed from Portainer)")
-                volumes_to_remove.unlink()
-            else:
-                removed_count = 0
+            volume_count = result.total_count
+            created_count = result.created_count
+            updated_count = result.updated_count
+            removed_count = result.removed_count
 
             # Log the statistics
             _logger.info(
                 f"Volume sync complete: {volume_count} total volumes, {created_count} created, {updated_count} updated, {removed_count} removed")
 
-            # Update volume-specific last_sync
-            now = fields.Datetime.now()
-            volumes = self.env['j_portainer.volume'].search([
-                ('server_id', '=', self.id)
-            ])
-            if volumes:
-                volumes.write({'last_sync': now})
-
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -1548,57 +1867,70 @@ class PortainerServer(models.Model):
             _logger.error(f"Error syncing volumes: {str(e)}")
             raise UserError(_("Error syncing volumes: %s") % str(e))
 
-    def sync_networks(self, environment_id=None):
+    def sync_networks(self, environment_id=None, snapshot=None):
         """Sync networks from Portainer
 
         Args:
             environment_id (int, optional): Environment ID to sync networks for.
                 If not provided, syncs networks for all environments.
+            snapshot (SyncSnapshot, optional): Resource snapshot shared by the sync run.
+                A new one is created if not provided.
         """
         self.ensure_one()
 
         try:
-            # Keep track of synced networks
-            synced_network_ids = []
-
             # Get environments to sync
             if environment_id:
                 environments = self.environment_ids.filtered(lambda e: e.environment_id == environment_id)
             else:
                 environments = self.environment_ids
 
-            network_count = 0
-            updated_count = 0
-            created_count = 0
+            # Fetch network lists of all environments once for the whole run
+            snapshot = snapshot or self._new_sync_snapshot()
+            snapshot.load(environments, ['networks'])
 
-            # Sync networks for each environment
+            env_networks = {}
+            detail_requests = []
             for env in environments:
-                endpoint_id = env.environment_id
+                env_snapshot = snapshot.get(env)
+                if env_snapshot.networks is None:
+                    _logger.warning(f"Failed to get networks for environment {env.name}: "
+                                    f"{env_snapshot.errors.get('networks')}")
+                    continue
 
-                # Get all networks for this endpoint
-                response = self._make_api_request(f'/api/endpoints/{endpoint_id}/docker/networks', 'GET')
+                env_networks[env.id] = env_snapshot.networks
+                for network in env_networks[env.id]:
+                    detail_requests.append(FetchRequest(
+                        (env.id, network.get('Id')),
+                        f"/api/endpoints/{env.environment_id}/docker/networks/{network.get('Id')}",
+                        None,
+                    ))
+
+            # Fetch network details concurrently, then write everything from this thread
+            detail_results = self._fetch_many(detail_requests)
+            synced_environments = environments.filtered(lambda e: e.id in env_networks)
+            network_vals_list = []
+            network_children = {}
+            # Networks whose details could not be fetched keep their records and children as they are
+            unfetched_keys = []
 
-                if response.status_code != 200:
-                    _logger.warning(f"Failed to get networks for environment {env.name}: {response.text}")
+            # Sync networks for each environment
+            for env in environments:
+                if env.id not in env_networks:
                     continue
-
-                networks = response.json()
+                networks = env_networks[env.id]
 
                 for network in networks:
                     network_id = network.get('Id')
 
-                    # Check if this network already exists in Odoo
-                    existing_network = self.env['j_portainer.network'].search([
-                        ('server_id', '=', self.id),
-                        ('environment_id', '=', env.id),
-                        ('network_id', '=', network_id)
-                    ], limit=1)
-
                     # Get detailed info for this network
-                    details_response = self._make_api_request(
-                        f'/api/endpoints/{endpoint_id}/docker/networks/{network_id}', 'GET')
-
-                    details = details_response.json() if details_response.status_code == 200 else {}
+                    details_result = detail_results.get((env.id, network_id))
+                    if not fetch_succeeded(details_result):
+                        _logger.warning(f"Skipping network {network.get('Name', network_id)} of environment "
+                                        f"{env.name}, failed to get its details: {self._fetch_error(details_result)}")
+                        unfetched_keys.append((env.id, network_id))
+                        continue
+                    details = details_result.data or {}
 
                     # Handle potential None values in nested dictionaries
                     ipam_data = network.get('IPAM') or {}
@@ -1635,20 +1967,9 @@ class PortainerServer(models.Model):
                         'isolated_network': details.get('Internal', False),  # Internal networks are isolated
                     }
 
-                    # Create or update the main network record
-                    if existing_network:
-                        # Update existing network record
-                        existing_network.write(network_data)
-                        network_record = existing_network
-                        updated_count += 1
-                    else:
-                        # Create new network record
-                        network_record = self.env['j_portainer.network'].create(network_data)
-                        created_count += 1
-
                     # Process IPv4 and IPv6 configuration from IPAM
-                    ipam_data = network.get('IPAM', {}) or {}
                     ipam_config = ipam_data.get('Config', []) or []
+                    excluded_ips_by_version = {}
 
                     # Process IPv4 and IPv6 configuration fields
                     for config in ipam_config:
@@ -1656,130 +1977,68 @@ class PortainerServer(models.Model):
                         gateway = config.get('Gateway', '')
                         ip_range = config.get('IPRange', '')
 
-                        # Determine if this is IPv4 or IPv6 config
-                        if subnet and ':' in subnet:  # IPv6 contains colons
-                            network_record.write({
-                                'ipv6_subnet': subnet,
-                                'ipv6_gateway': gateway,
-                                'ipv6_range': ip_range,
-                            })
-
-                            # Process excluded IPs if present
-                            excluded_ips = config.get('ExcludedIPs', []) or []
-                            if excluded_ips:
-                                # Remove existing excluded IPs
-                                existing_excluded = self.env['j_portainer.network.ipv6.excluded'].search([
-                                    ('network_id', '=', network_record.id)
-                                ])
-                                if existing_excluded:
-                                    existing_excluded.unlink()
-
-                                # Create new excluded IPs
-                                for ip in excluded_ips:
-                                    self.env['j_portainer.network.ipv6.excluded'].create({
-                                        'network_id': network_record.id,
-                                        'ip_address': ip
-                                    })
-                        else:  # IPv4
-                            network_record.write({
-                                'ipv4_subnet': subnet,
-                                'ipv4_gateway': gateway,
-                                'ipv4_range': ip_range,
-                            })
-
-                            # Process excluded IPs if present
-                            excluded_ips = config.get('ExcludedIPs', []) or []
-                            if excluded_ips:
-                                # Remove existing excluded IPs
-                                existing_excluded = self.env['j_portainer.network.ipv4.excluded'].search([
-                                    ('network_id', '=', network_record.id)
-                                ])
-                                if existing_excluded:
-                                    existing_excluded.unlink()
-
-                                # Create new excluded IPs
-                                for ip in excluded_ips:
-                                    self.env['j_portainer.network.ipv4.excluded'].create({
-                                        'network_id': network_record.id,
-                                        'ip_address': ip
-                                    })
-
-                    # Process driver options
-                    options_data = details.get('Options', {}) or {}
-                    if options_data:
-                        # Remove existing driver options
-                        existing_options = self.env['j_portainer.network.driver.option'].search([
-                            ('network_id', '=', network_record.id)
-                        ])
-                        if existing_options:
-                            existing_options.unlink()
-
-                        # Create new driver options
-                        for option_name, option_value in options_data.items():
-                            self.env['j_portainer.network.driver.option'].create({
-                                'network_id': network_record.id,
-                                'name': option_name,
-                                'value': str(option_value)  # Convert any non-string values to string
-                            })
+                        # Determine if this is IPv4 or IPv6 config (IPv6 contains colons)
+                        version = 'ipv6' if subnet and ':' in subnet else 'ipv4'
+                        network_data.update({
+                            f'{version}_subnet': subnet,
+                            f'{version}_gateway': gateway,
+                            f'{version}_range': ip_range,
+                        })
 
-                    # Process network labels
-                    labels_data = network.get('Labels', {}) or {}
-                    if labels_data:
-                        # Remove existing network labels
-                        existing_labels = self.env['j_portainer.network.label'].search([
-                            ('network_id', '=', network_record.id)
-                        ])
-                        if existing_labels:
-                            existing_labels.unlink()
-
-                        # Create new network labels
-                        for label_name, label_value in labels_data.items():
-                            self.env['j_portainer.network.label'].create({
-                                'network_id': network_record.id,
-                                'name': label_name,
-                                'value': str(label_value)  # Convert any non-string values to string
-                            })
+                        # Process excluded IPs if present
+                        excluded_ips = config.get('ExcludedIPs', []) or []
+                        if excluded_ips:
+                            excluded_ips_by_version[version] = excluded_ips
 
-                    synced_network_ids.append((env.id, network_id))
-                    network_count += 1
+                    network_vals_list.append(network_data)
+                    network_children[(env.id, network_id)] = (excluded_ips_by_version, details, network)
 
-            # Clean up networks that no longer exist in Portainer
-            # Get networks for this server (filtered by environment if specified)
-            if environment_id:
-                all_networks = self.env['j_portainer.network'].search([
-                    ('server_id', '=', self.id),
-                    ('environment_id.environment_id', '=', environment_id)
-                ])
-            else:
-                all_networks = self.env['j_portainer.network'].search([
-                    ('server_id', '=', self.id)
-                ])
-
-            # Filter networks that should be removed (not found in Portainer)
-            networks_to_remove = all_networks.filtered(
-                lambda n: (n.environment_id.id, n.network_id) not in synced_network_ids
+            # Reconcile network records with Portainer, removing networks that no longer exist
+            result = self.env['j_portainer.network']._sync_reconcile(
+                self._sync_environment_domain(synced_environments, environment_id),
+                network_vals_list,
+                sync_date_field='last_sync',
+                kept_keys=unfetched_keys,
             )
+            network_count = result.total_count
+            created_count = result.created_count
+            updated_count = result.updated_count
+            removed_count = result.removed_count
+
+            # Child collections of networks whose digest did not change are left untouched,
+            # the others only apply the difference with the stored children
+            unchanged_ids = set(result.unchanged.ids)
+            desired_children = {fname: {} for fname in NETWORK_CHILD_COLLECTIONS}
+            for key, (excluded_ips_by_version, details, network) in network_children.items():
+                network_record = result.get(key)
+                if not network_record or network_record.id in unchanged_ids:
+                    continue
 
-            # Remove obsolete networks
-            if networks_to_remove:
-                removed_count = len(networks_to_remove)
-                _logger.info(f"Removing {removed_count} obsolete networks from Odoo (already removed from Portainer)")
-                networks_to_remove.unlink()
-            else:
-                removed_count = 0
+                for version in ('ipv4', 'ipv6'):
+                    desired_children[f'{version}_excluded_ids'][network_record.id] = [
+                        {'ip_address': ip} for ip in excluded_ips_by_version.get(version, [])
+                    ]
+                # Convert any non-string option and label values to string
+                desired_children['driver_option_ids'][network_record.id] = [
+                    {'name': option_name, 'value': str(option_value)}
+                    for option_name, option_value in (details.get('Options') or {}).items()
+                ]
+                desired_children['network_label_ids'][network_record.id] = [
+                    {'name': label_name, 'value': str(label_value)}
+                    for label_name, label_value in (network.get('Labels') or {}).items()
+                ]
+
+            networks = self.env['j_portainer.network']
+            for fname, key_fields in NETWORK_CHILD_COLLECTIONS.items():
+                counts = networks._sync_child_collection(fname, desired_children[fname], key_fields)
+                if any(counts.values()):
+                    _logger.debug(f"Network {fname} synced: {counts['created']} created, "
+                                  f"{counts['updated']} updated, {counts['removed']} removed")
 
             # Log the statistics
             _logger.info(
                 f"Network sync complete: {network_count} total networks, {created_count} created, {updated_count} updated, {removed_count} removed")
 
-            # Update network-specific last_sync
-            now = fields.Datetime.now()
-            networks = self.env['j_portainer.network'].search([
-                ('server_id', '=', self.id)
-            ])
-            if networks:
-                networks.write({'last_sync': now})
-
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -1796,50 +2055,58 @@ class PortainerServer(models.Model):
             _logger.error(f"Error syncing networks: {str(e)}")
             raise UserError(_("Error syncing networks: %s") % str(e))
 
-    def _detect_environment_type(self, environment_id):
-        """Detect if environment is Docker standalone or Docker Swarm"""
-        try:
-            # Get Docker info to check Swarm status
-            response = self._make_api_request(f'/api/endpoints/{environment_id}/docker/info', 'GET')
+    def _get_environment_types(self, environments):
+        """Return the Docker mode of environments, detecting the unknown ones once
 
-            if response.status_code == 200:
-                docker_info = response.json()
+        The mode is cached on the environment. Environments without a cached
+        mode are detected concurrently from their Docker info; a failed
+        detection defaults to Docker and is not cached.
 
-                # Check Swarm status
-                swarm_info = docker_info.get('Swarm', {})
-                node_id = swarm_info.get('NodeID', '')
-
-                # If NodeID exists and is not empty, it's a Swarm environment
-                if node_id and node_id.strip():
-                    _logger.info(f"Environment {environment_id} detected as Docker Swarm")
-                    return 'swarm'
-                else:
-                    _logger.info(f"Environment {environment_id} detected as Docker standalone")
-                    return 'docker'
-            else:
-                _logger.warning(f"Failed to detect environment type for {environment_id}, defaulting to Docker")
-                return 'docker'
+        Args:
+            environments (recordset): j_portainer.environment records
 
-        except Exception as e:
-            _logger.error(f"Error detecting environment type for {environment_id}: {str(e)}")
-            return 'docker'  # Default to Docker on error
+        Returns:
+            dict: 'docker' or 'swarm' per environment record ID
+        """
+        self.ensure_one()
+        environment_types = {env.id: env.docker_mode for env in environments if env.docker_mode}
+
+        undetected = environments.filtered(lambda env: not env.docker_mode)
+        results = self._fetch_many([
+            FetchRequest(env.id, f'/api/endpoints/{env.environment_id}/docker/info', None)
+            for env in undetected
+        ])
+        detected = {'docker': [], 'swarm': []}
+        for env in undetected:
+            result = results.get(env.id)
+            if not result or result.status_code != 200 or not isinstance(result.data, dict):
+                _logger.warning(f"Failed to detect environment type for {env.environment_id}, defaulting to Docker")
+                environment_types[env.id] = 'docker'
+                continue
+
+            # If NodeID exists and is not empty, it's a Swarm environment
+            node_id = (result.data.get('Swarm') or {}).get('NodeID') or ''
+            env_type = 'swarm' if node_id.strip() else 'docker'
+            _logger.info(f"Environment {env.environment_id} detected as "
+                         f"{'Docker Swarm' if env_type == 'swarm' else 'Docker standalone'}")
+            environment_types[env.id] = env_type
+            detected[env_type].append(env.id)
+
+        for env_type, env_ids in detected.items():
+            if env_ids:
+                self.env['j_portainer.environment'].browse(env_ids).write({'docker_mode': env_type})
+        return environment_types
 
     def sync_standard_templates(self):
         """Sync standard application templates from Portainer"""
         self.ensure_one()
 
         try:
-            # Keep track of synced templates
-            synced_template_ids = []
-
-            # Detect environment types for filtering templates
-            environment_types = {}
-            for env in self.environment_ids:
-                env_type = self._detect_environment_type(env.environment_id)
-                environment_types[env.environment_id] = env_type
+            # Templates are filtered once per distinct environment type of the server
+            environment_types = set(self._get_environment_types(self.environment_ids).values())
 
             # Get templates
-            response = self._make_api_request('/api/templates', 'GET')
+            response = self._make_api_request('/api/templates', 'GET', timeout=SLOW_REQUEST_TIMEOUT)
 
             if response.status_code != 200:
                 raise UserError(_("Failed to get templates: %s") % response.text)
@@ -1862,9 +2129,7 @@ class PortainerServer(models.Model):
                     _logger.warning(f"Template response keys: {list(response_data.keys())}")
                 templates = []
 
-            template_count = 0
-            updated_count = 0
-            created_count = 0
+            template_vals_list = []
 
             for template in templates:
                 # Skip if template is not a dictionary (sometimes API returns strings)
@@ -1876,16 +2141,8 @@ class PortainerServer(models.Model):
                 template_type = template.get('type', 1)
 
                 # Check if any environment can use this template
-                template_compatible = False
-                for env_id, env_type in environment_types.items():
-                    if env_type == 'swarm':
-                        # Swarm environments support all template types (1, 2, 3)
-                        template_compatible = True
-                        break
-                    elif env_type == 'docker' and template_type != 2:
-                        # Docker environments support container (1) and compose stack (3) templates, but not Swarm stacks (2)
-                        template_compatible = True
-                        break
+                template_compatible = any(template_type not in UNSUPPORTED_TEMPLATE_TYPES[env_type]
+                                          for env_type in environment_types)
 
                 if not template_compatible:
                     _logger.info(
@@ -1894,14 +2151,6 @@ class PortainerServer(models.Model):
 
                 template_id = template.get('id')
 
-                # Check if this template already exists in Odoo
-                existing_template = False
-                if template_id:
-                    existing_template = self.env['j_portainer.template'].search([
-                        ('server_id', '=', self.id),
-                        ('template_id', '=', template_id)
-                    ], limit=1)
-
                 # Prepare template data
                 template_data = {
                     'server_id': self.id,
@@ -1923,62 +2172,30 @@ class PortainerServer(models.Model):
                     'note': template.get('note', ''),
                     'is_custom': False,
                     'details': json.dumps(template, indent=2),
+                    # Skip Portainer creation since we're just syncing
+                    'skip_portainer_create': True,
                 }
 
-                if existing_template:
-                    # Update existing template
-                    existing_template.with_context(from_sync=True, skip_portainer_update=True).write(template_data)
-                    updated_count += 1
-                else:
-                    # Create new template - skip Portainer creation since we're just syncing
-                    template_data['skip_portainer_create'] = True
-                    self.env['j_portainer.template'].with_context(from_sync=True, skip_portainer_create=True).create(
-                        template_data)
-                    created_count += 1
-
-                if isinstance(template_id, (int, str)) and str(template_id).isdigit():
-                    synced_template_ids.append(int(template_id))
-                template_count += 1
-
-            # Clean up templates that no longer exist in Portainer
-            # Get all standard templates for this server
-            all_templates = self.env['j_portainer.template'].search([
-                ('server_id', '=', self.id),
-                ('is_custom', '=', False)
-            ])
+                template_vals_list.append(template_data)
 
-            # Make sure all IDs are integers for proper comparison
-            synced_ids = []
-            for template_id in synced_template_ids:
-                if isinstance(template_id, int) or (isinstance(template_id, str) and template_id.isdigit()):
-                    synced_ids.append(int(template_id))
-
-            # Templates to remove - those not in synced_template_ids
-            # Handle template_id type conversion for comparison (some might be strings, some integers)
-            templates_to_remove = all_templates.filtered(
-                lambda t: (int(t.template_id) not in synced_ids) if t.template_id else True
+            # Reconcile standard templates, removing templates that no longer exist in Portainer
+            result = self.env['j_portainer.template']._sync_reconcile(
+                [('server_id', '=', self.id), ('is_custom', '=', False)],
+                template_vals_list,
+                create_context={'from_sync': True, 'skip_portainer_create': True},
+                write_context={'from_sync': True, 'skip_portainer_update': True},
+                create_only_fields=('skip_portainer_create',),
+                sync_date_field='last_sync',
             )
-
-            # Remove obsolete templates
-            if templates_to_remove:
-                removed_count = len(templates_to_remove)
-                _logger.info(f"Removing {removed_count} obsolete standard templates")
-                templates_to_remove.unlink()
-            else:
-                removed_count = 0
+            template_count = len(template_vals_list)
+            created_count = result.created_count
+            updated_count = result.updated_count
+            removed_count = result.removed_count
 
             # Log the statistics
             _logger.info(
                 f"Standard template sync complete: {template_count} total templates, {created_count} created, {updated_count} updated, {removed_count} removed")
 
-            # Update template-specific last_sync
-            now = fields.Datetime.now()
-            templates = self.env['j_portainer.template'].search([
-                ('server_id', '=', self.id)
-            ])
-            if templates:
-                templates.write({'last_sync': now})
-
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -1999,13 +2216,7 @@ class PortainerServer(models.Model):
         self.ensure_one()
 
         try:
-            # Keep track of synced custom template IDs
-            synced_template_ids = []
-
-            # For statistics
-            template_count = 0
-            updated_count = 0
-            created_count = 0
+            template_vals_list = []
 
             # Don't try to create templates in Portainer, just sync existing ones
             # We'll use skip_portainer_create flag for this
@@ -2016,7 +2227,7 @@ class PortainerServer(models.Model):
 
             # Use Portainer v2 API endpoint for custom templates
             try:
-                custom_response = self._make_api_request('/api/custom_templates', 'GET')
+                custom_response = self._make_api_request('/api/custom_templates', 'GET', timeout=SLOW_REQUEST_TIMEOUT)
                 if custom_response.status_code == 200:
                     data = custom_response.json()
                     # Handle both array and object with templates array format
@@ -2058,14 +2269,6 @@ class PortainerServer(models.Model):
                 # Handle different ID field names with case insensitivity
                 template_id = get_field_value(template, ['id', 'Id', 'ID'])
 
-                # Check if this custom template already exists in Odoo
-                existing_template = False
-                if template_id:
-                    existing_template = self.env['j_portainer.customtemplate'].search([
-                        ('server_id', '=', self.id),
-                        ('template_id', '=', template_id)
-                    ], limit=1)
-
                 # Platform mapping function to handle numeric values
                 def map_platform(platform_value):
                     """Map platform value to appropriate string value"""
@@ -2133,7 +2336,7 @@ class PortainerServer(models.Model):
                     'description': get_field_value(template, ['Description', 'description'], ''),
                     'template_type': str(get_field_value(template, ['Type', 'type'], 1)),
                     'platform': map_platform(platform_value),
-                    'template_id': template_id,
+                    'template_id': str(template_id),
                     'logo': get_field_value(template, ['Logo', 'logo'], ''),
                     'image': get_field_value(template, ['Image', 'image'], ''),
                     'repository': json.dumps(get_field_value(template, ['Repository', 'repository'], {})) if isinstance(
@@ -2171,109 +2374,54 @@ class PortainerServer(models.Model):
                 compose_content = get_field_value(template, ['fileContent', 'FileContent', 'composeFileContent',
                                                              'ComposeFileContent'], '')
 
-                # If no file content in the template data, try to get it from the file API endpoint
-                if not compose_content and template_id:
-                    try:
-                        _logger.info(
-                            f"No file content found in template data, fetching from file API endpoint for template ID: {template_id}")
-                        file_response = self._make_api_request(f'/api/custom_templates/{template_id}/file', 'GET')
-
-                        if file_response.status_code == 200:
-                            file_data = file_response.json()
-                            # Try different possible field names for the file content
-                            for field_name in ['FileContent', 'StackFileContent', 'Content', 'stackFileContent']:
-                                if field_name in file_data:
-                                    compose_content = file_data[field_name]
-                                    _logger.info(
-                                        f"Retrieved file content (field: {field_name}) from API for template '{template_data['title']}'. Content length: {len(compose_content)} chars")
-                                    break
-
-                            # If we still don't have content, log the entire response
-                            if not compose_content:
-                                _logger.warning(f"File content not found in response: {file_data}")
-                        else:
-                            _logger.warning(
-                                f"Failed to get file content for custom template {template_id}: {file_response.status_code} - {file_response.text}")
-                    except Exception as e:
-                        _logger.error(f"Error fetching file content for template {template_id}: {str(e)}")
-
                 if compose_content:
-                    _logger.info(
-                        f"Using file content for template '{template_data['title']}' (ID: {template_id}). Content length: {len(compose_content)} chars")
-                    template_data['build_method'] = 'editor'  # Web editor method
-                    template_data['fileContent'] = compose_content  # Use fileContent field instead of compose_file
-                    template_data['compose_file'] = compose_content  # Keep compose_file for backward compatibility
-
-                if existing_template:
-                    # Update existing custom template
-                    existing_template.with_context(from_sync=True, skip_portainer_update=True).write(template_data)
-                    updated_count += 1
-                else:
-                    # Create new custom template - skip Portainer creation since we're just syncing
-                    template_data['skip_portainer_create'] = True
-
-                    # Double check that environment_id is set and is a valid ID
-                    if not template_data.get('environment_id'):
-                        # Find the first valid environment as fallback
-                        if self.environment_ids:
-                            template_data['environment_id'] = self.environment_ids[0].id
-                            _logger.warning(
-                                f"No environment ID found for template {template_id}, using first environment {self.environment_ids[0].id} as fallback")
-                        else:
-                            _logger.error(f"Cannot create custom template {template_id}: No environment found")
-                            continue
+                    template_data['fileContent'] = compose_content
 
-                    try:
-                        self.env['j_portainer.customtemplate'].with_context(from_sync=True,
-                                                                            skip_portainer_create=True).create(
-                            template_data)
-                        created_count += 1
-                    except Exception as e:
-                        _logger.error(f"Error creating custom template: {str(e)}")
-                        # Continue with next template instead of failing the entire sync
-
-                if isinstance(template_id, (int, str)) and str(template_id).isdigit():
-                    synced_template_ids.append(int(template_id))
-                template_count += 1
-
-            # Clean up custom templates that no longer exist in Portainer
-            # Get all custom templates for this server
-            all_custom_templates = self.env['j_portainer.customtemplate'].search([
-                ('server_id', '=', self.id)
-            ])
-
-            # Make sure all IDs are integers for proper comparison
-            synced_ids = []
-            for template_id in synced_template_ids:
-                if isinstance(template_id, int) or (isinstance(template_id, str) and template_id.isdigit()):
-                    synced_ids.append(int(template_id))
+                # Double check that environment_id is set and is a valid ID
+                if not template_data.get('environment_id'):
+                    _logger.error(f"Cannot sync custom template {template_id}: No environment found")
+                    continue
 
-            # Templates to remove - those not in synced_template_ids
-            # Handle template_id type conversion for comparison (some might be strings, some integers)
-            templates_to_remove = all_custom_templates.filtered(
-                lambda t: (int(t.template_id) not in synced_ids) if t.template_id else True
+                # Skip Portainer creation since we're just syncing
+                template_data['skip_portainer_create'] = True
+                template_vals_list.append(template_data)
+
+            # Fetch the files of the templates without inline content concurrently
+            missing_ids = [vals['template_id'] for vals in template_vals_list
+                           if not vals.get('fileContent') and vals.get('template_id')]
+            fetched_contents = self._fetch_custom_template_files(missing_ids)
+
+            # Store each distinct file once; templates whose file did not change keep the
+            # same content reference and are skipped by the reconciliation
+            template_contents = [vals.get('fileContent') or fetched_contents.get(vals['template_id'])
+                                 for vals in template_vals_list]
+            stored_contents = self.env['j_portainer.file.content']._store_many(template_contents)
+            for vals, compose_content in zip(template_vals_list, template_contents):
+                vals.pop('fileContent', None)
+                if compose_content:
+                    vals['build_method'] = 'editor'  # Web editor method
+                    vals['file_content_id'] = stored_contents[compose_content].id
+
+            # Reconcile custom templates, removing templates that no longer exist in Portainer.
+            # A template failing to create does not fail the entire sync.
+            result = self.env['j_portainer.customtemplate']._sync_reconcile(
+                [('server_id', '=', self.id)],
+                template_vals_list,
+                create_context={'from_sync': True, 'skip_portainer_create': True},
+                write_context={'from_sync': True, 'skip_portainer_update': True},
+                create_only_fields=('skip_portainer_create',),
+                tolerate_create_errors=True,
+                sync_date_field='last_sync',
             )
-
-            # Remove obsolete custom templates
-            if templates_to_remove:
-                removed_count = len(templates_to_remove)
-                _logger.info(f"Removing {removed_count} obsolete custom templates")
-                templates_to_remove.unlink()
-            else:
-                removed_count = 0
+            template_count = len(template_vals_list)
+            created_count = result.created_count
+            updated_count = result.updated_count
+            removed_count = result.removed_count
 
             # Log the statistics
             _logger.info(
                 f"Custom template sync complete: {template_count} total custom templates, {created_count} created, {updated_count} updated, {removed_count} removed")
 
-            # Update custom template-specific last_sync
-            now = fields.Datetime.now()
-            custom_templates = self.env['j_portainer.customtemplate'].search([
-                ('server_id', '=', self.id)
-            ])
-            if custom_templates:
-                custom_templates.write({'last_sync': now})
-
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -2367,6 +2515,36 @@ class PortainerServer(models.Model):
             _logger.error(f"Error pushing templates to Portainer: {str(e)}")
             raise UserError(_("Error pushing templates to Portainer: %s") % str(e))
 
+    def _fetch_custom_template_files(self, template_ids):
+        """Fetch the file content of custom templates concurrently
+
+        Args:
+            template_ids (iterable): Portainer custom template IDs
+
+        Returns:
+            dict: File content per template ID, for the templates whose file could be read
+        """
+        results = self._fetch_many([
+            FetchRequest(template_id, f'/api/custom_templates/{template_id}/file', None)
+            for template_id in template_ids
+        ])
+
+        contents = {}
+        for template_id, result in results.items():
+            if result.status_code != 200 or not isinstance(result.data, dict):
+                _logger.warning(f"Failed to get file content for custom template {template_id}: "
+                                f"{result.error or result.status_code} - {result.text}")
+                continue
+
+            # Try different possible field names for the file content
+            for field_name in CUSTOM_TEMPLATE_FILE_FIELDS:
+                if result.data.get(field_name):
+                    contents[template_id] = result.data[field_name]
+                    break
+            else:
+                _logger.warning(f"No file content found in response for template {template_id}: {result.data}")
+        return contents
+
     def _fetch_missing_template_file_content(self):
         """Private implementation to fetch missing file content for templates that have a template_id but no file content"""
         self.ensure_one()
@@ -2376,9 +2554,7 @@ class PortainerServer(models.Model):
             templates_without_content = self.env['j_portainer.customtemplate'].search([
                 ('server_id', '=', self.id),
                 ('template_id', '!=', False),
-                '|',
-                ('fileContent', '=', False),
-                ('fileContent', '=', '')
+                ('file_content_id', '=', False),
             ])
 
             if not templates_without_content:
@@ -2395,41 +2571,19 @@ class PortainerServer(models.Model):
                 }
 
             _logger.info(f"Found {len(templates_without_content)} templates missing file content")
-            success_count = 0
             total_count = len(templates_without_content)
 
+            contents = self._fetch_custom_template_files(templates_without_content.mapped('template_id'))
+            stored_contents = self.env['j_portainer.file.content']._store_many(contents.values())
+            success_count = 0
             for template in templates_without_content:
-                try:
-                    _logger.info(f"Fetching file content for template '{template.title}' (ID: {template.template_id})")
-                    file_response = self._make_api_request(f'/api/custom_templates/{template.template_id}/file', 'GET')
-
-                    if file_response.status_code == 200:
-                        file_data = file_response.json()
-                        compose_content = None
-
-                        # Try different possible field names for the file content
-                        for field_name in ['FileContent', 'StackFileContent', 'Content', 'stackFileContent']:
-                            if field_name in file_data:
-                                compose_content = file_data[field_name]
-                                _logger.info(
-                                    f"Retrieved file content (field: {field_name}) for template '{template.title}'. Content length: {len(compose_content)} chars")
-                                break
-
-                        if compose_content:
-                            template.write({
-                                'fileContent': compose_content,
-                                'compose_file': compose_content,
-                                'build_method': 'editor'
-                            })
-                            success_count += 1
-                        else:
-                            _logger.warning(
-                                f"No file content found in response for template {template.template_id}: {file_data}")
-                    else:
-                        _logger.warning(
-                            f"Failed to get file content for template {template.template_id}: {file_response.status_code} - {file_response.text}")
-                except Exception as e:
-                    _logger.error(f"Error fetching file content for template {template.template_id}: {str(e)}")
+                compose_content = contents.get(template.template_id)
+                if compose_content:
+                    template.with_context(from_sync=True).write({
+                        'file_content_id': stored_contents[compose_content].id,
+                        'build_method': 'editor'
+                    })
+                    success_count += 1
 
             _logger.info(f"Successfully fetched file content for {success_count} of {total_count} templates")
 
@@ -2488,51 +2642,47 @@ class PortainerServer(models.Model):
         self.ensure_one()
 
         try:
-            # Keep track of synced stacks
-            synced_stack_ids = []
-
             # Get environments to sync
             if environment_id:
                 environments = self.environment_ids.filtered(lambda e: e.environment_id == environment_id)
             else:
                 environments = self.environment_ids
 
-            stack_count = 0
-            updated_count = 0
-            created_count = 0
-
-            # Sync stacks for each environment
-            for env in environments:
-                endpoint_id = env.environment_id
-
-                # Get all stacks
-                response = self._make_api_request('/api/stacks', 'GET')
-
-                if response.status_code != 200:
-                    _logger.warning(f"Failed to get stacks: {response.text}")
-                    continue
-
-                stacks = response.json()
+            stack_vals_list = []
+            synced_environments = self.env['j_portainer.environment']
 
-                # Filter stacks for this environment
-                env_stacks = [s for s in stacks if s.get('EndpointId') == endpoint_id]
+            # Portainer lists the stacks of all endpoints at once, fetch them once and group them by endpoint
+            response = self._make_api_request('/api/stacks', 'GET', timeout=SLOW_REQUEST_TIMEOUT)
+            if response.status_code != 200:
+                _logger.warning(f"Failed to get stacks: {response.text}")
+                stacks = None
+            else:
+                stacks = response.json() or []
+
+            stacks_by_endpoint = {}
+            for stack in stacks or []:
+                stacks_by_endpoint.setdefault(stack.get('EndpointId'), []).append(stack)
+            if stacks is not None:
+                synced_environments = environments
+
+            # Fetch the stack files concurrently and store each distinct body once
+            file_results = self._fetch_many([
+                FetchRequest(stack.get('Id'), f"/api/stacks/{stack.get('Id')}/file", None)
+                for env in synced_environments
+                for stack in stacks_by_endpoint.get(env.environment_id, [])
+            ])
+            file_contents = {
+                stack_id: result.data.get('StackFileContent', '')
+                for stack_id, result in file_results.items()
+                if fetch_succeeded(result) and isinstance(result.data, dict)
+            }
+            stored_files = self.env['j_portainer.file.content']._store_many(file_contents.values())
 
-                for stack in env_stacks:
+            # Sync stacks for each environment
+            for env in synced_environments:
+                for stack in stacks_by_endpoint.get(env.environment_id, []):
                     stack_id = stack.get('Id')
-
-                    # Check if this stack already exists in Odoo
-                    existing_stack = self.env['j_portainer.stack'].search([
-                        ('server_id', '=', self.id),
-                        ('environment_id', '=', env.id),
-                        ('stack_id', '=', stack_id)
-                    ], limit=1)
-
-                    # Get stack file content if available
-                    file_content = ''
-                    file_response = self._make_api_request(f'/api/stacks/{stack_id}/file', 'GET')
-                    if file_response.status_code == 200:
-                        file_data = file_response.json()
-                        file_content = file_data.get('StackFileContent', '')
+                    stored_file = stored_files.get(file_contents.get(stack_id))
 
                     # Prepare stack data
                     stack_data = {
@@ -2543,62 +2693,38 @@ class PortainerServer(models.Model):
                         'type': str(stack.get('Type', 1)),
                         'status': str(stack.get('Status', 0)),
                         'update_date': self._parse_date_value(stack.get('UpdateDate')),
-                        'file_content': file_content,
-                        'content': file_content,  # Populate both content fields
+                        # Both content fields reference the same stored file
+                        'file_content_id': stored_file.id if stored_file else False,
+                        'content_id': stored_file.id if stored_file else False,
                         'details': json.dumps(stack, indent=2),
+                        # Creation date is only set on new records
+                        'creation_date': self._parse_date_value(stack.get('CreationDate')) or datetime.now(),
                     }
 
-                    if existing_stack:
-                        # Update existing stack - don't update creation date for existing records
-                        existing_stack.write(stack_data)
-                        updated_count += 1
-                    else:
-                        # Create new stack record - set creation date
-                        stack_data['creation_date'] = self._parse_date_value(
-                            stack.get('CreationDate')) or datetime.now()
-                        self.env['j_portainer.stack'].create(stack_data)
-                        created_count += 1
+                    if stack_id not in file_contents:
+                        # The file could not be fetched: keep the content already stored
+                        _logger.warning(f"Failed to get the file of stack {stack.get('Name', stack_id)}: "
+                                        f"{self._fetch_error(file_results.get(stack_id))}")
+                        del stack_data['file_content_id'], stack_data['content_id']
 
-                    synced_stack_ids.append((env.id, stack_id))
-                    stack_count += 1
+                    stack_vals_list.append(stack_data)
 
-            # Clean up stacks that no longer exist in Portainer
-            # Get stacks for this server (filtered by environment if specified)
-            if environment_id:
-                all_stacks = self.env['j_portainer.stack'].search([
-                    ('server_id', '=', self.id),
-                    ('environment_id.environment_id', '=', environment_id)
-                ])
-            else:
-                all_stacks = self.env['j_portainer.stack'].search([
-                    ('server_id', '=', self.id)
-                ])
-
-            # Filter stacks that should be removed (not found in Portainer)
-            stacks_to_remove = all_stacks.filtered(
-                lambda s: (s.environment_id.id, s.stack_id) not in synced_stack_ids
+            # Reconcile stack records with Portainer, removing stacks that no longer exist
+            result = self.env['j_portainer.stack']._sync_reconcile(
+                self._sync_environment_domain(synced_environments, environment_id),
+                stack_vals_list,
+                create_only_fields=('creation_date',),
+                sync_date_field='last_sync',
             )
-
-            # Remove obsolete stacks
-            if stacks_to_remove:
-                removed_count = len(stacks_to_remove)
-                _logger.info(f"Removing {removed_count} obsolete stacks from Odoo (already removed from Portainer)")
-                stacks_to_remove.unlink()
-            else:
-                removed_count = 0
+            stack_count = result.total_count
+            created_count = result.created_count
+            updated_count = result.updated_count
+            removed_count = result.removed_count
 
             # Log the statistics
             _logger.info(
                 f"Stack sync complete: {stack_count} total stacks, {created_count} created, {updated_count} updated, {removed_count} removed")
 
-            # Update stack-specific last_sync
-            now = fields.Datetime.now()
-            stacks = self.env['j_portainer.stack'].search([
-                ('server_id', '=', self.id)
-            ])
-            if stacks:
-                stacks.write({'last_sync': now})
-
             return {
                 'type': 'ir.actions.client',
                 'tag': 'display_notification',
@@ -2615,6 +2741,249 @@ class PortainerServer(models.Model):
             _logger.error(f"Error syncing stacks: {str(e)}")
             raise UserError(_("Error syncing stacks: %s") % str(e))
 
+    def sync_events(self, environment_id=None):
+        """Apply the Docker events received since the last run as targeted refreshes
+
+        For each environment, the events between its cursor and now are read
+        from the Docker events endpoint. Containers mentioned by the events are
+        refreshed (or removed when destroyed) and image, volume and network
+        events trigger a resync of that resource kind in the environment.
+        Environments without a cursor start from now, their current state
+        being known from the last full synchronization. Environments whose
+        containers or refreshed resources are being synced by another
+        transaction are skipped and keep their cursor.
+
+        Args:
+            environment_id (int, optional): Environment ID to apply events for.
+                If not provided, applies events for all environments.
+        """
+        self.ensure_one()
+
+        if environment_id:
+            environments = self.environment_ids.filtered(lambda e: e.environment_id == environment_id)
+        else:
+            environments = self.environment_ids
+
+        locked_environments = self.env['j_portainer.environment']
+        for env in environments:
+            if self._lock_sync('containers', env.environment_id):
+                locked_environments |= env
+            else:
+                _logger.info(f"Sync of containers of environment {env.name} is already running - "
+                             f"skipping its Docker events")
+        environments = locked_environments
+
+        now = fields.Datetime.now()
+        until = calendar.timegm(now.utctimetuple())
+
+        new_environments = environments.filtered(lambda e: not e.events_cursor)
+        if new_environments:
+            new_environments.write({'events_cursor': now})
+        tracked_environments = environments - new_environments
+
+        event_results = self._fetch_many([
+            FetchRequest(
+                env.id,
+                f"/api/endpoints/{env.environment_id}/docker/events",
+                {
+                    'since': calendar.timegm(env.events_cursor.utctimetuple()) - EVENTS_CURSOR_OVERLAP,
+                    'until': until,
+                },
+            ) for env in tracked_environments
+        ], max_workers=self.sync_environment_workers, timeout=SLOW_REQUEST_TIMEOUT)
+
+        event_count = 0
+        refreshed_count = 0
+        snapshot = self._new_sync_snapshot()
+        for env in tracked_environments:
+            event_result = event_results.get(env.id)
+            if event_result.status_code != 200:
+                _logger.warning(f"Failed to get Docker events for environment {env.name}: "
+                                f"{event_result.text or event_result.error}")
+                continue
+
+            plan = plan_refresh(parse_events(
+                event_result.data if event_result.data is not None else event_result.text))
+            event_count += plan.event_count
+
+            busy_kinds = [kind for kind in sorted(plan.kinds) if not self._lock_sync(kind, env.environment_id)]
+            if busy_kinds:
+                # The cursor is not advanced, the events are applied again on the next run
+                _logger.info(f"Sync of {', '.join(busy_kinds)} of environment {env.name} is already running - "
+                             f"skipping its Docker events")
+                continue
+
+            try:
+                with self.env.cr.savepoint():
+                    # Resources first so that refreshed containers link to up to date images
+                    for kind in ('images', 'volumes', 'networks'):
+                        if kind in plan.kinds:
+                            getattr(self, f'sync_{kind}')(env.environment_id, snapshot=snapshot)
+                    if plan.container_ids:
+                        self.sync_containers(env.environment_id, container_ids=plan.container_ids)
+                    env.write({'events_cursor': now})
+            except Exception as e:
+                # The cursor is not advanced, the events are applied again on the next run
+                _logger.error(f"Error applying Docker events of environment {env.name}: {str(e)}")
+                continue
+
+            refreshed_count += len(plan.container_ids) + len(plan.kinds)
+
+        _logger.info(
+            f"Event sync complete for server {self.name}: {event_count} events, "
+            f"{refreshed_count} targeted refreshes on {len(tracked_environments)} environments")
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Events Applied'),
+                'message': _('%d events applied with %d targeted refreshes') % (event_count, refreshed_count),
+                'sticky': False,
+                'type': 'success',
+            }
+        }
+
+    @api.model
+    def _cron_sync_events(self):
+        """Apply the Docker events of every server with incremental sync enabled"""
+        servers = self.search([('event_sync_enabled', '=', True), ('status', '=', 'connected')])
+        for server in servers:
+            try:
+                with self.env.cr.savepoint():
+                    server.sync_events()
+            except Exception as e:
+                _logger.error(f"Error during incremental event sync of server {server.name}: {str(e)}")
+
+    def _lock_sync(self, step=None, environment_id=None):
+        """Take the advisory locks of a synchronization for the current transaction
+
+        Without a step, the lock of the whole server is taken. Steps synced
+        per environment lock every environment they cover, so that a full
+        sync and the job of a single environment do not overlap. The locks
+        are released when the transaction ends.
+
+        Args:
+            step (str, optional): Key of SYNC_JOB_STEPS
+            environment_id (int, optional): Portainer environment ID of a per-environment step
+
+        Returns:
+            bool: False if another transaction holds one of the locks
+        """
+        self.ensure_one()
+        if step is None:
+            keys = [sync_lock_key(self.id)]
+        elif SYNC_JOB_STEPS[step][1]:
+            environment_ids = [environment_id] if environment_id else self.environment_ids.mapped('environment_id')
+            keys = [sync_lock_key(self.id, step, env_id) for env_id in environment_ids]
+        else:
+            # Syncing all templates conflicts with syncing either kind of templates
+            keys = [sync_lock_key(self.id, scope) for scope in SYNC_LOCK_SCOPES.get(step, (step,))]
+
+        for key in keys:
+            self.env.cr.execute("SELECT pg_try_advisory_xact_lock(%s)", [key])
+            if not self.env.cr.fetchone()[0]:
+                return False
+        return True
+
+    def _sync_step_locked(self, step, *args, **kwargs):
+        """Run a sync step unless another transaction is already running it
+
+        Returns:
+            dict: Result of the sync method, None if the step was skipped
+        """
+        self.ensure_one()
+        if not self._lock_sync(step, kwargs.get('environment_id')):
+            _logger.info(f"Sync of {step.replace('_', ' ')} of server {self.name} is already running - skipping")
+            return None
+        return getattr(self, SYNC_JOB_STEPS[step][0])(*args, **kwargs)
+
+    def action_sync_fleet(self):
+        """Sync the selected servers, or all servers, in parallel as one fleet run"""
+        run = self._start_fleet_sync(self or self.search([]))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Fleet Synchronization Started'),
+                'message': _('%d servers will be synchronized in parallel (%s).') % (
+                    run.server_count, dict(run._fields['mode'].selection)[run.mode]),
+                'sticky': False,
+                'type': 'info',
+            }
+        }
+
+    @api.model
+    def _start_fleet_sync(self, servers=None, trigger_cron=True):
+        """Create a fleet sync run and dispatch its servers
+
+        With queue_job, each server is synced by its own job on the channel
+        of the server. Otherwise the servers are claimed by the fleet sync
+        cron; duplicating that cron spreads the run over more cron workers.
+
+        Args:
+            servers (recordset, optional): Servers to sync (default: all servers)
+            trigger_cron (bool): Trigger the fleet sync cron to process the run
+
+        Returns:
+            recordset: The j_portainer.sync.run record
+        """
+        servers = self.search([]) if servers is None else servers
+        use_jobs = self._job_graph_available()
+        run = self.env['j_portainer.sync.run'].sudo()._start(servers, 'queue_job' if use_jobs else 'cron')
+        if use_jobs:
+            for line in run.line_ids:
+                line.server_id._sync_delayable('fleet sync', priority=5)._job_fleet_sync(line.id).delay()
+        elif trigger_cron:
+            self.env.ref('j_portainer.ir_cron_fleet_sync')._trigger()
+        return run
+
+    @api.model
+    def _cron_sync_fleet(self):
+        """Sync all servers as a fleet run, in parallel over the cron workers running this method
+
+        A new run is started when no server of a previous run is still
+        pending, then pending servers are claimed one at a time and committed
+        each, until none is left or the time budget is spent.
+        """
+        run_model = self.env['j_portainer.sync.run'].sudo()
+        run_model._expire_stale_lines()
+
+        if not self.env['j_portainer.sync.run.line'].sudo().search_count([('state', '=', 'pending')]):
+            # A single cron worker starts the run, the others join it once committed
+            self.env.cr.execute("SELECT pg_try_advisory_xact_lock(%s)", [sync_lock_key('fleet')])
+            if not self.env.cr.fetchone()[0]:
+                return
+            self._start_fleet_sync(trigger_cron=False)
+            self.env.cr.commit()
+
+        if self._job_graph_available():
+            # Servers are synced by their queue_job jobs
+            return
+
+        deadline = time.monotonic() + FLEET_SYNC_TIME_BUDGET
+        while time.monotonic() < deadline:
+            line = run_model._claim_line()
+            if not line:
+                return
+            line._run()
+            run = line.run_id
+            self.env.cr.commit()
+            run._log_summary()
+
+        # Continue the run in a new cron execution
+        self.env.ref('j_portainer.ir_cron_fleet_sync')._trigger()
+
+    def _job_fleet_sync(self, line_id):
+        """Sync the server as part of a fleet sync run"""
+        self.ensure_one()
+        line = self.env['j_portainer.sync.run'].sudo()._claim_line(line_id)
+        if not line:
+            return _('Already synchronized by another worker')
+        line._run()
+        line.run_id._log_summary()
+        return f"{line.state}: {line.message or ''}"
+
     def action_view_api_logs(self):
         """Open the API logs for this server"""
         self.ensure_one()
@@ -2627,26 +2996,217 @@ class PortainerServer(models.Model):
             'context': {'default_server_id': self.id}
         }
 
+    def _job_graph_available(self):
+        """Check whether sync jobs can be enqueued with queue_job"""
+        return chain is not None and 'queue.job' in self.env
+
+    def _use_job_graph(self):
+        """Check whether full synchronizations of the server run as a job graph"""
+        self.ensure_one()
+        return self.sync_mode == 'job_graph' and self._job_graph_available()
+
+    def _sync_delayable(self, description, priority=10, max_retries=3):
+        """Return a delayable of the server on its sync job channel"""
+        self.ensure_one()
+        return self.delayable(
+            channel=self.sync_job_channel,
+            priority=priority,
+            max_retries=max_retries,
+            description=f"Portainer {self.name}: {description}",
+        )
+
+    def _sync_job(self, step, environment_id=None, events_cursor=None):
+        """Return the delayable running one step of the sync job graph
+
+        Args:
+            step (str): Key of SYNC_JOB_STEPS
+            environment_id (int, optional): Portainer environment ID for per-environment steps
+            events_cursor (datetime, optional): Start of the full sync, for the containers step
+
+        Returns:
+            Delayable: Job running _job_sync_step
+        """
+        method, per_environment, max_retries, priority = SYNC_JOB_STEPS[step]
+        description = f"sync {step.replace('_', ' ')}"
+        if per_environment and environment_id:
+            description = f"{description} (environment {environment_id})"
+        return self._sync_delayable(description, priority=priority, max_retries=max_retries)._job_sync_step(
+            step, environment_id, events_cursor=events_cursor)
+
+    def _sync_job_lanes(self, delayables):
+        """Run delayables in at most sync_job_concurrency parallel chains
+
+        Args:
+            delayables (list): Delayables without dependencies between them
+
+        Returns:
+            DelayableGroup: Group of the lanes
+        """
+        lanes_count = min(max(self.sync_job_concurrency, 1), len(delayables))
+        lanes = [delayables[index::lanes_count] for index in range(lanes_count)]
+        return group(*[chain(*lane) if len(lane) > 1 else lane[0] for lane in lanes])
+
+    def _build_sync_graph(self, steps, environment_ids, sync_started=None):
+        """Build the job graph syncing the resources of the given environments
+
+        Templates, images, volumes and networks run first in parallel, then
+        stacks, then containers. Each phase starts once the previous one is
+        done.
+
+        Args:
+            steps (iterable): Keys of SYNC_JOB_STEPS to run ('environments' is ignored)
+            environment_ids (list): Portainer environment IDs
+            sync_started (datetime, optional): Start of a full sync, finalized by a last job
+
+        Returns:
+            DelayableChain: Job graph, None if there is nothing to sync
+        """
+        steps = set(steps)
+        phases = [
+            [self._sync_job(step) for step in ('templates', 'standard_templates', 'custom_templates')
+             if step in steps] +
+            [self._sync_job(step, environment_id) for environment_id in environment_ids
+             for step in ('images', 'volumes', 'networks') if step in steps],
+            [self._sync_job('stacks', environment_id) for environment_id in environment_ids if 'stacks' in steps],
+            [self._sync_job('containers', environment_id, events_cursor=sync_started)
+             for environment_id in environment_ids if 'containers' in steps],
+        ]
+        graph = [self._sync_job_lanes(phase) for phase in phases if phase]
+        if sync_started:
+            graph.append(self._sync_delayable('finish full sync', priority=10)._job_finish_sync(sync_started))
+        return chain(*graph) if graph else None
+
+    def _enqueue_sync_graph(self, steps=None, environment_id=None):
+        """Enqueue the sync of the server as a queue_job job graph
+
+        Each resource type of each environment is synced by its own job on
+        the channel of the server, with its own retries and transaction.
+
+        Args:
+            steps (iterable, optional): Keys of SYNC_JOB_STEPS to run (default: full sync)
+            environment_id (int, optional): Only sync the resources of this environment
+
+        Returns:
+            dict: Notification action
+        """
+        self.ensure_one()
+        if not self._job_graph_available():
+            raise UserError(_("The queue_job module must be installed to run synchronizations as background jobs."))
+
+        full_sync = steps is None and not environment_id
+        steps = set(steps or FULL_SYNC_STEPS)
+        sync_started = fields.Datetime.now() if full_sync else None
+
+        if 'environments' in steps and not environment_id:
+            # The rest of the graph depends on the synced environments
+            self._sync_delayable('sync environments', priority=5)._job_sync_environments_graph(
+                sorted(steps - {'environments'}), sync_started).delay()
+        else:
+            environment_ids = [environment_id] if environment_id else self.environment_ids.mapped('environment_id')
+            graph = self._build_sync_graph(steps, environment_ids, sync_started)
+            if graph:
+                graph.delay()
+
+        _logger.info(f"Enqueued sync job graph for server {self.name}: {', '.join(sorted(steps))}")
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Synchronization Queued'),
+                'message': _('Synchronization jobs have been queued on channel %s.') % self.sync_job_channel,
+                'sticky': False,
+                'type': 'info',
+            }
+        }
+
+    def _job_sync_step(self, step, environment_id=None, events_cursor=None):
+        """Run one step of the sync job graph
+
+        Portainer errors are retried after SYNC_JOB_RETRY_DELAY seconds up to
+        the maximum number of retries of the step. The events cursor of a full
+        sync only moves forward in the environments whose containers job ran
+        and succeeded.
+
+        Returns:
+            str: Result message of the sync
+        """
+        self.ensure_one()
+        method = SYNC_JOB_STEPS[step][0]
+        per_environment = SYNC_JOB_STEPS[step][1]
+        if not self._lock_sync(step, environment_id if per_environment else None):
+            # Another job or an inline sync is already syncing these resources
+            return _('Skipped, already running')
+        kwargs = {'events_cursor': events_cursor} if events_cursor and step == 'containers' else {}
+        try:
+            if per_environment and environment_id:
+                result = getattr(self, method)(environment_id, **kwargs)
+            else:
+                result = getattr(self, method)(**kwargs)
+        except UserError as e:
+            raise RetryableJobError(str(e), seconds=SYNC_JOB_RETRY_DELAY)
+        return (result or {}).get('params', {}).get('message', '')
+
+    def _job_sync_environments_graph(self, steps, sync_started=None):
+        """Sync the environments, then enqueue the job graph of their resources"""
+        self.ensure_one()
+        message = self._job_sync_step('environments')
+        graph = self._build_sync_graph(steps, self.environment_ids.mapped('environment_id'), sync_started)
+        if graph:
+            graph.delay()
+        return message
+
+    def _job_finish_sync(self, sync_started):
+        """Record the completion of a full sync run as a job graph
+
+        The events cursors are moved forward by the containers jobs, only in
+        the environments whose containers were synced.
+        """
+        self.ensure_one()
+        self.write({'last_sync': fields.Datetime.now()})
+        return _('Full synchronization of %s completed') % self.name
+
     def sync_all(self):
         """Sync all resources from Portainer"""
         self.ensure_one()
 
-        try:
-            # Sync environments first
-            self.sync_environments()
+        if self.sync_mode == 'job_graph':
+            return self._enqueue_sync_graph()
 
-            # Sync all other resources
-            self.sync_images()
-            self.sync_volumes()
-            self.sync_networks()
-            self.sync_standard_templates()
-            self.sync_custom_templates()
+        # Overlapping full syncs of the same server are skipped
+        if not self._lock_sync():
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': _('Synchronization Already Running'),
+                    'message': _('Another synchronization of this server is running.'),
+                    'sticky': False,
+                    'type': 'warning',
+                }
+            }
 
-            # Fetch missing file content for any templates
-            self._fetch_missing_template_file_content()  # Use private method to avoid duplicate notifications
+        try:
+            sync_started = fields.Datetime.now()
 
-            self.sync_stacks()
-            self.sync_containers()
+            # Sync environments first
+            self._sync_step_locked('environments')
+
+            # Share one resource snapshot between all Docker resource syncs
+            snapshot = self._new_sync_snapshot()
+
+            # Sync all other resources, skipping the ones another transaction is syncing
+            self._sync_step_locked('images', snapshot=snapshot)
+            self._sync_step_locked('volumes', snapshot=snapshot)
+            self._sync_step_locked('networks', snapshot=snapshot)
+            self._sync_step_locked('standard_templates')
+            if self._sync_step_locked('custom_templates') is not None:
+                # Fetch missing file content for any templates
+                self._fetch_missing_template_file_content()  # Use private method to avoid duplicate notifications
+
+            self._sync_step_locked('stacks')
+            # Docker events after sync_started are applied by the next incremental sync, in the
+            # environments whose containers were synced; the others keep their cursor
+            self._sync_step_locked('containers', snapshot=snapshot, events_cursor=sync_started)
             self.write({'last_sync': fields.Datetime.now()})
 
             return {
@@ -2720,9 +3280,9 @@ class PortainerServer(models.Model):
             # Optional: Clean up old backup files for servers with successful backups
             for schedule in schedules:
                 try:
-                    # Clean up old backups, keeping only 10 most recent per server
+                    # Clean up old backups, keeping the most recent ones of each server
                     self.env['j_portainer.backup.history'].cleanup_old_backups(
-                        schedule.server_id.id, keep_count=10
+                        schedule.server_id.id, keep_count=max(schedule.retention_count, 1)
                     )
                 except Exception as e:
                     _logger.warning(f"Error during backup cleanup for server {schedule.server_id.name}: {str(e)}")
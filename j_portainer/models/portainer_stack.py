@@ -5,14 +5,45 @@ from odoo import models, fields, api, _
 from odoo.exceptions import UserError
 import json
 import logging
-import re
+
+from ..tools.volume_usage import format_total_size
 
 _logger = logging.getLogger(__name__)
 
+
+class StackNameIndex(object):
+    """In-memory lookup of stacks by environment and name
+
+    Containers are linked to the stack named by their compose labels. The
+    index resolves these names for a whole sync from a single search: exact
+    name first, then the first stack whose name contains it, ignoring case.
+    """
+
+    def __init__(self, stacks):
+        self._exact = {}
+        self._by_environment = {}
+        for stack in stacks:
+            self._exact.setdefault((stack.environment_id.id, stack.name), stack)
+            self._by_environment.setdefault(stack.environment_id.id, []).append(stack)
+
+    def match(self, environment_id, name):
+        """Return the stack of an environment matching a name, or None"""
+        stack = self._exact.get((environment_id, name))
+        if stack:
+            return stack
+        name = name.lower()
+        for stack in self._by_environment.get(environment_id, []):
+            if name in (stack.name or '').lower():
+                return stack
+        return None
+
+
 class PortainerStack(models.Model):
     _name = 'j_portainer.stack'
     _description = 'Portainer Stack'
     _order = 'name'
+    _inherit = ['j_portainer.sync.mixin']
+    _sync_key_fields = ('environment_id', 'stack_id')
     
     name = fields.Char('Name', required=True)
     stack_id = fields.Integer('Stack ID', required=False, copy=False)
@@ -25,8 +56,12 @@ class PortainerStack(models.Model):
         ('1', 'Active'),
         ('2', 'Inactive')
     ], string='Status', default='0')
-    file_content = fields.Text('Stack File')
-    content = fields.Text('Content')
+    file_content_id = fields.Many2one('j_portainer.file.content', string='Stored Stack File', index=True,
+                                      readonly=True, copy=False)
+    content_id = fields.Many2one('j_portainer.file.content', string='Stored Content', index=True,
+                                 readonly=True, copy=False)
+    file_content = fields.Text('Stack File', compute='_compute_file_contents', inverse='_inverse_file_content')
+    content = fields.Text('Content', compute='_compute_file_contents', inverse='_inverse_content')
     creation_date = fields.Datetime('Created')
     update_date = fields.Datetime('Updated')
     details = fields.Text('Details')
@@ -70,6 +105,7 @@ class PortainerStack(models.Model):
     
     # Volume-related fields
     volume_count = fields.Integer('Volume Count', compute='_compute_volume_stats', )
+    total_volume_bytes = fields.Float('Total Volume Usage (Bytes)', digits=(20, 0), compute='_compute_volume_stats', )
     total_volume_size = fields.Char('Total Volume Size', compute='_compute_volume_stats', )
     
     _sql_constraints = [
@@ -111,61 +147,35 @@ class PortainerStack(models.Model):
             self.git_save_credential = False
             self.git_credential_name = False
 
-    @api.depends('container_ids', 'container_ids.volume_ids', 'container_ids.volume_ids.usage_size')
+    @api.depends('file_content_id', 'content_id')
+    def _compute_file_contents(self):
+        """Read the stack file and content from their content-addressed storage"""
+        for record in self:
+            record.file_content = record.file_content_id.content or False
+            record.content = record.content_id.content or False
+    
+    def _inverse_file_content(self):
+        """Store the stack file once per distinct content"""
+        contents = self.env['j_portainer.file.content']._store_many(self.mapped('file_content'))
+        for record in self:
+            record.file_content_id = contents.get(record.file_content) or self.env['j_portainer.file.content']
+    
+    def _inverse_content(self):
+        """Store the stack content once per distinct content"""
+        contents = self.env['j_portainer.file.content']._store_many(self.mapped('content'))
+        for record in self:
+            record.content_id = contents.get(record.content) or self.env['j_portainer.file.content']
+    
+    @api.depends('container_ids', 'container_ids.volume_ids', 'container_ids.volume_ids.usage_bytes',
+                 'container_ids.volume_ids.size_check_state')
     def _compute_volume_stats(self):
-        """Compute volume count and total size for this stack"""
+        """Compute volume count and total size of the stacks with a single aggregated query"""
+        totals = self.env['j_portainer.container.volume']._get_usage_totals('stack', self.ids)
         for record in self:
-            # Get volume mappings from all containers in this stack
-            volume_mappings = record.container_ids.mapped('volume_ids').filtered(lambda v: v.type == 'volume' and v.volume_id)
-            
-            # Count unique volumes (not mappings) to avoid duplicates
-            unique_volume_ids = set(volume_mappings.mapped('volume_id.id'))
-            record.volume_count = len(unique_volume_ids)
-            
-            # Sum usage_size values with proper unit conversion
-            # Group by volume_id to avoid counting the same volume multiple times
-            volume_sizes_bytes = {}
-            for mapping in volume_mappings:
-                if mapping.volume_id and mapping.usage_size and mapping.usage_size not in ['Error', 'N/A', '']:
-                    volume_id = mapping.volume_id.id
-                    if volume_id not in volume_sizes_bytes:
-                        try:
-                            # Extract numeric value and unit from usage_size (e.g., "4.0K" -> 4.0 and "K")
-                            size_match = re.match(r'^(\d+\.?\d*)\s*([KMGT]?)B?$', mapping.usage_size.upper().strip())
-                            if size_match:
-                                size_value = float(size_match.group(1))
-                                unit = size_match.group(2)
-                                
-                                # Convert to bytes based on unit
-                                multipliers = {
-                                    '': 1,          # bytes
-                                    'K': 1024,      # kilobytes
-                                    'M': 1024**2,   # megabytes
-                                    'G': 1024**3,   # gigabytes
-                                    'T': 1024**4,   # terabytes
-                                }
-                                
-                                size_bytes = size_value * multipliers.get(unit, 1)
-                                volume_sizes_bytes[volume_id] = size_bytes
-                        except (ValueError, AttributeError):
-                            continue
-            
-            # Sum all unique volume sizes in bytes
-            total_bytes = sum(volume_sizes_bytes.values())
-            
-            # Convert back to human readable format with 2 decimal precision
-            if total_bytes == 0:
-                record.total_volume_size = "0B"
-            elif total_bytes < 1024:
-                record.total_volume_size = f"{total_bytes:.0f}B"
-            elif total_bytes < 1024**2:
-                record.total_volume_size = f"{total_bytes/1024:.2f}K"
-            elif total_bytes < 1024**3:
-                record.total_volume_size = f"{total_bytes/(1024**2):.2f}M"
-            elif total_bytes < 1024**4:
-                record.total_volume_size = f"{total_bytes/(1024**3):.2f}G"
-            else:
-                record.total_volume_size = f"{total_bytes/(1024**4):.2f}T"
+            volume_count, total_bytes = totals.get(record.id, (0, 0))
+            record.volume_count = volume_count
+            record.total_volume_bytes = total_bytes
+            record.total_volume_size = format_total_size(total_bytes)
 
     def write(self, vals):
         """Override write to handle content updates"""
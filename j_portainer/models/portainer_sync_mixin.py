@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api
+from datetime import datetime
+import logging
+import time
+
+from ..tools.payload_digest import payload_digest
+
+_logger = logging.getLogger(__name__)
+
+# Field types whose empty values (False, None, '') are considered equal
+EMPTY_EQUIVALENT_TYPES = ('char', 'text', 'html', 'selection')
+
+
+class SyncResult(object):
+    """Outcome of a reconciliation run
+
+    Attributes:
+        records_by_key (dict): Synced record per natural key
+        created (recordset): Records created by the run
+        updated (recordset): Existing records with at least one changed field
+        unchanged (recordset): Existing records left untouched
+        removed_count (int): Number of obsolete records removed or archived
+        timings (dict): Duration in milliseconds of each phase
+    """
+
+    def __init__(self, model):
+        self.records_by_key = {}
+        self.created = model.browse()
+        self.updated = model.browse()
+        self.unchanged = model.browse()
+        self.removed_count = 0
+        self.timings = {'load': 0, 'create': 0, 'write': 0, 'unlink': 0}
+
+    @property
+    def created_count(self):
+        return len(self.created)
+
+    @property
+    def updated_count(self):
+        return len(self.updated)
+
+    @property
+    def unchanged_count(self):
+        return len(self.unchanged)
+
+    @property
+    def total_count(self):
+        return len(self.records_by_key)
+
+    def get(self, key, default=None):
+        return self.records_by_key.get(key, default)
+
+
+class PortainerSyncMixin(models.AbstractModel):
+    """Set-based reconciliation of Odoo records with Portainer objects
+
+    Models mirroring Portainer objects declare the fields forming the natural
+    key of a remote object in ``_sync_key_fields``. ``_sync_reconcile`` then
+    loads all existing records of a sync scope with one query, computes the
+    create, update and delete sets by key, creates new records in batch,
+    writes only the fields whose value actually changed and removes obsolete
+    records with a single unlink.
+
+    The digest of the values of each remote object is stored on the record.
+    Records whose digest did not change since the previous sync are skipped
+    without comparing or writing any field.
+    """
+    _name = 'j_portainer.sync.mixin'
+    _description = 'Portainer Sync Reconciliation'
+
+    # Fields identifying a Portainer object within a sync scope
+    _sync_key_fields = ()
+
+    sync_digest = fields.Char('Sync Digest', copy=False, readonly=True,
+                              help="Digest of the Portainer values applied by the last sync")
+
+    @api.model
+    def _sync_normalize(self, fname, value):
+        """Convert a value to a comparable form for the given field"""
+        field = self._fields[fname]
+        if field.type == 'many2one':
+            if isinstance(value, models.BaseModel):
+                return value.id or False
+            return value or False
+        if field.type in EMPTY_EQUIVALENT_TYPES:
+            # Portainer returns numeric IDs stored in char fields, compare them as stored
+            return str(value) if value else False
+        if field.type == 'datetime':
+            value = field.to_datetime(value)
+            return value.replace(microsecond=0) if isinstance(value, datetime) else False
+        if field.type == 'date':
+            return field.to_date(value) or False
+        if field.type == 'boolean':
+            return bool(value)
+        if field.type == 'integer':
+            return int(value or 0)
+        if field.type in ('float', 'monetary'):
+            return float(value or 0.0)
+        return value
+
+    @api.model
+    def _sync_key(self, values):
+        """Return the natural key of a values dictionary"""
+        return tuple(self._sync_normalize(fname, values.get(fname)) for fname in self._sync_key_fields)
+
+    def _sync_record_key(self):
+        """Return the natural key of a record"""
+        self.ensure_one()
+        return tuple(self._sync_normalize(fname, self[fname]) for fname in self._sync_key_fields)
+
+    def _sync_changed_values(self, values):
+        """Return the subset of values that differ from the record"""
+        self.ensure_one()
+        changes = {}
+        for fname, value in values.items():
+            field = self._fields.get(fname)
+            if not field:
+                continue
+            if field.type in ('one2many', 'many2many'):
+                # Commands cannot be compared, always apply them
+                changes[fname] = value
+            elif self._sync_normalize(fname, self[fname]) != self._sync_normalize(fname, value):
+                changes[fname] = value
+        return changes
+
+    @api.model
+    def _sync_create_batch(self, vals_list, tolerate_create_errors=False):
+        """Create records in batch, falling back to one by one creation
+
+        Models whose ``create`` is not batch enabled are created one by one.
+        When ``tolerate_create_errors`` is set, records are created one by one
+        inside savepoints so that a single invalid object does not abort the
+        whole sync.
+        """
+        if not vals_list:
+            return self.browse(), []
+
+        batch_create = getattr(type(self).create, '_api', None) == 'model_create_multi'
+        if batch_create and not tolerate_create_errors:
+            return self.create(vals_list), list(range(len(vals_list)))
+
+        record_ids = []
+        created_indexes = []
+        for index, vals in enumerate(vals_list):
+            if not tolerate_create_errors:
+                record_ids.append(self.create(vals).id)
+                created_indexes.append(index)
+                continue
+            try:
+                with self.env.cr.savepoint():
+                    record_ids.append(self.create(vals).id)
+                created_indexes.append(index)
+            except Exception as e:
+                _logger.error(f"Error creating {self._description} record during sync: {str(e)}")
+        return self.browse(record_ids), created_indexes
+
+    @api.model
+    def _sync_reconcile(self, domain, vals_list, create_context=None, write_context=None,
+                        create_only_fields=(), obsolete_vals=None, tolerate_create_errors=False,
+                        sync_date_field=None, kept_keys=()):
+        """Reconcile the records of a sync scope with the remote objects
+
+        Args:
+            domain (list): Domain of the existing records in the sync scope
+            vals_list (list): Values of every remote object in the scope
+            create_context (dict, optional): Context used to create records
+            write_context (dict, optional): Context used to update records
+            create_only_fields (iterable): Fields only set when creating a record
+            obsolete_vals (dict, optional): Values written on obsolete records
+                instead of unlinking them (e.g. ``{'active': False}``)
+            tolerate_create_errors (bool): Skip records failing to create
+                instead of aborting the reconciliation
+            sync_date_field (str, optional): Datetime field set to the current
+                time on created and updated records only
+            kept_keys (iterable): Keys of remote objects that exist but could not
+                be fetched completely; their records are left untouched instead of
+                being removed as obsolete
+
+        Returns:
+            SyncResult: Synced records by key, counts and timings
+        """
+        result = SyncResult(self)
+        start = time.monotonic()
+        sync_date_vals = {sync_date_field: fields.Datetime.now()} if sync_date_field else {}
+
+        # Load the existing records of the scope in one query
+        search_model = self.with_context(active_test=False) if obsolete_vals else self
+        existing = search_model.search(domain)
+        existing_by_key = {}
+        obsolete_ids = []
+        for record in existing:
+            key = record._sync_record_key()
+            if not all(key) or key in existing_by_key:
+                # Records without a remote ID or duplicates cannot be matched
+                obsolete_ids.append(record.id)
+                continue
+            existing_by_key[key] = record
+
+        # Split remote objects into creations and updates, last occurrence wins
+        keyless_create = []
+        keyed_create = {}
+        to_update = {}
+        for vals in vals_list:
+            vals = dict(vals, sync_digest=payload_digest({
+                fname: value for fname, value in vals.items() if fname not in create_only_fields
+            }))
+            key = self._sync_key(vals)
+            if not all(key):
+                keyless_create.append((None, vals))
+            elif key in existing_by_key:
+                to_update[key] = vals
+            else:
+                keyed_create[key] = vals
+        to_create = list(keyed_create.items()) + keyless_create
+
+        kept_keys = {tuple(self._sync_normalize(fname, value) for fname, value in zip(self._sync_key_fields, key))
+                     for key in kept_keys}
+        obsolete_ids.extend(
+            record.id for key, record in existing_by_key.items()
+            if key not in to_update and key not in kept_keys
+        )
+        obsolete = self.browse(obsolete_ids)
+        result.timings['load'] = int((time.monotonic() - start) * 1000)
+
+        # Write changed fields only, grouping identical changes into one write
+        start = time.monotonic()
+        writer = self.with_context(**(write_context or {}))
+        grouped_changes = {}
+        unchanged_ids = []
+        updated_ids = []
+        for key, vals in to_update.items():
+            record = existing_by_key[key]
+            result.records_by_key[key] = record
+            if record.sync_digest == vals['sync_digest']:
+                unchanged_ids.append(record.id)
+                continue
+            changes = record._sync_changed_values({
+                fname: value for fname, value in vals.items() if fname not in create_only_fields
+            })
+            if not changes:
+                unchanged_ids.append(record.id)
+                continue
+            updated_ids.append(record.id)
+            changes.update(sync_date_vals)
+            try:
+                group_key = tuple(sorted(changes.items()))
+                hash(group_key)
+            except TypeError:
+                group_key = ('__record__', record.id)
+            grouped_changes.setdefault(group_key, (changes, []))[1].append(record.id)
+
+        for changes, record_ids in grouped_changes.values():
+            writer.browse(record_ids).write(changes)
+        result.unchanged = self.browse(unchanged_ids)
+        result.updated = self.browse(updated_ids)
+        result.timings['write'] = int((time.monotonic() - start) * 1000)
+
+        # Create missing records in batch
+        start = time.monotonic()
+        creator = self.with_context(**(create_context or {}))
+        created, created_indexes = creator._sync_create_batch(
+            [dict(vals, **sync_date_vals) for key, vals in to_create], tolerate_create_errors=tolerate_create_errors)
+        for record, index in zip(created, created_indexes):
+            key = to_create[index][0] or ('__new__', record.id)
+            result.records_by_key[key] = record.with_env(self.env)
+        result.created = created.with_env(self.env)
+        result.timings['create'] = int((time.monotonic() - start) * 1000)
+
+        # Remove or archive obsolete records with a single call
+        start = time.monotonic()
+        if obsolete and obsolete_vals:
+            # Records already archived by a previous run are left untouched
+            obsolete = obsolete.filtered(lambda record: record._sync_changed_values(obsolete_vals))
+        if obsolete:
+            result.removed_count = len(obsolete)
+            if obsolete_vals:
+                # Clear the digest so that a reappearing object is written again
+                obsolete.with_context(**(write_context or {})).write(dict(obsolete_vals, sync_digest=False))
+            else:
+                obsolete.unlink()
+        result.timings['unlink'] = int((time.monotonic() - start) * 1000)
+
+        _logger.info(
+            f"Reconciled {self._name}: {result.total_count} synced, {result.created_count} created, "
+            f"{result.updated_count} updated, {result.unchanged_count} unchanged, {result.removed_count} removed "
+            f"(load {result.timings['load']} ms, create {result.timings['create']} ms, "
+            f"write {result.timings['write']} ms, unlink {result.timings['unlink']} ms)")
+        return result
+
+    def _sync_child_collection(self, fname, desired, key_fields, write_context=None):
+        """Apply the difference between the desired and stored children of records
+
+        Children are matched by parent and key, and only the inserts, updates
+        and deletes are applied, with one search, one batch create, one write
+        per distinct change and one unlink for all the given parents.
+
+        Args:
+            fname (str): One2many field of the records holding the children
+            desired (dict): Values of the children per parent record ID;
+                parents missing from the dict keep their children untouched
+            key_fields (tuple): Child fields identifying a child within its parent
+            write_context (dict, optional): Context used to create, update and
+                remove children
+
+        Returns:
+            dict: Number of children created, updated and removed
+        """
+        counts = {'created': 0, 'updated': 0, 'removed': 0}
+        if not desired:
+            return counts
+
+        field = self._fields[fname]
+        child_model = self.env[field.comodel_name].with_context(**(write_context or {}))
+        inverse_name = field.inverse_name
+
+        def normalize(value):
+            if isinstance(value, models.BaseModel):
+                return value.id or False
+            return value or False
+
+        # Load the existing children of all parents in one query
+        existing_by_key = {}
+        obsolete_ids = []
+        for child in child_model.search([(inverse_name, 'in', list(desired))]):
+            key = (child[inverse_name].id,) + tuple(normalize(child[key_field]) for key_field in key_fields)
+            if key in existing_by_key:
+                obsolete_ids.append(child.id)
+                continue
+            existing_by_key[key] = child
+
+        # Match the desired children by key, first occurrence wins
+        to_create = []
+        grouped_changes = {}
+        for parent_id, children in desired.items():
+            seen = set()
+            for vals in children:
+                key = (parent_id,) + tuple(normalize(vals.get(key_field)) for key_field in key_fields)
+                if key in seen:
+                    continue
+                seen.add(key)
+                child = existing_by_key.pop(key, None)
+                if child is None:
+                    to_create.append(dict(vals, **{inverse_name: parent_id}))
+                    continue
+                changes = {
+                    child_fname: value for child_fname, value in vals.items()
+                    if normalize(child[child_fname]) != normalize(value)
+                }
+                if changes:
+                    grouped_changes.setdefault(tuple(sorted(changes.items())), []).append(child.id)
+
+        obsolete_ids.extend(child.id for child in existing_by_key.values())
+        if obsolete_ids:
+            child_model.browse(obsolete_ids).unlink()
+            counts['removed'] = len(obsolete_ids)
+        for changes, child_ids in grouped_changes.items():
+            child_model.browse(child_ids).write(dict(changes))
+            counts['updated'] += len(child_ids)
+        if to_create:
+            child_model.create(to_create)
+            counts['created'] = len(to_create)
+
+        return counts
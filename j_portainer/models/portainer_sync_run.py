@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from odoo import models, fields, api, _
+from datetime import timedelta
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Hours after which the servers of a run still pending are given up, e.g. when their job was cancelled
+FLEET_RUN_EXPIRY_HOURS = 6
+
+
+class PortainerSyncRun(models.Model):
+    """Fleet-wide synchronization run
+
+    A run holds one line per server. Lines are claimed one at a time by cron
+    workers or queue_job jobs, so that servers are synced in parallel while
+    each server is synced by a single worker. The state and durations of a
+    run are derived from its lines.
+    """
+    _name = 'j_portainer.sync.run'
+    _description = 'Portainer Fleet Sync Run'
+    _order = 'date_start desc, id desc'
+
+    name = fields.Char('Run', required=True, readonly=True)
+    date_start = fields.Datetime('Started', required=True, readonly=True, default=fields.Datetime.now)
+    mode = fields.Selection([
+        ('cron', 'Cron Workers'),
+        ('queue_job', 'Background Jobs'),
+    ], string='Dispatch', required=True, readonly=True, default='cron')
+    line_ids = fields.One2many('j_portainer.sync.run.line', 'run_id', string='Servers', readonly=True)
+
+    state = fields.Selection([
+        ('running', 'Running'),
+        ('done', 'Done'),
+    ], string='Status', compute='_compute_summary')
+    date_end = fields.Datetime('Finished', compute='_compute_summary')
+    duration = fields.Float('Wall Time (s)', compute='_compute_summary', digits=(16, 1),
+                            help="Time between the start of the run and the end of its last server sync")
+    total_sync_time = fields.Float('Sync Time (s)', compute='_compute_summary', digits=(16, 1),
+                                   help="Sum of the durations of the server syncs. Above the wall time when "
+                                        "servers were synced in parallel")
+    server_count = fields.Integer('Servers', compute='_compute_summary')
+    done_count = fields.Integer('Synced', compute='_compute_summary')
+    failed_count = fields.Integer('Failed', compute='_compute_summary')
+    skipped_count = fields.Integer('Skipped', compute='_compute_summary')
+    pending_count = fields.Integer('Pending', compute='_compute_summary')
+
+    @api.depends('date_start', 'line_ids.state', 'line_ids.date_end', 'line_ids.duration_ms')
+    def _compute_summary(self):
+        for run in self:
+            lines = run.line_ids
+            counts = {state: 0 for state in ('pending', 'done', 'failed', 'skipped')}
+            for line in lines:
+                counts[line.state] += 1
+            end_dates = [date for date in lines.mapped('date_end') if date]
+
+            run.state = 'running' if counts['pending'] else 'done'
+            run.date_end = max(end_dates) if end_dates and not counts['pending'] else False
+            run.duration = (max(end_dates) - run.date_start).total_seconds() if end_dates else 0.0
+            run.total_sync_time = sum(lines.mapped('duration_ms')) / 1000.0
+            run.server_count = len(lines)
+            run.done_count = counts['done']
+            run.failed_count = counts['failed']
+            run.skipped_count = counts['skipped']
+            run.pending_count = counts['pending']
+
+    @api.model
+    def _start(self, servers, mode='cron'):
+        """Create a run with one pending line per server
+
+        Args:
+            servers (recordset): j_portainer.server records to sync
+            mode (str): 'cron' or 'queue_job'
+
+        Returns:
+            recordset: The new j_portainer.sync.run record
+        """
+        now = fields.Datetime.now()
+        run = self.create({
+            'name': _('Fleet sync %s') % fields.Datetime.to_string(now),
+            'date_start': now,
+            'mode': mode,
+            'line_ids': [(0, 0, {'server_id': server.id}) for server in servers],
+        })
+        _logger.info(f"Started fleet sync run {run.id} for {len(servers)} servers ({mode})")
+        return run
+
+    @api.model
+    def _claim_line(self, line_id=None):
+        """Lock a pending line for the current transaction
+
+        Lines locked by another transaction are skipped, so concurrent
+        workers never sync the same server of a run.
+
+        Args:
+            line_id (int, optional): Line to claim, the oldest claimable one if not given
+
+        Returns:
+            recordset: The claimed j_portainer.sync.run.line, empty if none
+        """
+        line_model = self.env['j_portainer.sync.run.line']
+        line_model.flush_model(['state'])
+        if line_id:
+            self.env.cr.execute(f"""
+                SELECT id FROM {line_model._table}
+                 WHERE id = %s AND state = 'pending'
+                   FOR UPDATE SKIP LOCKED
+            """, [line_id])
+        else:
+            self.env.cr.execute(f"""
+                SELECT id FROM {line_model._table}
+                 WHERE state = 'pending'
+                 ORDER BY id
+                 LIMIT 1
+                   FOR UPDATE SKIP LOCKED
+            """)
+        row = self.env.cr.fetchone()
+        return line_model.browse(row[0] if row else [])
+
+    @api.model
+    def _expire_stale_lines(self):
+        """Give up the pending servers of runs started too long ago
+
+        Pending lines prevent new runs from starting, a lost job must not
+        block fleet synchronization forever.
+        """
+        limit = fields.Datetime.now() - timedelta(hours=FLEET_RUN_EXPIRY_HOURS)
+        stale_lines = self.env['j_portainer.sync.run.line'].search([
+            ('state', '=', 'pending'),
+            ('run_id.date_start', '<', limit),
+        ])
+        if stale_lines:
+            stale_lines.write({
+                'state': 'skipped',
+                'message': _("Not synchronized within %d hours of the start of the run") % FLEET_RUN_EXPIRY_HOURS,
+            })
+            _logger.warning(f"Gave up {len(stale_lines)} servers of stale fleet sync runs")
+
+    def _log_summary(self):
+        """Log the summary of finished runs"""
+        for run in self.filtered(lambda r: r.state == 'done'):
+            _logger.info(
+                f"Fleet sync run {run.id} finished: {run.server_count} servers, {run.done_count} synced, "
+                f"{run.failed_count} failed, {run.skipped_count} skipped in {run.duration:.1f} s "
+                f"({run.total_sync_time:.1f} s of sync time)")
+
+
+class PortainerSyncRunLine(models.Model):
+    """Synchronization of one server within a fleet sync run"""
+    _name = 'j_portainer.sync.run.line'
+    _description = 'Portainer Fleet Sync Run Server'
+    _order = 'run_id desc, id'
+
+    run_id = fields.Many2one('j_portainer.sync.run', string='Run', required=True, ondelete='cascade', index=True)
+    server_id = fields.Many2one('j_portainer.server', string='Server', required=True, ondelete='cascade')
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Synced'),
+        ('failed', 'Failed'),
+        ('skipped', 'Skipped'),
+    ], string='Status', default='pending', required=True, index=True)
+    date_start = fields.Datetime('Started', readonly=True)
+    date_end = fields.Datetime('Finished', readonly=True)
+    duration_ms = fields.Integer('Duration (ms)', readonly=True)
+    message = fields.Text('Result', readonly=True)
+
+    def _run(self):
+        """Sync the server of a claimed line and record the outcome
+
+        The server is skipped when another transaction is already syncing
+        it, e.g. a manual synchronization or an overlapping run.
+        """
+        self.ensure_one()
+        server = self.server_id
+        date_start = fields.Datetime.now()
+        start = time.monotonic()
+
+        if not server._lock_sync():
+            state, message = 'skipped', _("Another synchronization of this server is running")
+        else:
+            try:
+                with self.env.cr.savepoint():
+                    result = server.sync_all()
+                state = 'done'
+                message = (result or {}).get('params', {}).get('message', '')
+            except Exception as e:
+                _logger.error(f"Fleet sync of server {server.name} failed: {str(e)}")
+                state, message = 'failed', str(e)
+
+        duration_ms = int((time.monotonic() - start) * 1000)
+        self.write({
+            'state': state,
+            'date_start': date_start,
+            'date_end': fields.Datetime.now(),
+            'duration_ms': duration_ms,
+            'message': message,
+        })
+        _logger.info(f"Fleet sync of server {server.name}: {state} in {duration_ms} ms")
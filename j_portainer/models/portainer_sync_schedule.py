@@ -4,9 +4,26 @@ from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 from datetime import datetime, timedelta
 import logging
+import random
+
+from .portainer_server import SYNC_JOB_STEPS
 
 _logger = logging.getLogger(__name__)
 
+INTERVAL_TYPES = [
+    ('minutes', 'Minutes'),
+    ('hours', 'Hours'),
+    ('days', 'Days'),
+]
+
+# Due times are delayed by a random part of the interval so that schedules
+# with the same interval do not all call Portainer at the same moment
+SYNC_JITTER_RATIO = 0.1
+SYNC_JITTER_MAX_SECONDS = 900
+
+# Sync job step of each server sync method, used to lock the resource type being synced
+SYNC_STEPS_BY_METHOD = {options[0]: step for step, options in SYNC_JOB_STEPS.items()}
+
 
 class PortainerSyncSchedule(models.Model):
     _name = 'j_portainer.sync.schedule'
@@ -21,8 +38,10 @@ class PortainerSyncSchedule(models.Model):
     sequence = fields.Integer('Sequence', default=10, help="Order of execution for sync schedules")
     
     # Configuration Fields
-    sync_days = fields.Integer('Sync Every (Days)', required=True, default=1,
-                              help="Number of days between synchronizations (minimum 1)")
+    interval_number = fields.Integer('Sync Every', required=True, default=1,
+                                     help="Number of interval units between synchronizations (minimum 1)")
+    interval_type = fields.Selection(INTERVAL_TYPES, string='Interval Unit', required=True, default='days',
+                                     help="Unit of the interval between synchronizations")
     sync_all_resources = fields.Boolean('Sync All Resources', default=False,
                                        help="If enabled, will sync all resource types ignoring individual selections")
     resource_type_ids = fields.Many2many('j_portainer.resource.type', string='Resource Types',
@@ -31,8 +50,9 @@ class PortainerSyncSchedule(models.Model):
     # Tracking Fields
     last_sync = fields.Datetime('Last Synchronized', readonly=True,
                                help="Timestamp of the last successful synchronization")
-    next_sync = fields.Datetime('Next Sync Due', compute='_compute_next_sync', store=True,
-                               help="Calculated next synchronization time")
+    next_sync = fields.Datetime('Next Sync Due', compute='_compute_next_sync', store=True, index=True,
+                               help="Calculated next synchronization time, including a random delay of up to "
+                                    "10% of the interval to spread the load on Portainer")
     
     # Status and Information Fields
     sync_status = fields.Selection([
@@ -44,26 +64,43 @@ class PortainerSyncSchedule(models.Model):
     last_sync_result = fields.Text('Last Sync Result', readonly=True,
                                   help="Details of the last synchronization attempt")
     
-    @api.depends('last_sync', 'sync_days')
+    def _get_interval(self):
+        """Return the interval between two synchronizations as a timedelta"""
+        self.ensure_one()
+        return timedelta(**{self.interval_type or 'days': max(self.interval_number, 1)})
+    
+    def _get_jitter(self):
+        """Return the random delay added to the next due time
+        
+        The delay is derived from the schedule and its last sync so that it
+        changes on every run but stays stable when recomputed.
+        """
+        self.ensure_one()
+        max_jitter = min(self._get_interval().total_seconds() * SYNC_JITTER_RATIO, SYNC_JITTER_MAX_SECONDS)
+        if max_jitter < 1:
+            return timedelta()
+        rng = random.Random(f"{self.id}-{self.last_sync}")
+        return timedelta(seconds=int(rng.uniform(0, max_jitter)))
+    
+    @api.depends('last_sync', 'interval_number', 'interval_type')
     def _compute_next_sync(self):
         """Calculate when the next sync should occur"""
         for record in self:
-            if record.last_sync and record.sync_days > 0:
+            if record.interval_number < 1:
+                record.next_sync = False
+            elif record.last_sync:
                 # Calculate next sync time based on last sync + interval
-                next_sync_time = record.last_sync + timedelta(days=record.sync_days)
-                record.next_sync = next_sync_time
-            elif record.sync_days > 0:
-                # If never synced, schedule for now
-                record.next_sync = datetime.now()
+                record.next_sync = record.last_sync + record._get_interval() + record._get_jitter()
             else:
-                record.next_sync = False
+                # If never synced, schedule for now
+                record.next_sync = fields.Datetime.now()
     
-    @api.constrains('sync_days')
-    def _check_sync_days(self):
-        """Validate that sync_days is at least 1"""
+    @api.constrains('interval_number')
+    def _check_interval_number(self):
+        """Validate that the interval is at least 1 unit"""
         for record in self:
-            if record.sync_days < 1:
-                raise ValidationError(_("Sync interval must be at least 1 day."))
+            if record.interval_number < 1:
+                raise ValidationError(_("Sync interval must be at least 1."))
     
     @api.constrains('sync_all_resources', 'resource_type_ids')
     def _check_resource_selection(self):
@@ -98,12 +135,23 @@ class PortainerSyncSchedule(models.Model):
             _logger.info(f"Sync schedule '{self.name}' has never been synced - marking as due")
             return True
         
-        if self.next_sync and datetime.now() >= self.next_sync:
+        if self.next_sync and fields.Datetime.now() >= self.next_sync:
             _logger.info(f"Sync schedule '{self.name}' is due for sync (next sync: {self.next_sync})")
             return True
         
         return False
     
+    def _try_lock(self):
+        """Lock the schedule row for the current transaction
+        
+        Returns:
+            bool: False if another transaction is already running this schedule
+        """
+        self.ensure_one()
+        self.env.cr.execute(
+            f"SELECT id FROM {self._table} WHERE id = %s FOR UPDATE SKIP LOCKED", (self.id,))
+        return bool(self.env.cr.fetchone())
+    
     def execute_sync(self):
         """Execute the synchronization for this schedule"""
         self.ensure_one()
@@ -113,6 +161,10 @@ class PortainerSyncSchedule(models.Model):
             _logger.error(f"No server configured for sync schedule '{self.name}'")
             return False
         
+        if not self._try_lock():
+            _logger.info(f"Sync schedule '{self.name}' is already running - skipping")
+            return False
+        
         # Update status to running
         self.write({
             'sync_status': 'running',
@@ -120,31 +172,13 @@ class PortainerSyncSchedule(models.Model):
         })
         
         try:
-            sync_results = []
-            
-            if self.sync_all_resources:
-                # Sync all resources
-                _logger.info(f"Syncing all resources for server '{self.server_id.name}'")
-                result = self.server_id.sync_all_resources()
-                sync_results.append("All Resources: " + str(result))
-            else:
-                # Sync specific resource types
-                for resource_type in self.resource_type_ids:
-                    _logger.info(f"Syncing {resource_type.name} for server '{self.server_id.name}'")
-                    
-                    # Get the sync method from the resource type
-                    if hasattr(self.server_id, resource_type.sync_method):
-                        sync_method = getattr(self.server_id, resource_type.sync_method)
-                        result = sync_method()
-                        sync_results.append(f"{resource_type.name}: {result}")
-                    else:
-                        _logger.warning(f"Server does not have sync method '{resource_type.sync_method}' for resource type '{resource_type.name}'")
-                        sync_results.append(f"{resource_type.name}: Method not found")
+            with self.env.cr.savepoint():
+                sync_results = self._run_sync()
             
             # Update successful completion
             self.write({
                 'sync_status': 'completed',
-                'last_sync': datetime.now(),
+                'last_sync': fields.Datetime.now(),
                 'last_sync_result': "\n".join(sync_results)
             })
             
@@ -163,11 +197,56 @@ class PortainerSyncSchedule(models.Model):
             
             return False
     
+    def _run_sync(self):
+        """Synchronize the resources of the schedule
+        
+        Returns:
+            list: Result line per synchronized resource type
+        """
+        self.ensure_one()
+        sync_results = []
+        
+        if self.server_id._use_job_graph():
+            # Enqueue the sync as background jobs instead of running it inline
+            steps = None
+            if not self.sync_all_resources:
+                steps = [step for step, options in SYNC_JOB_STEPS.items()
+                         if options[0] in self.resource_type_ids.mapped('sync_method')]
+            _logger.info(f"Enqueuing sync jobs for server '{self.server_id.name}'")
+            self.server_id._enqueue_sync_graph(steps=steps)
+            sync_results.append(f"Sync jobs queued on channel {self.server_id.sync_job_channel}")
+        elif self.sync_all_resources:
+            # Sync all resources
+            _logger.info(f"Syncing all resources for server '{self.server_id.name}'")
+            result = self.server_id.sync_all()
+            sync_results.append("All Resources: " + str(result))
+        else:
+            # Sync specific resource types
+            for resource_type in self.resource_type_ids:
+                _logger.info(f"Syncing {resource_type.name} for server '{self.server_id.name}'")
+                
+                # Get the sync method from the resource type
+                step = SYNC_STEPS_BY_METHOD.get(resource_type.sync_method)
+                if step:
+                    # Skip resources another transaction is already syncing
+                    result = self.server_id._sync_step_locked(step)
+                    sync_results.append(f"{resource_type.name}: {result if result is not None else 'Already running'}")
+                elif hasattr(self.server_id, resource_type.sync_method):
+                    sync_method = getattr(self.server_id, resource_type.sync_method)
+                    result = sync_method()
+                    sync_results.append(f"{resource_type.name}: {result}")
+                else:
+                    _logger.warning(f"Server does not have sync method '{resource_type.sync_method}' for resource type '{resource_type.name}'")
+                    sync_results.append(f"{resource_type.name}: Method not found")
+        
+        return sync_results
+    
     def name_get(self):
         """Custom name display"""
         result = []
         for record in self:
-            name = f"{record.name} ({record.server_id.name}) - Every {record.sync_days} day(s)"
+            interval_label = dict(INTERVAL_TYPES).get(record.interval_type, '').lower()
+            name = f"{record.name} ({record.server_id.name}) - Every {record.interval_number} {interval_label}"
             result.append((record.id, name))
         return result
     
@@ -175,38 +254,40 @@ class PortainerSyncSchedule(models.Model):
     def run_scheduled_syncs(self):
         """
         Main method called by the cron job to check and run due sync schedules
-        This method runs every hour and checks all active sync schedules
+        This method runs every minute and only loads the schedules whose next
+        sync time has passed, using the index on next_sync
         """
         _logger.info("Starting automated sync schedule runner")
         
         # Find all active sync schedules that are due for synchronization
         due_schedules = self.search([
-            ('active', '=', True)
-        ])
+            ('active', '=', True),
+            ('next_sync', '<=', fields.Datetime.now()),
+        ], order='next_sync, sequence')
         
         executed_count = 0
         failed_count = 0
+        skipped_count = 0
         
         for schedule in due_schedules:
             try:
-                # Check if this schedule is due for sync
-                if schedule.is_sync_due():
-                    _logger.info(f"Executing scheduled sync: {schedule.name}")
-                    
-                    # Execute the sync
-                    success = schedule.execute_sync()
-                    
-                    if success:
-                        executed_count += 1
-                        _logger.info(f"Successfully executed sync schedule: {schedule.name}")
-                    else:
-                        failed_count += 1
-                        _logger.warning(f"Failed to execute sync schedule: {schedule.name}")
-                        
+                # Skip schedules still being run by another transaction
+                if not schedule._try_lock():
+                    skipped_count += 1
+                    _logger.info(f"Sync schedule '{schedule.name}' is already running - skipping")
+                    continue
+                
+                _logger.info(f"Executing scheduled sync: {schedule.name}")
+                
+                # Execute the sync
+                success = schedule.execute_sync()
+                
+                if success:
+                    executed_count += 1
+                    _logger.info(f"Successfully executed sync schedule: {schedule.name}")
                 else:
-                    # Not due yet, log when it will be due
-                    if schedule.next_sync:
-                        _logger.debug(f"Sync schedule '{schedule.name}' not due yet (next sync: {schedule.next_sync})")
+                    failed_count += 1
+                    _logger.warning(f"Failed to execute sync schedule: {schedule.name}")
                     
             except Exception as e:
                 failed_count += 1
@@ -222,11 +303,12 @@ class PortainerSyncSchedule(models.Model):
                     _logger.error(f"Could not update schedule status: {str(update_error)}")
         
         total_schedules = len(due_schedules)
-        _logger.info(f"Sync schedule runner completed: {total_schedules} schedules checked, "
-                    f"{executed_count} executed, {failed_count} failed")
+        _logger.info(f"Sync schedule runner completed: {total_schedules} schedules due, "
+                    f"{executed_count} executed, {failed_count} failed, {skipped_count} skipped")
         
         return {
             'total_checked': total_schedules,
             'executed': executed_count,
-            'failed': failed_count
-        }
\ No newline at end of file
+            'failed': failed_count,
+            'skipped': skipped_count,
+        }
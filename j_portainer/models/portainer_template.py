@@ -12,7 +12,8 @@ class PortainerTemplate(models.Model):
     _name = 'j_portainer.template'
     _description = 'Portainer Template'
     _order = 'title'
-    _inherit = ['j_portainer.template.mixin']
+    _inherit = ['j_portainer.template.mixin', 'j_portainer.sync.mixin']
+    _sync_key_fields = ('template_id',)
     
     is_custom = fields.Boolean('Custom Template', default=False, help="Used to identify standard templates")
     
@@ -6,12 +6,16 @@ from odoo.exceptions import UserError
 import json
 import logging
 
+from ..tools.volume_usage import DEFAULT_SIZE_CHECK_INTERVAL
+
 _logger = logging.getLogger(__name__)
 
 class PortainerVolume(models.Model):
     _name = 'j_portainer.volume'
     _description = 'Portainer Volume'
     _order = 'name'
+    _inherit = ['j_portainer.sync.mixin']
+    _sync_key_fields = ('environment_id', 'name')
     
     name = fields.Char('Name', required=True, copy=False)
     volume_id = fields.Char('Volume ID', help="The unique identifier for this volume")
@@ -26,6 +30,9 @@ class PortainerVolume(models.Model):
     labels_html = fields.Html('Labels HTML', compute='_compute_labels_html')
     details = fields.Text('Details')
     in_use = fields.Boolean('In Use', default=False, help="Whether the volume is currently used by any containers")
+    size_check_interval = fields.Integer('Size Check Interval (Minutes)', default=DEFAULT_SIZE_CHECK_INTERVAL,
+                                         help="Minimum time between two automatic size checks of this volume "
+                                              "during container sync. 0 disables automatic size checks.")
     
     server_id = fields.Many2one('j_portainer.server', string='Server', required=True, default=lambda self: self._default_server_id())
     environment_id = fields.Many2one('j_portainer.environment', string='Environment', required=True, 
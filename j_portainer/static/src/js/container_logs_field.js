@@ -0,0 +1,95 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+import { standardFieldProps } from "@web/views/fields/standard_field_props";
+import { Component, onWillUnmount, useEffect, useRef, useState } from "@odoo/owl";
+
+// Interval between two polls of the container logs in follow mode
+const FOLLOW_INTERVAL = 3000;
+
+/**
+ * Read-only container log viewer with a follow mode.
+ *
+ * In follow mode the wizard is polled for new lines; the server pushes them
+ * on the bus and they are appended to the displayed page.
+ */
+export class ContainerLogsField extends Component {
+    static template = "j_portainer.ContainerLogsField";
+    static props = { ...standardFieldProps };
+
+    setup() {
+        this.orm = useService("orm");
+        this.busService = useService("bus_service");
+        this.logRef = useRef("logs");
+        this.state = useState({ following: false, appended: "" });
+        this.timer = null;
+
+        this.onNotification = this.onNotification.bind(this);
+        this.busService.subscribe("j_portainer.container_logs", this.onNotification);
+
+        useEffect(
+            () => {
+                if (this.state.following && this.logRef.el) {
+                    this.logRef.el.scrollTop = this.logRef.el.scrollHeight;
+                }
+            },
+            () => [this.state.appended]
+        );
+
+        onWillUnmount(() => {
+            this.stopFollowing();
+            this.busService.unsubscribe("j_portainer.container_logs", this.onNotification);
+        });
+    }
+
+    get text() {
+        const value = this.props.record.data[this.props.name] || "";
+        return this.state.appended ? `${value}\n${this.state.appended}` : value;
+    }
+
+    onNotification(payload) {
+        if (!payload || payload.wizard_id !== this.props.record.resId || !payload.text) {
+            return;
+        }
+        this.state.appended = this.state.appended ? `${this.state.appended}\n${payload.text}` : payload.text;
+    }
+
+    async toggleFollow() {
+        if (this.state.following) {
+            this.stopFollowing();
+            return;
+        }
+        if (!this.props.record.resId) {
+            await this.props.record.save();
+        }
+        this.state.following = true;
+        await this.poll();
+    }
+
+    async poll() {
+        if (!this.state.following) {
+            return;
+        }
+        try {
+            await this.orm.call(this.props.record.resModel, "follow_logs", [[this.props.record.resId]]);
+        } finally {
+            if (this.state.following) {
+                this.timer = setTimeout(() => this.poll(), FOLLOW_INTERVAL);
+            }
+        }
+    }
+
+    stopFollowing() {
+        this.state.following = false;
+        if (this.timer) {
+            clearTimeout(this.timer);
+            this.timer = null;
+        }
+    }
+}
+
+registry.category("fields").add("j_portainer_container_logs", {
+    component: ContainerLogsField,
+    supportedTypes: ["text"],
+});
@@ -0,0 +1,734 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Local stand-in for the Portainer API, for tests and benchmarks
+
+``FakePortainer`` serves a generated fleet of N environments, each with M
+containers and matching images, volumes, networks and stacks, on the
+Portainer and Docker proxy endpoints used by the module. Every request is
+counted per route, and a configurable latency and error rate can be
+injected to measure how the sync behaves against slow or flaky hosts.
+
+It only depends on the standard library and can also be run on its own::
+
+    python fake_portainer.py --environments 5 --containers 50 --latency-ms 20
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import struct
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PORTAINER_VERSION = '2.27.4'
+API_PREFIX = '/api'
+DOCKER_PREFIX = r'/api/endpoints/(?P<env>\d+)/docker'
+
+
+class FakePortainerConfig(object):
+    """Size of the generated fleet and injected faults
+
+    Attributes:
+        environments (int): Number of environments (Portainer endpoints)
+        containers (int): Containers per environment
+        images (int): Images per environment (default: one per 4 containers)
+        volumes (int): Volumes per environment (default: one per container)
+        networks (int): Custom networks per environment, besides bridge, host and none
+        stacks (int): Stacks per environment, containers are spread over them
+        templates (int): Application templates of the catalog
+        custom_templates (int): Custom templates
+        latency_ms (int): Delay added to every response
+        jitter_ms (int): Random extra delay, up to this value
+        error_rate (float): Share of requests answered with error_status
+        error_status (int): Status of injected errors
+        error_path (str): Regular expression of the paths errors are injected on
+        failing_environments (iterable): Environment IDs whose Docker API always answers 502
+        seed (int): Seed of the generated data and of the injected errors
+    """
+
+    def __init__(self, environments=3, containers=20, images=None, volumes=None, networks=3, stacks=2,
+                 templates=50, custom_templates=10, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 error_status=500, error_path=r'/docker/', failing_environments=(), seed=42):
+        self.environments = environments
+        self.containers = containers
+        self.images = images if images is not None else max(1, containers // 4)
+        self.volumes = volumes if volumes is not None else containers
+        self.networks = networks
+        self.stacks = stacks
+        self.templates = templates
+        self.custom_templates = custom_templates
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.error_path = re.compile(error_path)
+        self.failing_environments = set(failing_environments)
+        self.seed = seed
+
+    def to_dict(self):
+        values = dict(vars(self))
+        values['error_path'] = self.error_path.pattern
+        values['failing_environments'] = sorted(self.failing_environments)
+        return values
+
+
+def _digest(*parts):
+    return hashlib.sha256(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+
+def _docker_frame(stream, payload):
+    """Encode a multiplexed Docker output frame"""
+    return struct.pack('>BxxxL', stream, len(payload)) + payload
+
+
+class FakeFleet(object):
+    """Generated Portainer objects, stable for a given configuration"""
+
+    def __init__(self, config):
+        self.config = config
+        rng = random.Random(config.seed)
+        created = 1700000000
+
+        self.environments = {}
+        self.containers = {}
+        self.images = {}
+        self.volumes = {}
+        self.networks = {}
+        self.stacks = {}
+        self.stack_files = {}
+
+        stack_id = 0
+        for env_id in range(1, config.environments + 1):
+            self.environments[env_id] = {
+                'Id': env_id,
+                'Name': f'env-{env_id}',
+                'Type': 1,
+                'URL': f'tcp://10.0.{env_id // 256}.{env_id % 256}:2375',
+                'Status': 1,
+                'PublicURL': f'env-{env_id}.example.test',
+                'GroupId': 1,
+                'TagIds': [],
+                'Tags': [],
+                'Snapshots': [{'Swarm': False, 'DockerVersion': '24.0.7', 'Time': created}],
+            }
+
+            images = []
+            for index in range(config.images):
+                image_id = 'sha256:' + _digest('image', env_id, index)
+                images.append({
+                    'Id': image_id,
+                    'RepoTags': [f'app{index}:1.{index % 10}'],
+                    'RepoDigests': [f'app{index}@sha256:{_digest("repo", index)}'],
+                    'Created': created + index,
+                    'Size': rng.randint(5, 900) * 1024 * 1024,
+                    'SharedSize': -1,
+                    'VirtualSize': 0,
+                    'Labels': {'maintainer': 'bench'},
+                    'Containers': -1,
+                })
+            self.images[env_id] = images
+
+            networks = [{
+                'Name': name,
+                'Id': _digest('network', env_id, name),
+                'Created': '2024-01-01T00:00:00Z',
+                'Driver': driver,
+                'Scope': 'local',
+                'EnableIPv6': False,
+                'IPAM': {'Driver': 'default', 'Config': [{'Subnet': f'172.{17 + index}.0.0/16',
+                                                          'Gateway': f'172.{17 + index}.0.1'}]
+                         if driver == 'bridge' else []},
+                'Internal': False,
+                'Attachable': False,
+                'Labels': {},
+                'Options': {'com.docker.network.bridge.name': f'docker{index}'} if driver == 'bridge' else {},
+                'Containers': {},
+            } for index, (name, driver) in enumerate([('bridge', 'bridge'), ('host', 'host'), ('none', 'null')])]
+            for index in range(config.networks):
+                name = f'net-{env_id}-{index}'
+                networks.append({
+                    'Name': name,
+                    'Id': _digest('network', env_id, name),
+                    'Created': '2024-01-01T00:00:00Z',
+                    'Driver': 'bridge',
+                    'Scope': 'local',
+                    'EnableIPv6': False,
+                    'IPAM': {'Driver': 'default', 'Config': [{
+                        'Subnet': f'10.{env_id % 256}.{index}.0/24',
+                        'Gateway': f'10.{env_id % 256}.{index}.1',
+                        'ExcludedIPs': [f'10.{env_id % 256}.{index}.{host}' for host in range(2, 6)],
+                    }]},
+                    'Internal': False,
+                    'Attachable': True,
+                    'Labels': {'com.example.owner': 'bench', 'com.example.index': str(index)},
+                    'Options': {'com.docker.network.driver.mtu': '1500'},
+                    'Containers': {},
+                })
+            self.networks[env_id] = networks
+
+            volumes = []
+            for index in range(config.volumes):
+                name = f'vol-{env_id}-{index}'
+                volumes.append({
+                    'Name': name,
+                    'Driver': 'local',
+                    'Mountpoint': f'/var/lib/docker/volumes/{name}/_data',
+                    'CreatedAt': '2024-01-01T00:00:00Z',
+                    'Labels': {},
+                    'Scope': 'local',
+                    'Options': {},
+                })
+            self.volumes[env_id] = volumes
+
+            stacks = []
+            for index in range(config.stacks):
+                stack_id += 1
+                stack = {
+                    'Id': stack_id,
+                    'Name': f'stack-{env_id}-{index}',
+                    'Type': 2,
+                    'EndpointId': env_id,
+                    'Status': 1,
+                    'CreationDate': created,
+                    'UpdateDate': created,
+                    'Env': [],
+                }
+                stacks.append(stack)
+                self.stacks[stack_id] = stack
+                self.stack_files[stack_id] = (
+                    f"version: '3'\nservices:\n  app:\n    image: app{index % config.images}:1.0\n"
+                )
+
+            containers = []
+            for index in range(config.containers):
+                container_id = _digest('container', env_id, index)
+                image = images[index % len(images)]
+                network = networks[3 + index % config.networks] if config.networks else networks[0]
+                volume = volumes[index % len(volumes)] if volumes else None
+                stack = stacks[index % len(stacks)] if stacks else None
+                running = index % 5 != 0
+                labels = {'com.example.index': str(index)}
+                if stack:
+                    labels['com.docker.compose.project'] = stack['Name']
+                mounts = [{
+                    'Type': 'volume',
+                    'Name': volume['Name'],
+                    'Source': volume['Mountpoint'],
+                    'Destination': '/data',
+                    'Driver': 'local',
+                    'Mode': 'z',
+                    'RW': True,
+                }] if volume else []
+                networks_settings = {network['Name']: {
+                    'NetworkID': network['Id'],
+                    'EndpointID': _digest('endpoint', container_id),
+                    'IPAddress': f'10.{env_id % 256}.{index % 250}.{index % 250 + 2}',
+                    'Gateway': '',
+                    'MacAddress': '02:42:ac:11:00:02',
+                }}
+                containers.append({
+                    'Id': container_id,
+                    'Names': [f'/app-{env_id}-{index}'],
+                    'Image': image['RepoTags'][0],
+                    'ImageID': image['Id'],
+                    'Command': 'run',
+                    'Created': created + index,
+                    'State': 'running' if running else 'exited',
+                    'Status': 'Up 2 hours' if running else 'Exited (0) 1 hour ago',
+                    'Ports': [{'PrivatePort': 8080, 'PublicPort': 10000 + index, 'Type': 'tcp', 'IP': '0.0.0.0'}],
+                    'Labels': labels,
+                    'Mounts': mounts,
+                    'NetworkSettings': {'Networks': networks_settings},
+                    'HostConfig': {'NetworkMode': network['Name']},
+                })
+            self.containers[env_id] = containers
+
+        self.templates = [{
+            'id': index + 1,
+            'type': 1 if index % 3 else 3,
+            'title': f'Template {index}',
+            'description': f'Application template {index}',
+            'image': f'template{index}:latest',
+            'logo': '',
+            'categories': ['bench'],
+            'platform': 'linux',
+            'env': [{'name': 'VAR', 'label': 'Variable'}],
+            'volumes': [{'container': '/data'}],
+            'ports': ['8080/tcp'],
+        } for index in range(config.templates)]
+
+        self.custom_templates = [{
+            'Id': index + 1,
+            'Title': f'Custom template {index}',
+            'Description': f'Custom template {index}',
+            'Note': '',
+            'Platform': 1,
+            'Type': 2,
+            'Logo': '',
+            'EntryPoint': 'docker-compose.yml',
+            'ProjectPath': f'/data/custom_templates/{index + 1}',
+            'CreatedByUserId': 1,
+            'ResourceControl': None,
+        } for index in range(config.custom_templates)]
+
+    def container(self, env_id, container_id):
+        for container in self.containers.get(env_id, []):
+            if container['Id'] == container_id or container['Names'][0].lstrip('/') == container_id:
+                return container
+        return None
+
+    def inspect_container(self, env_id, container_id):
+        container = self.container(env_id, container_id)
+        if not container:
+            return None
+        running = container['State'] == 'running'
+        return {
+            'Id': container['Id'],
+            'Name': container['Names'][0],
+            'Created': '2024-01-01T00:00:00.000000000Z',
+            'Image': container['ImageID'],
+            'State': {'Status': container['State'], 'Running': running, 'ExitCode': 0,
+                      'StartedAt': '2024-01-01T00:00:00Z', 'FinishedAt': '0001-01-01T00:00:00Z'},
+            'RestartCount': 0,
+            'Config': {
+                'Hostname': container['Id'][:12],
+                'Image': container['Image'],
+                'Labels': container['Labels'],
+                'Env': ['PATH=/usr/local/bin:/usr/bin:/bin', f"INDEX={container['Labels']['com.example.index']}"],
+                'ExposedPorts': {'8080/tcp': {}},
+                'Cmd': ['run'],
+            },
+            'HostConfig': {
+                'RestartPolicy': {'Name': 'unless-stopped', 'MaximumRetryCount': 0},
+                'PortBindings': {'8080/tcp': [{'HostIp': '', 'HostPort': str(port['PublicPort'])}
+                                              for port in container['Ports']]},
+                'Privileged': False,
+                'Memory': 0,
+                'NanoCpus': 0,
+                'NetworkMode': container['HostConfig']['NetworkMode'],
+            },
+            'Mounts': container['Mounts'],
+            'NetworkSettings': container['NetworkSettings'],
+        }
+
+
+class FakePortainer(object):
+    """Threaded HTTP server answering like a Portainer server
+
+    Usage::
+
+        fake = FakePortainer(FakePortainerConfig(environments=5, containers=50))
+        url = fake.start()
+        ...
+        fake.stop()
+    """
+
+    def __init__(self, config=None):
+        self.config = config or FakePortainerConfig()
+        self.fleet = FakeFleet(self.config)
+        self.calls = Counter()
+        self.errors = Counter()
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._execs = {}
+        self._httpd = None
+        self._thread = None
+        self.routes = self._build_routes()
+
+    # Server lifecycle
+
+    def start(self, host='127.0.0.1', port=0):
+        """Start serving in a background thread
+
+        Returns:
+            str: Base URL of the server
+        """
+        fake = self
+
+        class Handler(FakePortainerHandler):
+            server_fake = fake
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='fake_portainer', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    # Counters
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls.clear()
+            self.errors.clear()
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def counters(self):
+        """Return the calls and injected errors per route"""
+        with self._lock:
+            return {
+                'total': sum(self.calls.values()),
+                'errors': sum(self.errors.values()),
+                'by_route': dict(sorted(self.calls.items())),
+            }
+
+    # Request dispatch
+
+    def _build_routes(self):
+        routes = [
+            ('GET', r'/api/system/status', 'system_status', self._system_status),
+            ('GET', r'/api/status', 'system_status', self._system_status),
+            ('GET', r'/api/system/version', 'system_version', self._system_version),
+            ('GET', r'/api/system/info', 'system_info', self._system_info),
+            ('GET', r'/api/endpoints', 'endpoints', self._endpoints),
+            ('GET', r'/api/endpoints/(?P<env>\d+)', 'endpoint', self._endpoint),
+            ('GET', r'/api/stacks', 'stacks', self._stacks),
+            ('GET', r'/api/stacks/(?P<id>\d+)', 'stack', self._stack),
+            ('GET', r'/api/stacks/(?P<id>\d+)/file', 'stack_file', self._stack_file),
+            ('POST', r'/api/stacks/(?P<id>\d+)/(?:start|stop)', 'stack_action', self._stack),
+            ('DELETE', r'/api/stacks/(?P<id>\d+)', 'stack_delete', self._no_content),
+            ('GET', r'/api/templates', 'templates', self._templates),
+            ('GET', r'/api/custom_templates', 'custom_templates', self._custom_templates),
+            ('GET', r'/api/custom_templates/(?P<id>\d+)', 'custom_template', self._custom_template),
+            ('GET', r'/api/custom_templates/(?P<id>\d+)/file', 'custom_template_file', self._custom_template_file),
+            ('DELETE', r'/api/custom_templates/(?P<id>\d+)', 'custom_template_delete', self._no_content),
+            ('GET', DOCKER_PREFIX + r'/info', 'docker_info', self._docker_info),
+            ('GET', DOCKER_PREFIX + r'/version', 'docker_version', self._docker_version),
+            ('GET', DOCKER_PREFIX + r'/events', 'docker_events', self._docker_events),
+            ('GET', DOCKER_PREFIX + r'/containers/json', 'containers', self._containers),
+            ('GET', DOCKER_PREFIX + r'/containers/(?P<id>[^/]+)/json', 'container', self._container),
+            ('GET', DOCKER_PREFIX + r'/containers/(?P<id>[^/]+)/logs', 'container_logs', self._container_logs),
+            ('POST', DOCKER_PREFIX + r'/containers/(?P<id>[^/]+)/(?:start|stop|restart|kill|pause|unpause)',
+             'container_action', self._container_action),
+            ('POST', DOCKER_PREFIX + r'/containers/(?P<id>[^/]+)/exec', 'exec_create', self._exec_create),
+            ('DELETE', DOCKER_PREFIX + r'/containers/(?P<id>[^/]+)', 'container_delete', self._no_content),
+            ('POST', DOCKER_PREFIX + r'/exec/(?P<id>[^/]+)/start', 'exec_start', self._exec_start),
+            ('GET', DOCKER_PREFIX + r'/exec/(?P<id>[^/]+)/json', 'exec_inspect', self._exec_inspect),
+            ('GET', DOCKER_PREFIX + r'/images/json', 'images', self._images),
+            ('GET', DOCKER_PREFIX + r'/images/(?P<id>.+)/json', 'image', self._image),
+            ('GET', DOCKER_PREFIX + r'/images/(?P<id>.+)/history', 'image_history', self._image_history),
+            ('DELETE', DOCKER_PREFIX + r'/images/(?P<id>.+)', 'image_delete', self._deleted_list),
+            ('POST', DOCKER_PREFIX + r'/images/prune', 'images_prune', self._prune),
+            ('GET', DOCKER_PREFIX + r'/volumes', 'volumes', self._volumes),
+            ('GET', DOCKER_PREFIX + r'/volumes/(?P<id>[^/]+)', 'volume', self._volume),
+            ('DELETE', DOCKER_PREFIX + r'/volumes/(?P<id>[^/]+)', 'volume_delete', self._no_content),
+            ('POST', DOCKER_PREFIX + r'/volumes/prune', 'volumes_prune', self._prune),
+            ('GET', DOCKER_PREFIX + r'/networks', 'networks', self._networks),
+            ('GET', DOCKER_PREFIX + r'/networks/(?P<id>[^/]+)', 'network', self._network),
+            ('DELETE', DOCKER_PREFIX + r'/networks/(?P<id>[^/]+)', 'network_delete', self._no_content),
+            ('POST', DOCKER_PREFIX + r'/networks/(?P<id>[^/]+)/(?:connect|disconnect)', 'network_attach',
+             self._ok),
+            ('POST', DOCKER_PREFIX + r'/networks/prune', 'networks_prune', self._prune),
+        ]
+        return [(method, re.compile(pattern + r'/?$'), name, handler) for method, pattern, name, handler in routes]
+
+    def dispatch(self, method, path, query, body):
+        """Answer a request
+
+        Returns:
+            tuple: (status, headers dict, body bytes)
+        """
+        for route_method, pattern, name, handler in self.routes:
+            if route_method != method:
+                continue
+            match = pattern.match(path)
+            if not match:
+                continue
+            with self._lock:
+                self.calls[f'{method} {name}'] += 1
+                inject_error = (self.config.error_rate and self.config.error_path.search(path)
+                                and self._rng.random() < self.config.error_rate)
+
+            self._delay()
+            params = match.groupdict()
+            env_id = int(params['env']) if params.get('env') else None
+            if env_id is not None and env_id in self.config.failing_environments:
+                return self._error(name, 502, 'Unable to reach the environment agent')
+            if inject_error:
+                return self._error(name, self.config.error_status, 'Injected error')
+            if env_id is not None and env_id not in self.fleet.environments:
+                return self._json(404, {'message': 'Environment not found'})
+            return handler(env_id=env_id, id=params.get('id'), query=query, body=body)
+
+        with self._lock:
+            self.calls[f'{method} unknown'] += 1
+        return self._json(404, {'message': f'No route for {method} {path}'})
+
+    def _delay(self):
+        delay = self.config.latency_ms
+        if self.config.jitter_ms:
+            with self._lock:
+                delay += self._rng.uniform(0, self.config.jitter_ms)
+        if delay:
+            time.sleep(delay / 1000.0)
+
+    def _error(self, name, status, message):
+        with self._lock:
+            self.errors[name] += 1
+        return self._json(status, {'message': message, 'details': message})
+
+    # Responses
+
+    @staticmethod
+    def _json(status, data):
+        return status, {'Content-Type': 'application/json'}, json.dumps(data).encode('utf-8')
+
+    def _ok(self, **kwargs):
+        return self._json(200, {})
+
+    def _no_content(self, **kwargs):
+        return 204, {}, b''
+
+    def _deleted_list(self, id=None, **kwargs):
+        return self._json(200, [{'Untagged': id}, {'Deleted': id}])
+
+    def _prune(self, **kwargs):
+        return self._json(200, {'SpaceReclaimed': 0})
+
+    def _system_status(self, **kwargs):
+        return self._json(200, {'Version': PORTAINER_VERSION, 'InstanceID': 'fake-portainer'})
+
+    def _system_version(self, **kwargs):
+        return self._json(200, {'ServerVersion': PORTAINER_VERSION, 'UpdateAvailable': False})
+
+    def _system_info(self, **kwargs):
+        return self._json(200, {'platform': 'Docker Standalone', 'edgeAgents': 0, 'agents': 0})
+
+    def _endpoints(self, **kwargs):
+        return self._json(200, list(self.fleet.environments.values()))
+
+    def _endpoint(self, env_id=None, **kwargs):
+        return self._json(200, self.fleet.environments[env_id])
+
+    def _stacks(self, query=None, **kwargs):
+        return self._json(200, list(self.fleet.stacks.values()))
+
+    def _stack(self, id=None, **kwargs):
+        stack = self.fleet.stacks.get(int(id))
+        return self._json(200, stack) if stack else self._json(404, {'message': 'Stack not found'})
+
+    def _stack_file(self, id=None, **kwargs):
+        content = self.fleet.stack_files.get(int(id))
+        if content is None:
+            return self._json(404, {'message': 'Stack not found'})
+        return self._json(200, {'StackFileContent': content})
+
+    def _templates(self, **kwargs):
+        return self._json(200, {'version': '2', 'templates': self.fleet.templates})
+
+    def _custom_templates(self, **kwargs):
+        return self._json(200, self.fleet.custom_templates)
+
+    def _custom_template(self, id=None, **kwargs):
+        for template in self.fleet.custom_templates:
+            if template['Id'] == int(id):
+                return self._json(200, template)
+        return self._json(404, {'message': 'Template not found'})
+
+    def _custom_template_file(self, id=None, **kwargs):
+        return self._json(200, {'FileContent': f"version: '3'\nservices:\n  web:\n    image: custom{id}:latest\n"})
+
+    def _docker_info(self, env_id=None, **kwargs):
+        return self._json(200, {
+            'ID': _digest('host', env_id),
+            'Name': f'host-{env_id}',
+            'Containers': len(self.fleet.containers[env_id]),
+            'Images': len(self.fleet.images[env_id]),
+            'ServerVersion': '24.0.7',
+            'Swarm': {'NodeID': '', 'LocalNodeState': 'inactive'},
+        })
+
+    def _docker_version(self, **kwargs):
+        return self._json(200, {'Version': '24.0.7', 'ApiVersion': '1.43'})
+
+    def _docker_events(self, **kwargs):
+        # No event happened: the stream ends right away
+        return 200, {'Content-Type': 'application/json'}, b''
+
+    def _containers(self, env_id=None, **kwargs):
+        return self._json(200, self.fleet.containers[env_id])
+
+    def _container(self, env_id=None, id=None, **kwargs):
+        details = self.fleet.inspect_container(env_id, id)
+        return self._json(200, details) if details else self._json(404, {'message': 'No such container'})
+
+    def _container_logs(self, env_id=None, id=None, **kwargs):
+        body = b''.join(_docker_frame(1, f'log line {line}\n'.encode('utf-8')) for line in range(20))
+        return 200, {'Content-Type': 'application/vnd.docker.raw-stream'}, body
+
+    def _container_action(self, env_id=None, id=None, **kwargs):
+        if not self.fleet.container(env_id, id):
+            return self._json(404, {'message': 'No such container'})
+        return self._no_content()
+
+    def _exec_create(self, env_id=None, id=None, body=None, **kwargs):
+        if not self.fleet.container(env_id, id):
+            return self._json(404, {'message': 'No such container'})
+        payload = json.loads(body or b'{}')
+        exec_id = _digest('exec', env_id, id, time.monotonic(), self._rng.random())
+        with self._lock:
+            self._execs[exec_id] = payload.get('Cmd') or []
+        return self._json(201, {'Id': exec_id})
+
+    def _exec_start(self, id=None, **kwargs):
+        with self._lock:
+            cmd = self._execs.get(id)
+        if cmd is None:
+            return self._json(404, {'message': 'No such exec instance'})
+        if cmd[:2] == ['sh', '-c'] and len(cmd) > 3 and 'du -s' in cmd[2]:
+            # Disk usage probe: "unit" header then one "<size>\t<path>" line per path
+            lines = ['unit 1'] + [f'{len(path) * 4096}\t{path}' for path in cmd[4:]]
+            output = ('\n'.join(lines) + '\n').encode('utf-8')
+        else:
+            output = (' '.join(cmd) + '\n').encode('utf-8')
+        return 200, {'Content-Type': 'application/vnd.docker.raw-stream'}, _docker_frame(1, output)
+
+    def _exec_inspect(self, id=None, **kwargs):
+        with self._lock:
+            known = id in self._execs
+        if not known:
+            return self._json(404, {'message': 'No such exec instance'})
+        return self._json(200, {'ID': id, 'Running': False, 'ExitCode': 0})
+
+    def _images(self, env_id=None, **kwargs):
+        return self._json(200, self.fleet.images[env_id])
+
+    def _find_image(self, env_id, image_id):
+        for image in self.fleet.images[env_id]:
+            if image['Id'] == image_id or image_id in image['RepoTags']:
+                return image
+        return None
+
+    def _image(self, env_id=None, id=None, **kwargs):
+        image = self._find_image(env_id, id)
+        if not image:
+            return self._json(404, {'message': 'No such image'})
+        return self._json(200, {
+            'Id': image['Id'],
+            'RepoTags': image['RepoTags'],
+            'RepoDigests': image['RepoDigests'],
+            'Created': '2024-01-01T00:00:00Z',
+            'Architecture': 'amd64',
+            'Os': 'linux',
+            'Size': image['Size'],
+            'Config': {'Labels': image['Labels'], 'Env': ['PATH=/usr/bin'], 'Cmd': ['run']},
+        })
+
+    def _image_history(self, env_id=None, id=None, **kwargs):
+        image = self._find_image(env_id, id)
+        if not image:
+            return self._json(404, {'message': 'No such image'})
+        return self._json(200, [{
+            'Id': image['Id'] if layer == 0 else '<missing>',
+            'Created': 1700000000 - layer,
+            'CreatedBy': f'/bin/sh -c #(nop) layer {layer}',
+            'Tags': image['RepoTags'] if layer == 0 else None,
+            'Size': layer * 1024,
+            'Comment': '',
+        } for layer in range(8)])
+
+    def _volumes(self, env_id=None, **kwargs):
+        return self._json(200, {'Volumes': self.fleet.volumes[env_id], 'Warnings': []})
+
+    def _volume(self, env_id=None, id=None, **kwargs):
+        for volume in self.fleet.volumes[env_id]:
+            if volume['Name'] == id:
+                return self._json(200, volume)
+        return self._json(404, {'message': 'No such volume'})
+
+    def _networks(self, env_id=None, **kwargs):
+        return self._json(200, self.fleet.networks[env_id])
+
+    def _network(self, env_id=None, id=None, **kwargs):
+        for network in self.fleet.networks[env_id]:
+            if network['Id'] == id or network['Name'] == id:
+                return self._json(200, network)
+        return self._json(404, {'message': 'No such network'})
+
+
+class FakePortainerHandler(BaseHTTPRequestHandler):
+    """Request handler delegating to the FakePortainer of the server"""
+
+    server_fake = None
+    protocol_version = 'HTTP/1.1'
+
+    def _handle(self, method):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        if not self.headers.get('X-API-Key'):
+            status, headers, payload = FakePortainer._json(401, {'message': 'Unauthorized'})
+        else:
+            status, headers, payload = self.server_fake.dispatch(method, url.path, parse_qs(url.query), body)
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if payload and method != 'HEAD':
+            self.wfile.write(payload)
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PUT(self):
+        self._handle('PUT')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def log_message(self, format, *args):
+        # Keep test and benchmark output readable
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--environments', type=int, default=3)
+    parser.add_argument('--containers', type=int, default=20)
+    parser.add_argument('--stacks', type=int, default=2)
+    parser.add_argument('--latency-ms', type=int, default=0)
+    parser.add_argument('--jitter-ms', type=int, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakePortainer(FakePortainerConfig(
+        environments=args.environments, containers=args.containers, stacks=args.stacks,
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+    ))
+    print(f"Fake Portainer listening on {fake.start(port=args.port)}, any X-API-Key is accepted")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        fake.stop()
+        print(json.dumps(fake.counters(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Benchmarks of the Portainer synchronization against a fake Portainer
+
+Each scenario times a sync method and counts the HTTP calls it made, the SQL
+queries it ran and the rows it inserted, updated or deleted. The results are
+written as JSON so that runs can be compared across changes.
+
+The benchmarks are excluded from standard test runs, run them with::
+
+    odoo-bin -d bench -i j_portainer --test-tags j_portainer_benchmark --stop-after-init
+
+The size of the fleet and the faults are set with environment variables:
+
+* ``J_PORTAINER_BENCH_ENVIRONMENTS`` (default 3) and
+  ``J_PORTAINER_BENCH_CONTAINERS`` (default 50 per environment)
+* ``J_PORTAINER_BENCH_LATENCY_MS`` (default 20) used by the latency scenario
+* ``J_PORTAINER_BENCH_ERROR_RATE`` (default 0.05) used by the error scenario
+* ``J_PORTAINER_BENCH_OUTPUT``, path of the JSON results
+  (default ``j_portainer_benchmark.json`` in the temporary directory)
+"""
+
+import json
+import logging
+import os
+import platform
+import re
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from contextlib import contextmanager
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+
+from .fake_portainer import FakePortainer, FakePortainerConfig
+
+_logger = logging.getLogger(__name__)
+
+# SQL statements counted as rows written, with the table they write to
+WRITE_STATEMENT_RE = re.compile(r'^\s*(INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?(\w+)"?', re.IGNORECASE)
+
+# Models mirroring Portainer objects, whose records must survive a sync with nothing changed
+SYNCED_MODELS = (
+    'j_portainer.environment',
+    'j_portainer.container',
+    'j_portainer.image',
+    'j_portainer.volume',
+    'j_portainer.network',
+    'j_portainer.stack',
+    'j_portainer.template',
+    'j_portainer.customtemplate',
+)
+
+# Container fields compared before and after a sync with errors, the One2many ones by IDs
+CONTAINER_SNAPSHOT_FIELDS = ('state', 'details', 'label_ids', 'volume_ids', 'network_ids', 'env_ids', 'port_ids')
+
+# Per-resource sync methods benchmarked after sync_all, in dependency order
+SYNC_METHODS = (
+    'sync_environments',
+    'sync_images',
+    'sync_volumes',
+    'sync_networks',
+    'sync_standard_templates',
+    'sync_custom_templates',
+    'sync_stacks',
+    'sync_containers',
+)
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name) or default)
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name) or default)
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(__file__),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+@tagged('post_install', '-at_install', '-standard', 'j_portainer_benchmark')
+class TestSyncBenchmark(TransactionCase):
+    """Time the sync methods against a generated fleet"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.config = FakePortainerConfig(
+            environments=_env_int('J_PORTAINER_BENCH_ENVIRONMENTS', 3),
+            containers=_env_int('J_PORTAINER_BENCH_CONTAINERS', 50),
+        )
+        cls.fake = FakePortainer(cls.config)
+        cls.fake.start()
+        cls.addClassCleanup(cls.fake.stop)
+
+        cls.results = []
+        cls.output_path = os.environ.get('J_PORTAINER_BENCH_OUTPUT') or os.path.join(
+            tempfile.gettempdir(), 'j_portainer_benchmark.json')
+        cls.addClassCleanup(cls._write_results)
+
+    @classmethod
+    def _write_results(cls):
+        report = {
+            'meta': {
+                'date': fields.Datetime.to_string(fields.Datetime.now()),
+                'revision': _git_revision(),
+                'python': platform.python_version(),
+                'fleet': cls.config.to_dict(),
+            },
+            'results': cls.results,
+        }
+        with open(cls.output_path, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+        _logger.info(f"Wrote {len(cls.results)} benchmark results to {cls.output_path}")
+
+    def _create_server(self, name, **vals):
+        """Create a server of the fake Portainer without the connection test
+
+        The connection test commits the transaction, which is not allowed in tests.
+        """
+        with patch.object(type(self.env['j_portainer.server']), 'test_connection', lambda server: True):
+            server = self.env['j_portainer.server'].create(dict({
+                'name': name,
+                'url': self.fake.url,
+                'api_key': 'benchmark',
+                'verify_ssl': False,
+                'status': 'connected',
+            }, **vals))
+        return server
+
+    @contextmanager
+    def _measure(self, name, **extra):
+        """Measure the block and record its result
+
+        The ORM is flushed inside the block so that the pending writes of the
+        measured sync are counted with it.
+        """
+        cr = self.env.cr
+        rows = Counter()
+        rows_by_table = Counter()
+        execute = cr.execute
+
+        def counting_execute(query, params=None, log_exceptions=True):
+            result = execute(query, params, log_exceptions)
+            match = WRITE_STATEMENT_RE.match(str(getattr(query, 'code', query)))
+            if match and cr.rowcount > 0:
+                statement = match.group(1).split()[0].upper()
+                rows[statement] += cr.rowcount
+                rows_by_table[f'{statement} {match.group(2)}'] += cr.rowcount
+            return result
+
+        self.env.flush_all()
+        self.env.invalidate_all()
+        self.fake.reset_counters()
+        queries_before = cr.sql_log_count
+        start = time.perf_counter()
+        with patch.object(cr, 'execute', counting_execute):
+            yield
+            self.env.flush_all()
+        duration_ms = (time.perf_counter() - start) * 1000
+        sql_queries = cr.sql_log_count - queries_before
+        http = self.fake.counters()
+
+        result = dict({
+            'name': name,
+            'duration_ms': round(duration_ms, 1),
+            'http_calls': http['total'],
+            'http_errors': http['errors'],
+            'http_calls_by_endpoint': http['by_route'],
+            'sql_queries': sql_queries,
+            'rows_written': sum(rows.values()),
+            'rows_inserted': rows['INSERT'],
+            'rows_updated': rows['UPDATE'],
+            'rows_deleted': rows['DELETE'],
+            'rows_written_by_table': dict(sorted(rows_by_table.items())),
+        }, **extra)
+        self.results.append(result)
+        _logger.info(f"Benchmark {name}: {duration_ms:.0f} ms, {http['total']} HTTP calls, "
+                     f"{sql_queries} SQL queries, {result['rows_written']} rows written")
+
+    def _expected_count(self, per_environment):
+        return self.config.environments * per_environment
+
+    def _synced_ids(self, server):
+        """Return the IDs of the records mirroring Portainer objects of a server, per model"""
+        return {
+            model: set(self.env[model].with_context(active_test=False).search([('server_id', '=', server.id)]).ids)
+            for model in SYNCED_MODELS
+        }
+
+    def _container_rows(self, server, environment_id=None):
+        """Return the synced state and child rows of the containers of a server, per container ID"""
+        domain = [('server_id', '=', server.id)]
+        if environment_id:
+            domain.append(('environment_id.environment_id', '=', environment_id))
+        containers = self.env['j_portainer.container'].with_context(active_test=False).search(domain)
+        return {
+            container.id: {
+                name: set(container[name].ids) if container._fields[name].type == 'one2many' else container[name]
+                for name in CONTAINER_SNAPSHOT_FIELDS
+            }
+            for container in containers
+        }
+
+    def test_sync_all(self):
+        """Full sync on an empty database, then again with nothing changed"""
+        server = self._create_server('Benchmark')
+
+        with self._measure('sync_all.cold'):
+            server.sync_all()
+        cold_ids = self._synced_ids(server)
+        with self._measure('sync_all.warm'):
+            server.sync_all()
+
+        self.assertEqual(len(server.environment_ids), self.config.environments)
+        self.assertEqual(len(server.container_ids), self._expected_count(self.config.containers))
+        self.assertEqual(len(server.image_ids), self._expected_count(self.config.images))
+        self.assertEqual(len(server.volume_ids), self._expected_count(self.config.volumes))
+        self.assertEqual(len(server.stack_ids), self._expected_count(self.config.stacks))
+
+        self.assertEqual(len(server.custom_template_ids), self.config.custom_templates)
+
+        # Nothing changed on the Portainer side: the warm sync keeps every record and creates or deletes nothing
+        self.assertEqual(self._synced_ids(server), cold_ids)
+        cold, warm = self.results[-2:]
+        self.assertEqual(warm['rows_inserted'], 0, warm['rows_written_by_table'])
+        self.assertEqual(warm['rows_deleted'], 0, warm['rows_written_by_table'])
+        self.assertLess(warm['rows_written'], cold['rows_written'])
+
+    def test_sync_methods(self):
+        """Each sync method on its own, cold then warm"""
+        server = self._create_server('Benchmark Methods')
+
+        for method in SYNC_METHODS:
+            with self._measure(f'{method}.cold'):
+                getattr(server, method)()
+        for method in SYNC_METHODS:
+            with self._measure(f'{method}.warm'):
+                getattr(server, method)()
+
+        self.assertEqual(len(server.container_ids), self._expected_count(self.config.containers))
+
+    def test_sync_all_latency(self):
+        """Full sync against a slow Portainer"""
+        server = self._create_server('Benchmark Latency')
+        latency_ms = _env_int('J_PORTAINER_BENCH_LATENCY_MS', 20)
+
+        with patch.object(self.config, 'latency_ms', latency_ms), patch.object(self.config, 'jitter_ms', latency_ms):
+            with self._measure('sync_all.latency', latency_ms=latency_ms, jitter_ms=latency_ms):
+                server.sync_all()
+
+        self.assertEqual(len(server.container_ids), self._expected_count(self.config.containers))
+
+    def test_sync_all_errors(self):
+        """Full sync with failing Docker API requests and one unreachable environment
+
+        Nothing changed on the Portainer side since the first sync, so the
+        records whose requests failed must be kept as they were.
+        """
+        server = self._create_server('Benchmark Errors')
+        server.sync_all()
+        synced_ids = self._synced_ids(server)
+        containers = self._container_rows(server)
+        self.assertTrue(self._container_rows(server, environment_id=1))
+        error_rate = _env_float('J_PORTAINER_BENCH_ERROR_RATE', 0.05)
+
+        with patch.object(self.config, 'error_rate', error_rate), \
+                patch.object(self.config, 'failing_environments', {1}):
+            with self._measure('sync_all.errors', error_rate=error_rate, failing_environments=[1]):
+                # Failed requests skip their objects or environments, they must not fail the whole sync
+                server.sync_all()
+
+        self.assertTrue(self.results[-1]['http_errors'])
+        self.env.invalidate_all()
+        self.assertEqual(self._synced_ids(server), synced_ids)
+        self.assertEqual(self._container_rows(server), containers)
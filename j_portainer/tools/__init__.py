@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from . import http_session
+from . import circuit_breaker
+from . import concurrent_fetch
+from . import sync_snapshot
+from . import payload_digest
+from . import docker_events
+from . import api_log_buffer
+from . import docker_logs
+from . import backup_stream
+from . import container_exec
+from . import volume_usage
+from . import sync_lock
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""In-memory buffer and body packing for Portainer API logs
+
+API log entries are not written in the transaction of the request that
+produced them. They are appended to a per-process buffer (one list per
+database) and flushed in batches by the api_log model through its own
+cursor, so that logging neither slows down nor depends on the outcome of
+the caller's transaction.
+"""
+
+import base64
+import logging
+import threading
+import zlib
+
+_logger = logging.getLogger(__name__)
+
+TRUNCATED_MARKER = '\n... [truncated]'
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def append(dbname, vals):
+    """Append a log entry to the buffer of a database
+
+    Args:
+        dbname (str): Database name
+        vals (dict): Values of the j_portainer.api_log record
+
+    Returns:
+        int: Number of entries waiting in the buffer
+    """
+    with _buffers_lock:
+        buffer = _buffers.setdefault(dbname, [])
+        buffer.append(vals)
+        return len(buffer)
+
+
+def drain(dbname):
+    """Remove and return all buffered entries of a database"""
+    with _buffers_lock:
+        return _buffers.pop(dbname, [])
+
+
+def pack_body(text, max_size, compress_threshold):
+    """Cap a request or response body and compress it when large
+
+    Args:
+        text (str): Body to store
+        max_size (int): Maximum number of bytes kept (0 for no limit)
+        compress_threshold (int): Bodies larger than this number of bytes
+            are compressed (0 to never compress)
+
+    Returns:
+        tuple: (plain text or False, base64 zlib data or False, original size in bytes, truncated flag)
+    """
+    if not text:
+        return False, False, 0, False
+
+    raw = text.encode('utf-8', errors='replace')
+    size = len(raw)
+    truncated = bool(max_size) and size > max_size
+    if truncated:
+        raw = raw[:max_size] + TRUNCATED_MARKER.encode('utf-8')
+
+    if compress_threshold and len(raw) > compress_threshold:
+        return False, base64.b64encode(zlib.compress(raw, 6)), size, truncated
+    return raw.decode('utf-8', errors='ignore'), False, size, truncated
+
+
+def unpack_body(plain, compressed):
+    """Return the text of a body stored by pack_body"""
+    if compressed:
+        try:
+            if isinstance(compressed, str):
+                compressed = compressed.encode('ascii')
+            return zlib.decompress(base64.b64decode(compressed)).decode('utf-8', errors='replace')
+        except (ValueError, zlib.error) as e:
+            _logger.warning(f"Could not decompress API log body: {str(e)}")
+            return ''
+    return plain or ''
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Streaming storage of Portainer backup archives
+
+Backups are written chunk by chunk to a file, optionally compressed, while
+their size and checksums are computed, so that an archive of any size is
+never held in memory.
+"""
+
+import gzip
+import hashlib
+import io
+import logging
+import uuid
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Size of the chunks read from the HTTP response
+BACKUP_CHUNK_SIZE = 1024 * 1024
+
+COMPRESSIONS = [
+    ('none', 'None'),
+    ('gzip', 'Gzip'),
+    ('zstd', 'Zstandard'),
+]
+
+# File extension and mimetype of the stored archive per compression
+COMPRESSION_FORMATS = {
+    'none': ('', 'application/x-tar'),
+    'gzip': ('.gz', 'application/gzip'),
+    'zstd': ('.zst', 'application/zstd'),
+}
+
+
+class _HashingWriter(object):
+    """File wrapper computing the size and checksums of the written data"""
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self.sha1 = hashlib.sha1()
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha1.update(data)
+        self.sha256.update(data)
+        self.size += len(data)
+        self._fileobj.write(data)
+        return len(data)
+
+    def flush(self):
+        self._fileobj.flush()
+
+
+class BackupStreamResult(object):
+    """Size and checksums of a stored backup
+
+    Attributes:
+        size (int): Number of bytes received
+        stored_size (int): Number of bytes written, after compression
+        sha1 (str): SHA-1 of the written bytes (filestore naming)
+        sha256 (str): SHA-256 of the written bytes (integrity check)
+    """
+
+    def __init__(self, size, stored_size, sha1, sha256):
+        self.size = size
+        self.stored_size = stored_size
+        self.sha1 = sha1
+        self.sha256 = sha256
+
+
+def compression_available(compression):
+    """Check whether a compression can be used in this environment"""
+    return compression != 'zstd' or zstandard is not None
+
+
+def write_backup_stream(chunks, fileobj, compression='none'):
+    """Write a backup stream to a file, compressing it on the fly
+
+    Args:
+        chunks (iterable): Byte chunks of the backup archive
+        fileobj: Binary file open for writing
+        compression (str): 'none', 'gzip' or 'zstd'
+
+    Returns:
+        BackupStreamResult: Sizes and checksums of the written file
+    """
+    writer = _HashingWriter(fileobj)
+    size = 0
+
+    if compression == 'gzip':
+        target = gzip.GzipFile(fileobj=writer, mode='wb', compresslevel=6, mtime=0)
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("The zstandard Python package is required for zstd compression")
+        target = zstandard.ZstdCompressor(level=3).stream_writer(writer, closefd=False)
+    else:
+        target = writer
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        size += len(chunk)
+        target.write(chunk)
+
+    if target is not writer:
+        target.close()
+    writer.flush()
+    return BackupStreamResult(size, writer.size, writer.sha1.hexdigest(), writer.sha256.hexdigest())
+
+
+def iter_file_chunks(fileobj, chunk_size=BACKUP_CHUNK_SIZE):
+    """Yield the content of a binary file in chunks"""
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def file_sha256(fileobj, chunk_size=BACKUP_CHUNK_SIZE):
+    """Return the SHA-256 of a binary file read in chunks"""
+    sha256 = hashlib.sha256()
+    for chunk in iter_file_chunks(fileobj, chunk_size):
+        sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def decompress_stream(fileobj, target, compression='none', chunk_size=BACKUP_CHUNK_SIZE):
+    """Decompress a stored backup into another file chunk by chunk
+
+    Args:
+        fileobj: Binary file of the stored backup, open for reading
+        target: Binary file open for writing
+        compression (str): Compression of the stored backup
+
+    Returns:
+        int: Number of bytes written
+    """
+    if compression == 'gzip':
+        source = gzip.GzipFile(fileobj=fileobj, mode='rb')
+    elif compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("The zstandard Python package is required for zstd compression")
+        source = zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=False)
+    else:
+        source = fileobj
+
+    size = 0
+    for chunk in iter_file_chunks(source, chunk_size):
+        target.write(chunk)
+        size += len(chunk)
+    return size
+
+
+class MultipartFileStream(object):
+    """Streaming multipart/form-data body made of text fields and one file
+
+    The object has a length and a read method, so requests sends it with a
+    Content-Length header while reading the file chunk by chunk.
+
+    Args:
+        form_fields (dict): Text fields sent before the file
+        file_field (str): Name of the file field
+        filename (str): File name sent with the file
+        fileobj: Binary file open for reading, positioned at its start
+        file_size (int): Size of the file in bytes
+        content_type (str): Content type of the file
+        progress_callback (callable, optional): Called with (bytes sent, total bytes)
+    """
+
+    def __init__(self, form_fields, file_field, filename, fileobj, file_size,
+                 content_type='application/octet-stream', progress_callback=None):
+        self.boundary = uuid.uuid4().hex
+        head = ''.join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+            for name, value in form_fields.items()
+        )
+        head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+                 f'filename="{filename}"\r\nContent-Type: {content_type}\r\n\r\n')
+        tail = f'\r\n--{self.boundary}--\r\n'
+        self._parts = [io.BytesIO(head.encode('utf-8')), fileobj, io.BytesIO(tail.encode('utf-8'))]
+        self._index = 0
+        self._length = len(head.encode('utf-8')) + file_size + len(tail.encode('utf-8'))
+        self._progress_callback = progress_callback
+        self.bytes_read = 0
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = BACKUP_CHUNK_SIZE
+        while self._index < len(self._parts):
+            data = self._parts[self._index].read(size)
+            if data:
+                self.bytes_read += len(data)
+                if self._progress_callback:
+                    self._progress_callback(self.bytes_read, self._length)
+                return data
+            self._index += 1
+        return b''
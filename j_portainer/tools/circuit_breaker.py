@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Health tracking, circuit breaking and adaptive timeouts per Portainer server
+
+Every Odoo worker process keeps one ``ServerHealth`` per Portainer server,
+like the pooled HTTP sessions. It is fed with the outcome and latency of
+every API request made to the server:
+
+* After ``failure_threshold`` consecutive failures (no response or a 502,
+  503 or 504 status) the circuit opens and requests fail immediately
+  instead of waiting for their timeout.
+* Once ``reset_seconds`` have elapsed, the circuit is half-open: a single
+  probe request is let through while the others keep failing fast. A
+  successful probe closes the circuit, a failed one opens it again for
+  twice as long, up to ``MAX_RESET_SECONDS``.
+* The read timeout of a request is derived from the p99 latency of the
+  recent successful requests, so a hung request is abandoned soon after the
+  server stops answering as fast as usual.
+
+Requests proxied to an environment (``/api/endpoints/{id}/...``) also have a
+circuit per environment. Portainer answering a proxied request shows that
+the server is up, so proxy errors and timeouts only count against the
+environment: one unreachable agent pauses the requests to its environment
+while the other environments and the server itself stay available.
+Connection failures still count against the server.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+
+_logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_FAILURE_THRESHOLD = 5
+DEFAULT_RESET_SECONDS = 30
+MAX_RESET_SECONDS = 600
+
+# Statuses returned by proxies and overloaded servers, counted as failures
+FAILURE_STATUS_CODES = (502, 503, 504)
+
+# Latency samples kept per server, and samples needed before timeouts adapt
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+
+# Adaptive read timeout: p99 latency times the factor, bounded by the floor and the default timeout
+TIMEOUT_FACTOR = 4
+MIN_TIMEOUT = 5
+CONNECT_TIMEOUT = 10
+
+# Fixed read timeout of requests known to be much slower than most (full resource lists, inspect
+# batches, event reads); they bypass the adaptive timeout, fitted to the fast requests of the server
+SLOW_REQUEST_TIMEOUT = 60
+
+_healths = {}
+_healths_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is refused because the circuit of its server is open"""
+
+    def __init__(self, retry_in, environment_id=None):
+        scope = f"Circuit of environment {environment_id}" if environment_id else "Circuit"
+        super().__init__(f"{scope} open, retry in {retry_in} seconds")
+        self.retry_in = retry_in
+        self.environment_id = environment_id
+
+
+def is_failure(status_code):
+    """Return whether a request outcome counts as a failure of the server
+
+    Args:
+        status_code (int): HTTP status, 0 when no response was received
+    """
+    return not status_code or status_code in FAILURE_STATUS_CODES
+
+
+def is_connection_failure(error):
+    """Return whether a request error means the Portainer server could not be reached
+
+    Args:
+        error (Exception): Error raised by the request, e.g. requests.ConnectionError or ConnectTimeout
+    """
+    return any(cls.__name__ == 'ConnectionError' for cls in type(error).__mro__)
+
+
+class ServerHealth(object):
+    """Health state of one Portainer server in the current process"""
+
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_seconds=DEFAULT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.open_seconds = reset_seconds
+        self.opened_at = None
+        self.probe_started_at = None
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.seeded = False
+        self._lock = threading.Lock()
+
+    def configure(self, failure_threshold, reset_seconds):
+        """Apply the circuit settings of the server"""
+        with self._lock:
+            self.failure_threshold = max(int(failure_threshold or DEFAULT_FAILURE_THRESHOLD), 1)
+            self.reset_seconds = max(int(reset_seconds or DEFAULT_RESET_SECONDS), 1)
+            if self.state == CLOSED:
+                self.open_seconds = self.reset_seconds
+
+    def seed(self, latencies_ms):
+        """Fill the latency window with previously recorded latencies, oldest first"""
+        with self._lock:
+            if not self.seeded:
+                self.latencies.extend(latencies_ms)
+                self.seeded = True
+
+    def before_request(self):
+        """Check that a request may be sent
+
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a probe in flight
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == OPEN:
+                remaining = self.opened_at + self.open_seconds - now
+                if remaining > 0:
+                    raise CircuitOpenError(int(math.ceil(remaining)))
+                self.state = HALF_OPEN
+                self.probe_started_at = None
+            # A probe that never reported back does not block the circuit forever
+            if self.probe_started_at is not None and now - self.probe_started_at < self.open_seconds:
+                raise CircuitOpenError(int(math.ceil(self.open_seconds - (now - self.probe_started_at))))
+            self.probe_started_at = now
+
+    def record(self, status_code, latency_ms, connection_failed=False):
+        """Record the outcome of a request
+
+        Args:
+            status_code (int): HTTP status, 0 when no response was received
+            latency_ms (int): Time until the response or the error, in milliseconds
+            connection_failed (bool): Whether the server could not be reached, every failure
+                counts against a server circuit
+
+        Returns:
+            str: New state when it changed, None otherwise
+        """
+        with self._lock:
+            previous = self.state
+            if not is_failure(status_code):
+                self.latencies.append(latency_ms)
+                self._close()
+            else:
+                self.consecutive_failures += 1
+                if self.state == HALF_OPEN:
+                    # The probe failed, back off further
+                    self.open_seconds = min(self.open_seconds * 2, MAX_RESET_SECONDS)
+                    self._open()
+                elif self.state == CLOSED and self.consecutive_failures >= self.failure_threshold:
+                    self._open()
+            return self.state if self.state != previous else None
+
+    def cancel_probe(self):
+        """Release the probe slot granted by before_request when no request was sent"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probe_started_at = None
+
+    def mark_reachable(self):
+        """Record that the server answered, without a latency sample
+
+        Returns:
+            str: New state when it changed, None otherwise
+        """
+        with self._lock:
+            previous = self.state
+            self._close()
+            return self.state if self.state != previous else None
+
+    def _close(self):
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.open_seconds = self.reset_seconds
+        self.probe_started_at = None
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probe_started_at = None
+
+    def latency_percentile(self, percentile=99):
+        """Return a percentile of the recent latencies in milliseconds, None without enough samples"""
+        with self._lock:
+            if len(self.latencies) < MIN_LATENCY_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(math.ceil(percentile / 100.0 * len(ordered))) - 1)
+        return ordered[max(index, 0)]
+
+    def timeout(self, default):
+        """Return the (connect, read) timeout of a request
+
+        Args:
+            default (float): Timeout in seconds used without enough latency samples,
+                and upper bound of the adaptive read timeout
+
+        Returns:
+            tuple: Connect and read timeouts in seconds
+        """
+        connect_timeout = min(CONNECT_TIMEOUT, default)
+        p99 = self.latency_percentile(99)
+        if p99 is None:
+            return connect_timeout, default
+        return connect_timeout, min(default, max(MIN_TIMEOUT, p99 / 1000.0 * TIMEOUT_FACTOR))
+
+    def snapshot(self):
+        """Return a dictionary describing the current health"""
+        p99 = self.latency_percentile(99)
+        with self._lock:
+            retry_in = 0
+            if self.state == OPEN:
+                retry_in = max(0, int(math.ceil(self.opened_at + self.open_seconds - time.monotonic())))
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'retry_in': retry_in,
+                'p99_ms': p99,
+                'samples': len(self.latencies),
+            }
+
+
+class EnvironmentHealth(object):
+    """Health of the requests a Portainer server proxies to one of its environments
+
+    Requests must pass both the server and the environment circuits. Proxy
+    errors and timeouts are recorded against the environment only, and show
+    that the server itself answers; connection failures are recorded against
+    the server only.
+
+    Attributes:
+        server (ServerHealth): Health of the server
+        environment (ServerHealth): Health of the environment
+        environment_id (int): Portainer ID of the environment
+    """
+
+    def __init__(self, server, environment, environment_id):
+        self.server = server
+        self.environment = environment
+        self.environment_id = environment_id
+
+    def before_request(self):
+        """Check that a request may be sent
+
+        Raises:
+            CircuitOpenError: If the circuit of the environment or of the server refuses it
+        """
+        self.server.before_request()
+        try:
+            self.environment.before_request()
+        except CircuitOpenError as e:
+            # No request goes out: give back the probe slot the server may have granted
+            self.server.cancel_probe()
+            raise CircuitOpenError(e.retry_in, self.environment_id) from None
+
+    def record(self, status_code, latency_ms, connection_failed=False):
+        """Record the outcome of a request
+
+        Args:
+            status_code (int): HTTP status, 0 when no response was received
+            latency_ms (int): Time until the response or the error, in milliseconds
+            connection_failed (bool): Whether the server could not be reached
+
+        Returns:
+            tuple: New server state and new environment state, None when unchanged
+        """
+        if connection_failed:
+            return self.server.record(0, latency_ms), None
+        environment_state = self.environment.record(status_code, latency_ms)
+        if not is_failure(status_code):
+            return self.server.record(status_code, latency_ms), environment_state
+        # The server answered for an unhealthy environment, or the environment did not answer in time
+        return (self.server.mark_reachable() if status_code else None), environment_state
+
+    def timeout(self, default):
+        """Return the (connect, read) timeout of a request, from the latencies of the server"""
+        return self.server.timeout(default)
+
+
+def health_for(health, key):
+    """Return the health of one request
+
+    Args:
+        health (ServerHealth, EnvironmentHealth or dict): Health shared by all requests,
+            or health per request key
+        key: Key of the request
+
+    Returns:
+        ServerHealth or EnvironmentHealth: Health of the request, None if not tracked
+    """
+    if isinstance(health, dict):
+        return health.get(key)
+    return health
+
+
+def get_health(server_id, environment_id=None):
+    """Return the health state of a Portainer server or environment in the current process
+
+    Args:
+        server_id (int): ID of the j_portainer.server record
+        environment_id (int, optional): Portainer ID of an environment of the server
+
+    Returns:
+        ServerHealth: Health shared by all requests to this server, or proxied to this environment
+    """
+    key = (os.getpid(), server_id, environment_id)
+    with _healths_lock:
+        health = _healths.get(key)
+        if health is None:
+            health = _healths[key] = ServerHealth()
+        return health
+
+
+def reset_health(server_id):
+    """Forget the health state of a server and its environments in the current process, closing their circuits
+
+    Args:
+        server_id (int): ID of the j_portainer.server record
+    """
+    pid = os.getpid()
+    with _healths_lock:
+        for key in [key for key in _healths if key[:2] == (pid, server_id)]:
+            del _healths[key]
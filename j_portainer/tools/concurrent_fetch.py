@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Bounded-concurrency GET fan-out for Portainer sync
+
+The functions in this module only perform network I/O. They never touch the
+ORM, so they can safely run in worker threads; the results are returned as
+plain Python values to the calling (ORM) thread which does all database work.
+"""
+
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .circuit_breaker import CircuitOpenError, health_for, is_connection_failure
+
+_logger = logging.getLogger(__name__)
+
+FetchRequest = namedtuple('FetchRequest', ['key', 'endpoint', 'params'])
+
+FetchResult = namedtuple('FetchResult', [
+    'key',
+    'endpoint',
+    'params',
+    'url',
+    'status_code',
+    'data',
+    'text',
+    'headers',
+    'response_time_ms',
+    'error',
+    'error_type',
+    'request_date',
+    'method',
+], defaults=('GET',))
+
+
+def _fetch_one(session, base_url, headers, verify_ssl, timeout, request, health=None):
+    """Perform a single GET request and return a FetchResult"""
+    url = base_url + request.endpoint
+    request_date = datetime.now()
+    start = time.monotonic()
+    try:
+        if health is not None:
+            health.before_request()
+        response = session.get(url, headers=headers, params=request.params,
+                               verify=verify_ssl, timeout=timeout)
+        elapsed_ms = int((time.monotonic() - start) * 1000)
+        if health is not None:
+            health.record(response.status_code, elapsed_ms)
+        data = None
+        if response.status_code == 200:
+            try:
+                data = response.json()
+            except ValueError:
+                data = None
+        return FetchResult(
+            key=request.key,
+            endpoint=request.endpoint,
+            params=request.params,
+            url=response.url,
+            status_code=response.status_code,
+            data=data,
+            # Keep the raw body when it is not a JSON document (e.g. line delimited streams)
+            text=response.text if response.status_code != 200 or data is None else '',
+            headers=dict(response.headers),
+            response_time_ms=elapsed_ms,
+            error=None,
+            error_type=None,
+            request_date=request_date,
+        )
+    except Exception as e:
+        elapsed_ms = int((time.monotonic() - start) * 1000)
+        if health is not None and not isinstance(e, CircuitOpenError):
+            health.record(0, elapsed_ms, connection_failed=is_connection_failure(e))
+        return FetchResult(
+            key=request.key,
+            endpoint=request.endpoint,
+            params=request.params,
+            url=url,
+            status_code=0,
+            data=None,
+            text='',
+            headers={},
+            response_time_ms=elapsed_ms,
+            error=str(e),
+            error_type=type(e).__name__,
+            request_date=request_date,
+        )
+
+
+def fetch_succeeded(result):
+    """Return whether a fetch returned the requested object
+
+    Failed requests, error statuses and requests refused by an open circuit
+    say nothing about the object: callers must keep what they know of it
+    instead of treating the result as an empty payload.
+
+    Args:
+        result (FetchResult): Result of the request, None if it was not made
+    """
+    return result is not None and not result.error and result.status_code == 200
+
+
+def fetch_many(session, base_url, headers, requests_list, max_workers=4, verify_ssl=False, timeout=30,
+               health=None):
+    """Run many GET requests with bounded concurrency
+
+    Args:
+        session (requests.Session): Pooled session to use for all requests
+        base_url (str): Server base URL without trailing slash
+        headers (dict): Headers sent with every request
+        requests_list (list): List of FetchRequest tuples
+        max_workers (int): Maximum number of concurrent requests
+        verify_ssl (bool): Whether to verify SSL certificates
+        timeout (int or tuple): Timeout in seconds per request, or (connect, read) timeouts
+        health (ServerHealth, EnvironmentHealth or dict, optional): Health fed with every outcome,
+            or health per request key; requests refused by an open circuit fail immediately
+            with a CircuitOpenError
+
+    Returns:
+        dict: FetchResult per request key, in the order of requests_list
+    """
+    if not requests_list:
+        return {}
+
+    max_workers = max(1, min(int(max_workers or 1), len(requests_list)))
+    if max_workers == 1:
+        results = [_fetch_one(session, base_url, headers, verify_ssl, timeout, request,
+                              health_for(health, request.key))
+                   for request in requests_list]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='portainer_fetch') as executor:
+            results = list(executor.map(
+                lambda request: _fetch_one(session, base_url, headers, verify_ssl, timeout, request,
+                                           health_for(health, request.key)),
+                requests_list,
+            ))
+
+    return {result.key: result for result in results}
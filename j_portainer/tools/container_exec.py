@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Bounded-concurrency Docker exec through the Portainer API
+
+Like concurrent_fetch, the functions in this module only perform network
+I/O and never touch the ORM, so they can run in worker threads. Each exec
+is created and started without a TTY; its multiplexed output is split into
+stdout and stderr, and its exit code is read from ``exec/{id}/json``.
+
+The timeout of a command bounds the wait for its output. Docker offers no
+way to stop an exec instance, so a command that timed out keeps running in
+the container until it ends by itself.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from .circuit_breaker import CircuitOpenError, health_for, is_connection_failure
+from .concurrent_fetch import FetchResult
+from .docker_logs import FrameDemuxer
+
+_logger = logging.getLogger(__name__)
+
+# Seconds to wait for an exec instance to be reported as stopped once its output ended
+EXIT_CODE_WAIT = 0.1
+EXIT_CODE_ATTEMPTS = 5
+
+ExecRequest = namedtuple('ExecRequest', ['key', 'environment_id', 'container_id', 'cmd', 'timeout'],
+                         defaults=(None,))
+
+ExecResult = namedtuple('ExecResult', [
+    'key',
+    'stdout',
+    'stderr',
+    'exit_code',
+    'error',
+    'timed_out',
+    'duration_ms',
+    'calls',
+])
+
+
+def _call(session, method, base_url, headers, verify_ssl, timeout, endpoint, payload=None, health=None):
+    """Perform one request and return (response or None, FetchResult for the API log)"""
+    url = base_url + endpoint
+    request_date = datetime.now()
+    start = time.monotonic()
+    try:
+        if health is not None:
+            health.before_request()
+        response = session.request(method, url, headers=headers, json=payload, verify=verify_ssl, timeout=timeout)
+        if health is not None:
+            health.record(response.status_code, int((time.monotonic() - start) * 1000))
+    except Exception as e:
+        # A command outliving its timeout says nothing about the health of the server
+        timed_out_command = endpoint.endswith('/start') and type(e).__name__ == 'ReadTimeout'
+        if health is not None and not isinstance(e, CircuitOpenError) and not timed_out_command:
+            health.record(0, int((time.monotonic() - start) * 1000), connection_failed=is_connection_failure(e))
+        return None, FetchResult(
+            key=endpoint, endpoint=endpoint, params=payload, url=url, status_code=0, data=None, text='',
+            headers={}, response_time_ms=int((time.monotonic() - start) * 1000), error=str(e),
+            error_type=type(e).__name__, request_date=request_date, method=method,
+        )
+    return response, FetchResult(
+        key=endpoint, endpoint=endpoint, params=payload, url=url, status_code=response.status_code,
+        data=None, text=response.text if response.status_code >= 300 else '', headers=dict(response.headers),
+        response_time_ms=int((time.monotonic() - start) * 1000), error=None, error_type=None,
+        request_date=request_date, method=method,
+    )
+
+
+def run_exec(session, base_url, headers, request, verify_ssl=False, timeout=30, health=None):
+    """Create and start one exec instance and wait for its output and exit code
+
+    Args:
+        session (requests.Session): Pooled session of the server
+        base_url (str): Server base URL without trailing slash
+        headers (dict): Headers sent with every request
+        request (ExecRequest): Container and command (list of arguments) to run
+        verify_ssl (bool): Whether to verify SSL certificates
+        timeout (int): Timeout in seconds of the API requests, and of the
+            command when the request has no timeout of its own
+        health (ServerHealth or EnvironmentHealth, optional): Health fed with every outcome
+
+    Returns:
+        ExecResult: Decoded output and exit code, or the error that prevented running the command
+    """
+    start = time.monotonic()
+    calls = []
+
+    def result(stdout='', stderr='', exit_code=None, error=None, timed_out=False):
+        return ExecResult(request.key, stdout, stderr, exit_code, error, timed_out,
+                          int((time.monotonic() - start) * 1000), calls)
+
+    def call(method, endpoint, payload=None, read_timeout=None):
+        response, fetch_result = _call(session, method, base_url, headers, verify_ssl,
+                                       (timeout, read_timeout or timeout), endpoint, payload, health)
+        calls.append(fetch_result)
+        return response, fetch_result
+
+    prefix = f"/api/endpoints/{request.environment_id}/docker"
+    response, fetch_result = call('POST', f"{prefix}/containers/{request.container_id}/exec", {
+        'AttachStdout': True,
+        'AttachStderr': True,
+        'Cmd': list(request.cmd),
+        'Tty': False,
+    })
+    if response is None or response.status_code != 201:
+        return result(error=fetch_result.error or f"HTTP {fetch_result.status_code}: {fetch_result.text}")
+
+    exec_id = response.json().get('Id')
+    if not exec_id:
+        return result(error="No exec ID returned")
+
+    command_timeout = request.timeout or timeout
+    response, fetch_result = call('POST', f"{prefix}/exec/{exec_id}/start", {'Detach': False, 'Tty': False},
+                                  read_timeout=command_timeout)
+    if response is None and fetch_result.error_type == 'ReadTimeout':
+        return result(error=f"Command timed out after {command_timeout} seconds", timed_out=True)
+    if response is None or response.status_code != 200:
+        return result(error=fetch_result.error or f"HTTP {fetch_result.status_code}: {fetch_result.text}")
+
+    output = {'stdout': [], 'stderr': []}
+    demuxer = FrameDemuxer()
+    for stream, payload in list(demuxer.feed(response.content)) + list(demuxer.close()):
+        output.setdefault(stream, []).append(payload)
+    stdout = b''.join(output['stdout']).decode('utf-8', errors='replace')
+    stderr = b''.join(output['stderr']).decode('utf-8', errors='replace')
+
+    # The exec instance may still be reported as running right after its output ended
+    exit_code = None
+    for attempt in range(EXIT_CODE_ATTEMPTS):
+        response, fetch_result = call('GET', f"{prefix}/exec/{exec_id}/json")
+        if response is None or response.status_code != 200:
+            break
+        data = response.json()
+        if not data.get('Running'):
+            exit_code = data.get('ExitCode')
+            break
+        time.sleep(EXIT_CODE_WAIT)
+
+    return result(stdout=stdout, stderr=stderr, exit_code=exit_code)
+
+
+def _interleave_by_host(requests_list):
+    """Order requests round-robin over their environments
+
+    Workers then pick requests of different hosts in turn instead of waiting
+    on the concurrency limit of the host whose requests come first.
+    """
+    queues = OrderedDict()
+    for request in requests_list:
+        queues.setdefault(request.environment_id, deque()).append(request)
+
+    ordered = []
+    while queues:
+        for host in list(queues):
+            ordered.append(queues[host].popleft())
+            if not queues[host]:
+                del queues[host]
+    return ordered
+
+
+def exec_many(session, base_url, headers, requests_list, max_workers=4, verify_ssl=False, timeout=30,
+              max_per_host=None, health=None):
+    """Run many exec requests with bounded concurrency
+
+    Args:
+        session (requests.Session): Pooled session to use for all requests
+        base_url (str): Server base URL without trailing slash
+        headers (dict): Headers sent with every request
+        requests_list (list): List of ExecRequest tuples with unique keys
+        max_workers (int): Maximum number of concurrent execs
+        verify_ssl (bool): Whether to verify SSL certificates
+        timeout (int): Timeout in seconds per HTTP request and default command timeout
+        max_per_host (int, optional): Maximum number of concurrent execs per environment
+        health (ServerHealth, EnvironmentHealth or dict, optional): Health fed with every outcome,
+            or health per request key; execs refused by an open circuit fail immediately
+
+    Returns:
+        dict: ExecResult per request key, in the order of requests_list
+    """
+    if not requests_list:
+        return {}
+
+    host_limits = {}
+    if max_per_host:
+        host_limits = {
+            request.environment_id: threading.BoundedSemaphore(max_per_host)
+            for request in requests_list
+        }
+
+    def run(request):
+        semaphore = host_limits.get(request.environment_id)
+        request_health = health_for(health, request.key)
+        try:
+            if semaphore:
+                with semaphore:
+                    return run_exec(session, base_url, headers, request, verify_ssl=verify_ssl, timeout=timeout,
+                                    health=request_health)
+            return run_exec(session, base_url, headers, request, verify_ssl=verify_ssl, timeout=timeout,
+                            health=request_health)
+        except Exception as e:
+            return ExecResult(request.key, '', '', None, str(e), False, 0, [])
+
+    max_workers = max(1, min(int(max_workers or 1), len(requests_list)))
+    if max_workers == 1:
+        results = [run(request) for request in requests_list]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='portainer_exec') as executor:
+            results = list(executor.map(run, _interleave_by_host(requests_list)))
+
+    results_by_key = {result.key: result for result in results}
+    return {request.key: results_by_key[request.key] for request in requests_list}
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Docker events handling for incremental Portainer sync
+
+The Docker events endpoint returns one JSON object per line. The helpers in
+this module parse that stream and turn a batch of events into the set of
+targeted refreshes needed to bring Odoo up to date, so that each container
+or resource kind is refreshed at most once per batch whatever the number of
+events received for it.
+"""
+
+import json
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Container actions changing the state, configuration or existence of a container
+CONTAINER_ACTIONS = frozenset([
+    'create', 'start', 'restart', 'stop', 'die', 'kill', 'oom', 'pause', 'unpause',
+    'rename', 'update', 'destroy', 'health_status',
+])
+
+# Resource actions requiring a resync of the resource kind in the environment
+RESOURCE_ACTIONS = {
+    'image': ('images', frozenset(['pull', 'delete', 'tag', 'untag', 'import', 'load', 'prune'])),
+    'volume': ('volumes', frozenset(['create', 'destroy', 'prune'])),
+    'network': ('networks', frozenset(['create', 'destroy', 'connect', 'disconnect', 'prune'])),
+}
+
+
+def parse_events(payload):
+    """Parse the body of a Docker events response
+
+    Args:
+        payload: Parsed JSON (a single event or a list) or the raw response text
+
+    Returns:
+        list: Event dictionaries in the order received
+    """
+    if isinstance(payload, dict):
+        return [payload]
+    if isinstance(payload, list):
+        return [event for event in payload if isinstance(event, dict)]
+
+    events = []
+    for line in (payload or '').splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            event = json.loads(line)
+        except ValueError:
+            _logger.debug(f"Skipping malformed Docker event line: {line[:200]}")
+            continue
+        if isinstance(event, dict):
+            events.append(event)
+    return events
+
+
+class EventPlan(object):
+    """Targeted refreshes derived from a batch of Docker events
+
+    Attributes:
+        container_ids (set): Containers to refresh (or remove when destroyed)
+        kinds (set): Resource kinds to resync ('images', 'volumes', 'networks')
+        last_time (int): Unix time of the most recent event, 0 if none
+        event_count (int): Number of events considered
+    """
+
+    def __init__(self):
+        self.container_ids = set()
+        self.kinds = set()
+        self.last_time = 0
+        self.event_count = 0
+
+    def __bool__(self):
+        return bool(self.container_ids or self.kinds)
+
+
+def plan_refresh(events):
+    """Build the refresh plan of a batch of Docker events
+
+    Args:
+        events (list): Event dictionaries as returned by parse_events
+
+    Returns:
+        EventPlan: Containers and resource kinds to refresh
+    """
+    plan = EventPlan()
+    for event in events:
+        plan.event_count += 1
+        event_type = event.get('Type') or ''
+        # Older Docker versions report 'status' instead of 'Action', and some
+        # actions carry a suffix (e.g. 'health_status: healthy')
+        action = (event.get('Action') or event.get('status') or '').split(':', 1)[0].strip()
+        actor = event.get('Actor') or {}
+        attributes = actor.get('Attributes') or {}
+        plan.last_time = max(plan.last_time, int(event.get('time') or 0))
+
+        if event_type == 'container' and action in CONTAINER_ACTIONS:
+            container_id = actor.get('ID') or event.get('id')
+            if container_id:
+                plan.container_ids.add(container_id)
+        elif event_type in RESOURCE_ACTIONS:
+            kind, actions = RESOURCE_ACTIONS[event_type]
+            if action in actions:
+                plan.kinds.add(kind)
+            # Network (dis)connections also change the networks of the container
+            if event_type == 'network' and action in ('connect', 'disconnect') and attributes.get('container'):
+                plan.container_ids.add(attributes['container'])
+    return plan
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Streaming reader for Docker container logs
+
+The Docker logs endpoint returns, for containers without a TTY, a stream of
+frames made of an 8-byte header (stream type, 3 padding bytes, big-endian
+payload size) followed by the payload. Containers with a TTY return the raw
+output. The helpers in this module read such a stream chunk by chunk and
+return one page of lines, so that memory use is bounded by the page size
+and not by the size of the log.
+
+Pages are delimited with the RFC 3339 timestamps Docker adds to each line
+(``timestamps=1``). A cursor is the timestamp of the first or last line of
+a page plus the number of lines sharing that timestamp, as the ``since``
+and ``until`` filters of Docker include lines at the boundary.
+"""
+
+import calendar
+import collections
+import struct
+from datetime import datetime
+
+# Default maximum number of log bytes returned in one page
+DEFAULT_PAGE_MAX_BYTES = 1024 * 1024
+
+# Size of the chunks read from the HTTP response
+READ_CHUNK_SIZE = 64 * 1024
+
+HEADER_SIZE = 8
+STREAM_NAMES = {0: 'stdin', 1: 'stdout', 2: 'stderr'}
+
+LogLine = collections.namedtuple('LogLine', ['stream', 'timestamp', 'text'])
+
+
+class FrameDemuxer(object):
+    """Split a Docker log stream into (stream name, payload) pieces
+
+    The stream is detected as multiplexed when it starts with a valid frame
+    header, otherwise the whole stream is considered as TTY output on stdout.
+    """
+
+    def __init__(self):
+        self._buffer = b''
+        self._multiplexed = None
+
+    def feed(self, chunk):
+        """Consume a chunk of the response and yield complete payloads"""
+        if self._multiplexed is None:
+            self._buffer += chunk
+            if len(self._buffer) < HEADER_SIZE:
+                return
+            header = self._buffer[:HEADER_SIZE]
+            self._multiplexed = header[0] in STREAM_NAMES and header[1:4] == b'\x00\x00\x00'
+            chunk, self._buffer = self._buffer, b''
+
+        if not self._multiplexed:
+            if chunk:
+                yield 'stdout', chunk
+            return
+
+        self._buffer += chunk
+        while len(self._buffer) >= HEADER_SIZE:
+            stream_type, size = struct.unpack('>BxxxL', self._buffer[:HEADER_SIZE])
+            if len(self._buffer) < HEADER_SIZE + size:
+                break
+            payload = self._buffer[HEADER_SIZE:HEADER_SIZE + size]
+            self._buffer = self._buffer[HEADER_SIZE + size:]
+            yield STREAM_NAMES.get(stream_type, 'stdout'), payload
+
+    def close(self):
+        """Yield the data left at the end of the stream"""
+        if self._buffer and not self._multiplexed:
+            yield 'stdout', self._buffer
+        self._buffer = b''
+
+
+def iter_log_lines(chunks):
+    """Yield the lines of a Docker log stream
+
+    Args:
+        chunks (iterable): Byte chunks of the response body
+
+    Yields:
+        LogLine: Stream name, Docker timestamp (or None) and text of each line
+    """
+    demuxer = FrameDemuxer()
+    partial = {}
+
+    def split(stream, data):
+        data = partial.pop(stream, b'') + data
+        lines = data.split(b'\n')
+        if lines[-1]:
+            partial[stream] = lines[-1]
+        for raw in lines[:-1]:
+            yield _make_line(stream, raw)
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        for stream, payload in demuxer.feed(chunk):
+            yield from split(stream, payload)
+    for stream, payload in demuxer.close():
+        yield from split(stream, payload)
+    for stream, raw in partial.items():
+        yield _make_line(stream, raw)
+
+
+def _make_line(stream, raw):
+    """Decode a raw log line and split its timestamp"""
+    text = raw.rstrip(b'\r').decode('utf-8', errors='replace')
+    timestamp = None
+    head, sep, rest = text.partition(' ')
+    if sep and len(head) >= 20 and head[4:5] == '-' and head[10:11] == 'T':
+        timestamp, text = head, rest
+    return LogLine(stream, timestamp, text)
+
+
+def to_docker_time(timestamp):
+    """Convert an RFC 3339 timestamp to the Unix time format of Docker filters
+
+    Args:
+        timestamp (str): Timestamp such as 2024-05-01T12:00:00.123456789Z
+
+    Returns:
+        str: Unix time with nanoseconds such as 1714564800.123456789
+    """
+    base, _sep, fraction = timestamp.rstrip('Z').partition('.')
+    seconds = calendar.timegm(datetime.strptime(base[:19], '%Y-%m-%dT%H:%M:%S').timetuple())
+    digits = ''.join(char for char in fraction if char.isdigit())[:9]
+    return f"{seconds}.{digits.ljust(9, '0')}"
+
+
+def encode_cursor(timestamp, count):
+    """Encode a page boundary as a cursor string"""
+    return f"{timestamp}|{count}" if timestamp else False
+
+
+def decode_cursor(cursor):
+    """Decode a cursor string into (timestamp, number of lines to skip)"""
+    if not cursor:
+        return None, 0
+    timestamp, _sep, count = cursor.partition('|')
+    return timestamp, int(count or 0)
+
+
+class LogPage(object):
+    """One page of log lines
+
+    Attributes:
+        lines (list): LogLine tuples, oldest first
+        truncated (bool): Lines were dropped to respect the byte cap
+        size (int): Number of bytes of text in the page
+    """
+
+    def __init__(self, lines, truncated, size):
+        self.lines = lines
+        self.truncated = truncated
+        self.size = size
+
+    def _boundary(self, line):
+        """Cursor at a line: its timestamp and the lines of the page sharing it"""
+        if not line or not line.timestamp:
+            return False
+        return encode_cursor(line.timestamp, sum(1 for other in self.lines if other.timestamp == line.timestamp))
+
+    @property
+    def older_cursor(self):
+        return self._boundary(self.lines[0] if self.lines else None)
+
+    @property
+    def newer_cursor(self):
+        return self._boundary(self.lines[-1] if self.lines else None)
+
+    def format(self):
+        """Return the page as text, tagging stderr lines"""
+        return '\n'.join(
+            ' '.join(part for part in (
+                line.timestamp, '[stderr]' if line.stream == 'stderr' else None, line.text) if part)
+            for line in self.lines
+        )
+
+
+def read_log_page(lines, max_lines=0, max_bytes=DEFAULT_PAGE_MAX_BYTES, keep='head',
+                  skip_first=None, skip_last=None):
+    """Collect one page of lines from a log line iterator
+
+    Args:
+        lines (iterable): LogLine tuples, as yielded by iter_log_lines
+        max_lines (int): Maximum number of lines of the page (0 for no limit)
+        max_bytes (int): Maximum number of text bytes of the page (0 for no limit)
+        keep (str): 'head' keeps the first lines and stops reading once the
+            page is full, 'tail' keeps the last lines of the stream
+        skip_first (tuple, optional): (timestamp, count) of lines at the start
+            of the stream already returned by the previous page
+        skip_last (tuple, optional): (timestamp, count) of lines at the end
+            of the stream already returned by the next page
+
+    Returns:
+        LogPage: Lines of the page
+    """
+    page = collections.deque()
+    size = 0
+    truncated = False
+    skip_timestamp, skip_count = skip_first or (None, 0)
+
+    for line in lines:
+        if skip_count and line.timestamp == skip_timestamp:
+            skip_count -= 1
+            continue
+        skip_count = 0
+        line_size = len(line.text) + len(line.timestamp or '') + 2
+
+        if keep == 'head':
+            if (max_lines and len(page) >= max_lines) or (max_bytes and size + line_size > max_bytes and page):
+                truncated = True
+                break
+            page.append(line)
+            size += line_size
+            continue
+
+        page.append(line)
+        size += line_size
+        while page and ((max_lines and len(page) > max_lines) or (max_bytes and size > max_bytes and len(page) > 1)):
+            dropped = page.popleft()
+            size -= len(dropped.text) + len(dropped.timestamp or '') + 2
+            truncated = True
+
+    if skip_last:
+        timestamp, count = skip_last
+        while count and page and page[-1].timestamp == timestamp:
+            dropped = page.pop()
+            size -= len(dropped.text) + len(dropped.timestamp or '') + 2
+            count -= 1
+
+    return LogPage(list(page), truncated, size)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Pooled HTTP sessions for Portainer servers
+
+Every Odoo worker process keeps one ``requests.Session`` per Portainer server
+so that consecutive API calls reuse the same keep-alive TCP/TLS connections
+instead of opening a new one per request.
+
+Sessions are keyed by process id, server id and SSL verification setting and
+are tagged with a fingerprint of the connection parameters (URL and API key).
+When the fingerprint changes the old session is closed and a new one is built.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.3
+
+# Only idempotent methods are retried automatically
+RETRY_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+RETRY_STATUS_CODES = (502, 503, 504)
+
+_sessions = {}
+_sessions_lock = threading.RLock()
+
+
+def _fingerprint(url, api_key, pool_size, max_retries):
+    """Build a fingerprint of the parameters a pooled session depends on"""
+    raw = f"{url or ''}|{api_key or ''}|{pool_size}|{max_retries}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _build_retry(max_retries, backoff_factor):
+    """Build the urllib3 retry policy used for idempotent requests"""
+    retry_kwargs = {
+        'total': max_retries,
+        'connect': max_retries,
+        'read': max_retries,
+        'status': max_retries,
+        'backoff_factor': backoff_factor,
+        'status_forcelist': RETRY_STATUS_CODES,
+        'raise_on_status': False,
+    }
+    try:
+        return Retry(allowed_methods=RETRY_METHODS, **retry_kwargs)
+    except TypeError:
+        # urllib3 < 1.26 uses the old keyword name
+        return Retry(method_whitelist=RETRY_METHODS, **retry_kwargs)
+
+
+def _build_session(verify_ssl, pool_size, max_retries, backoff_factor):
+    """Create a new keep-alive session with a sized connection pool"""
+    session = requests.Session()
+    session.verify = verify_ssl
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=_build_retry(max_retries, backoff_factor),
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Connection': 'keep-alive'})
+    return session
+
+
+def get_session(server_id, url, api_key, verify_ssl=False, pool_size=DEFAULT_POOL_SIZE,
+                max_retries=DEFAULT_MAX_RETRIES, backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """Return the pooled session for a Portainer server in the current process
+
+    Args:
+        server_id (int): ID of the j_portainer.server record
+        url (str): Base URL of the Portainer server
+        api_key (str): API key of the server (only used for the fingerprint)
+        verify_ssl (bool): Whether SSL certificates are verified
+        pool_size (int): Maximum number of kept-alive connections
+        max_retries (int): Retries for idempotent requests
+        backoff_factor (float): Backoff factor between retries
+
+    Returns:
+        requests.Session: Session shared by all requests to this server
+    """
+    pool_size = max(int(pool_size or DEFAULT_POOL_SIZE), 1)
+    max_retries = max(int(max_retries or 0), 0)
+    key = (os.getpid(), server_id, bool(verify_ssl))
+    fingerprint = _fingerprint(url, api_key, pool_size, max_retries)
+
+    with _sessions_lock:
+        entry = _sessions.get(key)
+        if entry and entry[0] == fingerprint:
+            return entry[1]
+
+        if entry:
+            _logger.debug(f"Connection parameters of server {server_id} changed, rebuilding HTTP session")
+            _close_quietly(entry[1])
+
+        session = _build_session(bool(verify_ssl), pool_size, max_retries, backoff_factor)
+        _sessions[key] = (fingerprint, session)
+        return session
+
+
+def evict_session(server_id):
+    """Close and forget every pooled session of a server in the current process
+
+    Args:
+        server_id (int): ID of the j_portainer.server record
+    """
+    pid = os.getpid()
+    with _sessions_lock:
+        for key in [k for k in _sessions if k[0] == pid and k[1] == server_id]:
+            _close_quietly(_sessions.pop(key)[1])
+
+
+def _close_quietly(session):
+    try:
+        session.close()
+    except Exception as e:
+        _logger.debug(f"Error closing HTTP session: {str(e)}")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Stable digests of Portainer payloads
+
+Sync stores the digest of the values built from a remote object on the
+mirrored record. When the digest of the next sync is identical the record is
+skipped without comparing or writing any field.
+"""
+
+import hashlib
+import json
+
+
+def payload_digest(payload):
+    """Return the SHA-256 digest of a JSON-like payload
+
+    Keys are sorted so that the digest does not depend on the order in which
+    Docker or Portainer return them. Values that are not JSON serializable
+    (e.g. datetimes) are digested through their string representation.
+
+    Args:
+        payload: Any JSON-like value
+
+    Returns:
+        str: Hexadecimal SHA-256 digest
+    """
+    raw = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def without_paths(payload, paths):
+    """Return a copy of a payload without the values at the given key paths
+
+    Used to drop values that change without the object changing, such as
+    the healthcheck log of a container, before a payload is stored and
+    digested.
+
+    Args:
+        payload (dict): JSON-like payload, left unchanged
+        paths (iterable): Tuples of nested keys, e.g. ('State', 'Health', 'Log')
+
+    Returns:
+        dict: Copy of the payload, only copied along the removed paths
+    """
+    if not isinstance(payload, dict):
+        return payload
+    result = dict(payload)
+    for path in paths:
+        parent = result
+        for key in path[:-1]:
+            child = parent.get(key)
+            if not isinstance(child, dict):
+                break
+            parent[key] = child = dict(child)
+            parent = child
+        else:
+            parent.pop(path[-1], None)
+    return result
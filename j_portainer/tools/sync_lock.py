@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Keys of the Postgres advisory locks guarding synchronizations
+
+A sync takes transaction-level advisory locks (``pg_try_advisory_xact_lock``)
+on its server, or on the resource type and environment it syncs. An
+overlapping run trying to take a held lock skips that work instead of
+duplicating it; the locks are released when the transaction ends.
+"""
+
+import hashlib
+
+LOCK_NAMESPACE = 'j_portainer.sync'
+
+
+def sync_lock_key(*parts):
+    """Return the advisory lock key of a sync scope
+
+    Args:
+        *parts: Server ID, then optionally the resource type and environment ID
+
+    Returns:
+        int: Signed 64-bit key for pg_try_advisory_xact_lock
+    """
+    raw = ':'.join([LOCK_NAMESPACE] + ['' if part is None else str(part) for part in parts])
+    digest = hashlib.sha256(raw.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big', signed=True)
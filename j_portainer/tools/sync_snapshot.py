@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Per-run snapshot of the Docker resources of Portainer environments
+
+A sync run fetches the container, image, volume and network list of each
+environment at most once and shares it between all ``sync_*`` methods. The
+snapshot also builds the lookup indexes needed to decide whether an image,
+volume or network is in use, so those checks no longer need one container
+listing per object.
+"""
+
+import logging
+
+from .circuit_breaker import SLOW_REQUEST_TIMEOUT
+from .concurrent_fetch import FetchRequest
+
+_logger = logging.getLogger(__name__)
+
+LIST_ENDPOINTS = {
+    'containers': ('/api/endpoints/{endpoint_id}/docker/containers/json', {'all': True}),
+    'images': ('/api/endpoints/{endpoint_id}/docker/images/json', None),
+    'volumes': ('/api/endpoints/{endpoint_id}/docker/volumes', None),
+    'networks': ('/api/endpoints/{endpoint_id}/docker/networks', None),
+}
+
+
+def _normalize_image_id(image_id):
+    """Strip the digest algorithm prefix from a Docker image ID"""
+    if not image_id:
+        return ''
+    return image_id.split(':', 1)[1] if image_id.startswith('sha256:') else image_id
+
+
+class EnvironmentSnapshot(object):
+    """Resource lists of one environment plus lookup indexes built from them"""
+
+    def __init__(self, endpoint_id):
+        self.endpoint_id = endpoint_id
+        self.lists = {}
+        self.errors = {}
+        self._indexes = {}
+
+    def set_list(self, kind, data):
+        self.lists[kind] = data
+        self.errors.pop(kind, None)
+        self._indexes.clear()
+
+    def set_error(self, kind, error):
+        self.lists[kind] = None
+        self.errors[kind] = error
+        self._indexes.clear()
+
+    @property
+    def containers(self):
+        return self.lists.get('containers')
+
+    @property
+    def images(self):
+        return self.lists.get('images')
+
+    @property
+    def volumes(self):
+        return self.lists.get('volumes')
+
+    @property
+    def networks(self):
+        return self.lists.get('networks')
+
+    def _index(self, name, builder):
+        if name not in self._indexes:
+            self._indexes[name] = builder()
+        return self._indexes[name]
+
+    def _build_image_index(self):
+        index = {}
+        for container in self.containers or []:
+            index.setdefault(_normalize_image_id(container.get('ImageID', '')), []).append(container)
+        return index
+
+    def _build_mount_indexes(self):
+        by_name = {}
+        by_source = {}
+        for container in self.containers or []:
+            for mount in container.get('Mounts') or []:
+                if mount.get('Type') == 'volume' and mount.get('Name'):
+                    by_name.setdefault(mount['Name'], []).append((container, mount))
+                elif mount.get('Type') == 'bind' and mount.get('Source'):
+                    by_source.setdefault(mount['Source'], []).append((container, mount))
+        return by_name, by_source
+
+    def _build_network_index(self):
+        index = {}
+        for container in self.containers or []:
+            networks = (container.get('NetworkSettings') or {}).get('Networks') or {}
+            for endpoint in networks.values():
+                if endpoint and endpoint.get('NetworkID'):
+                    index.setdefault(endpoint['NetworkID'], []).append((container, endpoint))
+        return index
+
+    def containers_for_image(self, image_id):
+        """Return the containers created from an image
+
+        Docker may report short IDs on containers, so a prefix match is used
+        when no container references the full image ID.
+        """
+        index = self._index('image', self._build_image_index)
+        key = _normalize_image_id(image_id)
+        if not key:
+            return []
+        if key in index:
+            return index[key]
+        return [container
+                for container_image_id, containers in index.items()
+                if container_image_id and (container_image_id.startswith(key) or key.startswith(container_image_id))
+                for container in containers]
+
+    def mounts_for_volume(self, volume_name, mountpoint=None):
+        """Return (container, mount) pairs using a named volume or its mountpoint"""
+        by_name, by_source = self._index('mounts', self._build_mount_indexes)
+        mounts = list(by_name.get(volume_name, []))
+        if mountpoint:
+            mounts.extend(by_source.get(mountpoint, []))
+        return mounts
+
+    def endpoints_for_network(self, network_id):
+        """Return (container, endpoint settings) pairs attached to a network"""
+        return self._index('network', self._build_network_index).get(network_id, [])
+
+
+class SyncSnapshot(object):
+    """Resource lists of all environments of a server for one sync run"""
+
+    def __init__(self, server):
+        self.server = server
+        self._environments = {}
+
+    def get(self, environment):
+        """Return the EnvironmentSnapshot of a j_portainer.environment record"""
+        if environment.id not in self._environments:
+            self._environments[environment.id] = EnvironmentSnapshot(environment.environment_id)
+        return self._environments[environment.id]
+
+    def load(self, environments, kinds):
+        """Fetch the missing resource lists of the given environments
+
+        Lists already present in the snapshot are not fetched again. Missing
+        lists are fetched concurrently using the environment workers of the
+        server.
+
+        Args:
+            environments (recordset): j_portainer.environment records
+            kinds (list): Resource kinds ('containers', 'images', 'volumes', 'networks')
+        """
+        requests_list = []
+        for env in environments:
+            env_snapshot = self.get(env)
+            for kind in kinds:
+                if kind in env_snapshot.lists:
+                    continue
+                endpoint, params = LIST_ENDPOINTS[kind]
+                requests_list.append(FetchRequest(
+                    (env.id, kind), endpoint.format(endpoint_id=env.environment_id), params))
+
+        if not requests_list:
+            return
+
+        # Full lists can be large, they are not held to the adaptive timeout
+        results = self.server._fetch_many(requests_list, max_workers=self.server.sync_environment_workers,
+                                          timeout=SLOW_REQUEST_TIMEOUT)
+        for (env_id, kind), result in results.items():
+            env_snapshot = self._environments[env_id]
+            if result.status_code != 200:
+                env_snapshot.set_error(kind, result.text or result.error or f"HTTP {result.status_code}")
+                continue
+
+            data = result.data
+            if kind == 'volumes':
+                data = (data or {}).get('Volumes') if isinstance(data, dict) else data
+            env_snapshot.set_list(kind, data or [])
+
+    def invalidate(self, environment=None, kind=None):
+        """Drop cached lists so they are fetched again on the next load"""
+        snapshots = [self.get(environment)] if environment else list(self._environments.values())
+        for env_snapshot in snapshots:
+            if kind:
+                env_snapshot.lists.pop(kind, None)
+                env_snapshot.errors.pop(kind, None)
+            else:
+                env_snapshot.lists.clear()
+                env_snapshot.errors.clear()
+            env_snapshot._indexes.clear()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Disk usage probing of container mount points
+
+All mount points of a container are measured by a single exec running a
+small shell script. It uses ``du -sb`` (exact apparent size in bytes) when
+supported, and falls back to ``du -sk`` for BusyBox based images. The first
+line of the output gives the unit of the following ``<size>\\t<path>`` lines.
+"""
+
+# Default minimum time between two automatic size checks of a volume, in minutes
+DEFAULT_SIZE_CHECK_INTERVAL = 60
+
+USAGE_SCRIPT = (
+    'if du -sb /dev/null >/dev/null 2>&1; '
+    'then echo "unit 1"; du -sb -- "$@"; '
+    'else echo "unit 1024"; du -sk -- "$@"; fi'
+)
+
+SIZE_UNITS = ['K', 'M', 'G', 'T', 'P']
+
+
+def build_usage_command(paths):
+    """Return the exec command measuring the given paths
+
+    Args:
+        paths (iterable): Absolute paths inside the container
+
+    Returns:
+        list: Command arguments
+    """
+    return ['sh', '-c', USAGE_SCRIPT, 'sh'] + list(paths)
+
+
+def parse_usage_output(output):
+    """Parse the output of the usage command
+
+    Args:
+        output (str): Standard output of the exec
+
+    Returns:
+        dict: Size in bytes per path, None when the output has no unit line
+    """
+    unit = None
+    sizes = {}
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith('unit '):
+            unit = int(line[5:])
+            continue
+        size, _sep, path = line.partition('\t')
+        if not path:
+            size, _sep, path = line.partition(' ')
+        if unit and size.isdigit() and path:
+            sizes[path.strip()] = int(size) * unit
+    return sizes if unit else None
+
+
+def format_size(num_bytes):
+    """Format a byte count the way ``du -h`` does (e.g. 512, 4.0K, 40M, 1.2G)"""
+    if num_bytes is None:
+        return ''
+    size = float(num_bytes)
+    if size < 1024:
+        return f"{int(size)}"
+    for unit in SIZE_UNITS:
+        size /= 1024.0
+        if size < 1024 or unit == SIZE_UNITS[-1]:
+            return f"{size:.1f}{unit}" if size < 10 else f"{size:.0f}{unit}"
+
+
+def format_total_size(num_bytes):
+    """Format a total usage with two decimals (e.g. 0B, 512B, 4.00K, 1.25G)"""
+    if not num_bytes:
+        return "0B"
+    if num_bytes < 1024:
+        return f"{num_bytes:.0f}B"
+    size = float(num_bytes)
+    for unit in SIZE_UNITS[:4]:
+        size /= 1024.0
+        if size < 1024 or unit == SIZE_UNITS[3]:
+            return f"{size:.2f}{unit}"
@@ -5,6 +5,8 @@ from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 import logging
 
+from ..models.portainer_api_log import API_LOG_MODES
+
 _logger = logging.getLogger(__name__)
 
 class APILogConfigWizard(models.TransientModel):
@@ -18,6 +20,32 @@ class APILogConfigWizard(models.TransientModel):
         help="Number of days to keep API logs. Logs older than this will be automatically deleted by the scheduled action."
     )
     
+    mode = fields.Selection(
+        API_LOG_MODES,
+        string='Logging Mode',
+        default='full',
+        required=True,
+        help="Which API requests are logged. Failed requests are logged in every mode except Disabled."
+    )
+    
+    sample_rate = fields.Float(
+        string='Sample Rate',
+        default=0.1,
+        help="Fraction of successful requests logged in sampled mode (0.0 to 1.0)"
+    )
+    
+    max_body_size = fields.Integer(
+        string='Maximum Body Size (bytes)',
+        default=65536,
+        help="Request and response bodies larger than this are truncated. Use 0 for no limit."
+    )
+    
+    compress_threshold = fields.Integer(
+        string='Compression Threshold (bytes)',
+        default=4096,
+        help="Bodies larger than this are stored compressed. Use 0 to disable compression."
+    )
+    
     @api.model
     def default_get(self, fields_list):
         """Get default values for the wizard"""
@@ -33,6 +61,14 @@ class APILogConfigWizard(models.TransientModel):
             days = 1
             
         res['days'] = days
+        
+        settings = self.env['j_portainer.api_log']._get_log_settings()
+        res.update({
+            'mode': settings['mode'],
+            'sample_rate': settings['sample_rate'],
+            'max_body_size': settings['max_body_size'],
+            'compress_threshold': settings['compress_threshold'],
+        })
         return res
     
     @api.constrains('days')
@@ -42,12 +78,30 @@ class APILogConfigWizard(models.TransientModel):
             if record.days < 1:
                 raise ValidationError(_("Retention period must be at least 1 day"))
     
+    @api.constrains('sample_rate', 'max_body_size', 'compress_threshold')
+    def _check_logging_settings(self):
+        """Ensure the logging settings are within range"""
+        for record in self:
+            if not 0.0 <= record.sample_rate <= 1.0:
+                raise ValidationError(_("Sample rate must be between 0.0 and 1.0"))
+            if record.max_body_size < 0 or record.compress_threshold < 0:
+                raise ValidationError(_("Body size limits cannot be negative"))
+    
+    def _save_params(self):
+        """Write the wizard values to system parameters"""
+        ICP = self.env['ir.config_parameter'].sudo()
+        ICP.set_param('j_portainer.api_log_delete_days', str(self.days))
+        ICP.set_param('j_portainer.api_log_mode', self.mode)
+        ICP.set_param('j_portainer.api_log_sample_rate', str(self.sample_rate))
+        ICP.set_param('j_portainer.api_log_max_body_size', str(self.max_body_size))
+        ICP.set_param('j_portainer.api_log_compress_threshold', str(self.compress_threshold))
+    
     def save_config(self):
         """Save configuration to system parameters"""
         self.ensure_one()
         
-        # Update system parameter
-        self.env['ir.config_parameter'].sudo().set_param('j_portainer.api_log_delete_days', str(self.days))
+        # Update system parameters
+        self._save_params()
         
         # Show success message
         return {
@@ -65,8 +119,8 @@ class APILogConfigWizard(models.TransientModel):
         """Run the delete operation immediately with the specified days"""
         self.ensure_one()
         
-        # Update system parameter first
-        self.env['ir.config_parameter'].sudo().set_param('j_portainer.api_log_delete_days', str(self.days))
+        # Update system parameters first
+        self._save_params()
         
         # Run the delete operation
         count = self.env['j_portainer.api_log'].purge_old_logs(days=self.days)
@@ -3,10 +3,12 @@
 
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
-import base64
+import json
 import logging
 from datetime import datetime
 
+from ..tools.backup_stream import COMPRESSIONS, compression_available
+
 _logger = logging.getLogger(__name__)
 
 class PortainerBackupWizard(models.TransientModel):
@@ -19,6 +21,8 @@ class PortainerBackupWizard(models.TransientModel):
                                  help="Password to encrypt the backup archive")
     confirm_password = fields.Char('Confirm Password', required=True,
                                   help="Confirm the backup password")
+    compression = fields.Selection(COMPRESSIONS, string='Compression', default='none', required=True,
+                                   help="Compress the backup archive while it is stored")
     
     @api.constrains('backup_password', 'confirm_password')
     def _check_passwords_match(self):
@@ -43,47 +47,40 @@ class PortainerBackupWizard(models.TransientModel):
                 'password': self.backup_password
             }
             
+            if not compression_available(self.compression):
+                raise UserError(_("The zstandard Python package is required for Zstandard compression."))
+            
             _logger.info(f"Creating backup for Portainer server: {self.server_id.name}")
             
-            # Make API request to create backup
-            response = self.server_id._make_api_request(
-                '/api/backup',
-                method='POST',
-                data=backup_payload
-            )
+            # Generate filename with timestamp
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"portainer_backup_{self.server_id.name}_{timestamp}.tar"
             
-            if response.status_code == 200:
-                # Get backup content
-                backup_content = response.content
-                
-                # Generate filename with timestamp
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"portainer_backup_{self.server_id.name}_{timestamp}.tar"
-                
-                # Encode backup content as base64 for Odoo attachment
-                backup_base64 = base64.b64encode(backup_content)
+            # Stream the backup archive straight to the filestore
+            with self.server_id._stream_api_request('/api/backup', method='POST', data=backup_payload,
+                                                    timeout=300) as response:
+                if response.status_code == 200:
+                    attachment, result = self.env['j_portainer.backup.history']._store_backup_stream(
+                        response, filename,
+                        compression=self.compression,
+                        res_model='j_portainer.server',
+                        res_id=self.server_id.id,
+                        description=f'Portainer backup created on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}',
+                    )
+                    
+                    _logger.info(f"Backup created successfully: {attachment.name} "
+                                 f"(Size: {result.size} bytes, SHA-256: {result.sha256})")
+                    
+                    # Return download action
+                    return {
+                        'type': 'ir.actions.act_url',
+                        'url': f'/web/content/{attachment.id}?download=true',
+                        'target': 'self',
+                    }
                 
-                # Create attachment record
-                attachment = self.env['ir.attachment'].create({
-                    'name': filename,
-                    'type': 'binary',
-                    'datas': backup_base64,
-                    'res_model': 'j_portainer.server',
-                    'res_id': self.server_id.id,
-                    'mimetype': 'application/x-tar',
-                    'description': f'Portainer backup created on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
-                })
-                
-                _logger.info(f"Backup created successfully: {filename} (Size: {len(backup_content)} bytes)")
-                
-                # Return download action
-                return {
-                    'type': 'ir.actions.act_url',
-                    'url': f'/web/content/{attachment.id}?download=true',
-                    'target': 'self',
-                }
-                
-            elif response.status_code == 400:
+                error_text = response.text
+            
+            if response.status_code == 400:
                 raise UserError(_("Invalid backup request. Please check your server configuration and try again."))
             elif response.status_code == 401:
                 raise UserError(_("Authentication failed. Please check your API credentials."))
@@ -92,10 +89,10 @@ class PortainerBackupWizard(models.TransientModel):
             else:
                 error_msg = f"HTTP {response.status_code}"
                 try:
-                    error_detail = response.json().get('message', response.text)
+                    error_detail = json.loads(error_text).get('message', error_text)
                     error_msg += f": {error_detail}"
                 except:
-                    error_msg += f": {response.text}"
+                    error_msg += f": {error_text}"
                 raise UserError(_("Backup failed: %s") % error_msg)
                 
         except Exception as e:
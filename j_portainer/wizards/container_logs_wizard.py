@@ -3,6 +3,7 @@
 
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
+import calendar
 import logging
 import re
 
@@ -17,10 +18,20 @@ class PortainerContainerLogsWizard(models.TransientModel):
     name = fields.Char(related='container_id.name', readonly=True)
     environment_id = fields.Many2one(related='container_id.environment_id', readonly=True)
     
-    lines = fields.Integer('Number of Lines', default=100, required=True, 
-                         help="Maximum number of log lines to retrieve. Use 0 for all logs (may be slow for large logs).")
+    lines = fields.Integer('Lines per Page', default=100, required=True,
+                         help="Number of log lines per page. Use 0 to only limit pages by size.")
+    since_date = fields.Datetime('From', help="Only show logs written after this date")
+    until_date = fields.Datetime('To', help="Only show logs written before this date")
+    show_stdout = fields.Boolean('Standard Output', default=True)
+    show_stderr = fields.Boolean('Standard Error', default=True)
     logs = fields.Text('Logs', readonly=True)
     
+    # Page boundaries used to load older and newer lines
+    older_cursor = fields.Char('Older Cursor', readonly=True)
+    newer_cursor = fields.Char('Newer Cursor', readonly=True)
+    truncated = fields.Boolean('Page Truncated', readonly=True,
+                               help="The page was cut to respect the maximum page size")
+    
     @api.model
     def default_get(self, fields_list):
         """Set default values for the wizard"""
@@ -31,28 +42,9 @@ class PortainerContainerLogsWizard(models.TransientModel):
             container = self.env['j_portainer.container'].browse(active_id)
             res['container_id'] = container.id
             
-            # Auto-fetch logs when wizard opens
+            # Auto-fetch the latest page when wizard opens
             try:
-                logs = self._fetch_logs(container, lines=100)
-                # Extra safety check for NUL characters
-                if logs and isinstance(logs, str):
-                    logs = logs.replace('\x00', '')
-                res['logs'] = logs
-            except ValueError as ve:
-                if "NUL" in str(ve):
-                    # Specific handling for NUL characters
-                    _logger.error(f"NUL character detected in logs: {str(ve)}")
-                    error_msg = _("""Error: Container logs contain NUL (0x00) characters that cannot be displayed.
-                    
-Suggestions:
-1. Try reducing the number of lines
-2. For binary logs, you may need to use the Portainer UI directly
-3. Check if the container outputs binary data instead of text logs
-""")
-                    res['logs'] = error_msg
-                else:
-                    _logger.error(f"ValueError processing logs: {str(ve)}")
-                    res['logs'] = f"Error processing logs: {str(ve)}"
+                res.update(self._fetch_page(container, lines=res.get('lines', 100)))
             except Exception as e:
                 _logger.error(f"Error fetching logs: {str(e)}")
                 res['logs'] = f"Error fetching logs: {str(e)}"
@@ -92,93 +84,68 @@ Suggestions:
             _logger.error(f"Error cleaning binary data: {str(e)}")
             return "Error: Unable to process binary log data"
     
-    def _fetch_logs(self, container, lines=100):
-        """Fetch logs from container
+    def _fetch_page(self, container, direction='tail', cursor=None, lines=100, since=None, until=None,
+                    stdout=True, stderr=True):
+        """Fetch one page of container logs
         
         Args:
             container: Container record
-            lines: Number of lines to fetch
+            direction (str): 'tail', 'older' or 'newer' (see j_portainer.api.container_logs_page)
+            cursor (str, optional): Cursor of the current page
+            lines (int): Number of lines of the page
+            since (datetime, optional): Start of the log window
+            until (datetime, optional): End of the log window
+            stdout (bool): Include standard output
+            stderr (bool): Include standard error
             
         Returns:
-            str: Container logs
+            dict: Wizard values of the page (logs, cursors, truncated flag)
         """
-        server = container.server_id
-        endpoint_id = container.environment_id.environment_id  # Get the actual numeric ID
-        container_id = container.container_id
+        result = self.env['j_portainer.api'].container_logs_page(
+            container.server_id.id,
+            container.environment_id.environment_id,  # Get the actual numeric ID
+            container.container_id,
+            lines=lines,
+            direction=direction,
+            cursor=cursor,
+            # Odoo datetimes are naive UTC
+            since=calendar.timegm(since.timetuple()) if since else None,
+            until=calendar.timegm(until.timetuple()) if until else None,
+            stdout=stdout,
+            stderr=stderr,
+        )
+        if result.get('error'):
+            raise UserError(_("Failed to get container logs: %s") % result['error'])
         
-        # Build params
-        params = {
-            'tail': str(lines) if lines > 0 else 'all',
-            'timestamps': True,
-            'since': 0,
-            'follow': False,
-            'stdout': True,
-            'stderr': True
+        return {
+            'logs': self._clean_binary_data(result['text']),
+            'older_cursor': result['older_cursor'],
+            'newer_cursor': result['newer_cursor'],
+            'truncated': result['truncated'],
         }
-        
-        # Make API request
-        endpoint = f'/api/endpoints/{endpoint_id}/docker/containers/{container_id}/logs'
-        response = server._make_api_request(endpoint, 'GET', params=params)
-        
-        if response.status_code != 200:
-            raise UserError(_("Failed to get container logs: %s") % response.text)
-            
-        # Process the logs to remove problematic characters
-        try:
-            # Check if we have a binary response (can happen with some Docker logs)
-            if hasattr(response, 'content') and isinstance(response.content, bytes):
-                logs = self._clean_binary_data(response.content)
-            else:
-                logs = self._clean_binary_data(response.text)
-                
-        except Exception as e:
-            _logger.error(f"Error processing logs: {str(e)}")
-            # If there's any error processing the text, return a safe version
-            logs = "Error processing container logs, received logs contain invalid characters."
-            
-        return logs
     
-    def refresh_logs(self):
-        """Refresh logs"""
+    def _load_page(self, direction='tail'):
+        """Replace the displayed logs by another page"""
         self.ensure_one()
+        if not (self.show_stdout or self.show_stderr):
+            raise UserError(_("Please select standard output, standard error or both"))
         
+        cursor = {'older': self.older_cursor, 'newer': self.newer_cursor}.get(direction)
         try:
-            logs = self._fetch_logs(self.container_id, lines=self.lines)
-            
-            # Multiple safety checks before writing to database
-            if logs and isinstance(logs, str):
-                # Remove any remaining NUL characters at every level
-                logs = logs.replace('\x00', '')
-                
-                # Check again - if there are still NUL characters somehow,
-                # handle it with a more explicit approach
-                if '\x00' in logs:
-                    _logger.warning("NUL characters still detected after cleaning, using stronger replacement")
-                    logs = ''.join(char for char in logs if char != '\x00')
-            
-            self.write({'logs': logs})
-        except ValueError as ve:
-            if "NUL" in str(ve):
-                # Specific handling for NUL characters
-                _logger.error(f"NUL character detected in logs: {str(ve)}")
-                error_msg = _("""Error: Container logs contain NUL (0x00) characters that cannot be displayed.
-                
-Suggestions:
-1. Try reducing the number of lines (current: %s)
-2. For binary logs, you may need to use the Portainer UI directly
-3. Check if the container outputs binary data instead of text logs
-""") % self.lines
-                self.write({'logs': error_msg})
-            else:
-                # Other ValueError handling
-                _logger.error(f"ValueError processing logs: {str(ve)}")
-                error_msg = _("Error processing logs: %s") % str(ve)
-                self.write({'logs': error_msg})
+            values = self._fetch_page(
+                self.container_id, direction=direction, cursor=cursor, lines=self.lines,
+                since=self.since_date, until=self.until_date,
+                stdout=self.show_stdout, stderr=self.show_stderr,
+            )
+            if direction != 'tail' and not values['logs']:
+                # Nothing before or after the current page, keep it
+                values = {'truncated': False}
+            self.write(values)
         except Exception as e:
             # General exception handling
             _logger.error(f"Error fetching logs: {str(e)}")
             error_msg = _("Error fetching logs: %s") % str(e)
-            self.write({'logs': error_msg})
+            self.write({'logs': error_msg, 'older_cursor': False, 'newer_cursor': False})
             
         return {
             'type': 'ir.actions.act_window',
@@ -186,4 +153,48 @@ Suggestions:
             'view_mode': 'form',
             'res_id': self.id,
             'target': 'new',
-        }
\ No newline at end of file
+        }
+    
+    def refresh_logs(self):
+        """Show the latest page of the log window"""
+        return self._load_page('tail')
+    
+    def action_older_logs(self):
+        """Show the page before the current one"""
+        return self._load_page('older')
+    
+    def action_newer_logs(self):
+        """Show the page after the current one"""
+        return self._load_page('newer')
+    
+    def follow_logs(self):
+        """Fetch the lines written since the current page and push them to the browser
+        
+        Called periodically by the log viewer while follow mode is enabled. New
+        lines are sent on the bus to the current user; the stored logs keep at
+        most one page worth of bytes.
+        
+        Returns:
+            bool: True if new lines were found
+        """
+        self.ensure_one()
+        if not self.newer_cursor:
+            return False
+        values = self._fetch_page(
+            self.container_id, direction='newer', cursor=self.newer_cursor, lines=0,
+            until=self.until_date, stdout=self.show_stdout, stderr=self.show_stderr,
+        )
+        if not values['logs']:
+            return False
+        
+        max_bytes = self.env['j_portainer.api']._get_log_page_max_bytes()
+        logs = f"{self.logs}\n{values['logs']}" if self.logs else values['logs']
+        if max_bytes and len(logs) > max_bytes:
+            logs = logs[-max_bytes:].split('\n', 1)[-1]
+        self.write({'logs': logs, 'newer_cursor': values['newer_cursor']})
+        
+        self.env['bus.bus']._sendone(self.env.user.partner_id, 'j_portainer.container_logs', {
+            'wizard_id': self.id,
+            'text': values['logs'],
+        })
+        return True
@@ -65,6 +65,45 @@ class PortainerSyncWizard(models.TransientModel):
         else:
             self.sync_log = message
             
+    def _get_sync_steps(self):
+        """Return the steps of the server sync job graph selected in the wizard"""
+        steps = []
+        if not self.environment_specific:
+            if self.sync_environments:
+                steps.append('environments')
+            if self.sync_templates:
+                steps.append('templates')
+            else:
+                if self.sync_standard_templates:
+                    steps.append('standard_templates')
+                if self.sync_custom_templates:
+                    steps.append('custom_templates')
+        for step in ('containers', 'images', 'volumes', 'networks', 'stacks'):
+            if self[f'sync_{step}']:
+                steps.append(step)
+        return steps
+    
+    def _action_enqueue_sync(self, env_id):
+        """Enqueue the selected synchronization as background jobs"""
+        steps = self._get_sync_steps()
+        if not steps:
+            raise UserError(_("Please select at least one resource type to synchronize"))
+        
+        full_sync = self.sync_all and not self.environment_specific
+        result = self.server_id._enqueue_sync_graph(steps=None if full_sync else steps, environment_id=env_id)
+        self.write({
+            'state': 'done',
+            'sync_log': f"{self.sync_log}\n\n{result['params']['message']}"
+        })
+        
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'j_portainer.sync.wizard',
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+    
     def action_sync(self):
         """Start synchronization"""
         self.ensure_one()
@@ -83,6 +122,11 @@ class PortainerSyncWizard(models.TransientModel):
         server = self.server_id
         env_id = self.environment_id.environment_id if self.environment_specific else None
         
+        if server._use_job_graph():
+            return self._action_enqueue_sync(env_id)
+        
+        snapshot = server._new_sync_snapshot()
+        
         try:
             # First, test connection to make sure the server is accessible
             self._append_log(_('Testing connection to server...'))
@@ -128,7 +172,7 @@ class PortainerSyncWizard(models.TransientModel):
             # Sync containers if requested
             if self.sync_containers:
                 self._append_log(_('Synchronizing containers...'))
-                result = server.sync_containers(env_id)
+                result = server.sync_containers(env_id, snapshot=snapshot)
                 if 'params' in result and 'message' in result['params']:
                     self._append_log(result['params']['message'])
                 else:
@@ -137,7 +181,7 @@ class PortainerSyncWizard(models.TransientModel):
             # Sync images if requested
             if self.sync_images:
                 self._append_log(_('Synchronizing images...'))
-                result = server.sync_images(env_id)
+                result = server.sync_images(env_id, snapshot=snapshot)
                 if 'params' in result and 'message' in result['params']:
                     self._append_log(result['params']['message'])
                 else:
@@ -146,7 +190,7 @@ class PortainerSyncWizard(models.TransientModel):
             # Sync volumes if requested
             if self.sync_volumes:
                 self._append_log(_('Synchronizing volumes...'))
-                result = server.sync_volumes(env_id)
+                result = server.sync_volumes(env_id, snapshot=snapshot)
                 if 'params' in result and 'message' in result['params']:
                     self._append_log(result['params']['message'])
                 else:
@@ -155,7 +199,7 @@ class PortainerSyncWizard(models.TransientModel):
             # Sync networks if requested
             if self.sync_networks:
                 self._append_log(_('Synchronizing networks...'))
-                result = server.sync_networks(env_id)
+                result = server.sync_networks(env_id, snapshot=snapshot)
                 if 'params' in result and 'message' in result['params']:
                     self._append_log(result['params']['message'])
                 else:
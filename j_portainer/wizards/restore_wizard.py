@@ -3,9 +3,16 @@
 
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
-import base64
+import contextlib
+import io
 import logging
 import requests
+import tempfile
+import time
+
+from ..tools.backup_stream import (
+    COMPRESSION_FORMATS, MultipartFileStream, compression_available, decompress_stream, file_sha256,
+)
 
 _logger = logging.getLogger(__name__)
 
@@ -15,7 +22,15 @@ class PortainerRestoreWizard(models.TransientModel):
 
     server_id = fields.Many2one('j_portainer.server', string='Server', required=True,
                                default=lambda self: self.env.context.get('active_id'))
-    backup_file = fields.Binary('Backup File', required=True,
+    source = fields.Selection([
+        ('history', 'Stored Backup'),
+        ('upload', 'Upload File'),
+    ], string='Restore From', default='history', required=True)
+    backup_history_id = fields.Many2one('j_portainer.backup.history', string='Stored Backup',
+                                        domain="[('server_id', '=', server_id), ('status', '=', 'success'), "
+                                               "('backup_file', '!=', False)]",
+                                        help="Backup of this server stored in Odoo")
+    backup_file = fields.Binary('Backup File', attachment=True,
                                help="Select the Portainer backup archive (.tar file)")
     backup_filename = fields.Char('File Name')
     restore_password = fields.Char('Restore Password', required=True,
@@ -35,6 +50,73 @@ class PortainerRestoreWizard(models.TransientModel):
                     }
                 }
     
+    def _open_attachment(self, attachment):
+        """Open the content of an attachment as a binary file
+        
+        Filestore attachments are read from disk; attachments stored in the
+        database are loaded in memory.
+        """
+        attachment = attachment.sudo()
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw or b'')
+    
+    @contextlib.contextmanager
+    def _open_backup_source(self):
+        """Open the backup archive to restore
+        
+        The checksum recorded when a stored backup was created is verified
+        before anything is sent. Compressed backups are decompressed to a
+        temporary file, never in memory.
+        
+        Yields:
+            tuple: (binary file positioned at its start, size in bytes, file name)
+        """
+        if self.source == 'history':
+            history = self.backup_history_id
+            attachment = history.backup_file
+            compression = history.compression or 'none'
+            checksum = history.checksum_sha256
+            filename = attachment.name or 'backup.tar'
+            extension = COMPRESSION_FORMATS.get(compression, COMPRESSION_FORMATS['none'])[0]
+            if extension and filename.endswith(extension):
+                filename = filename[:-len(extension)]
+        else:
+            attachment = self.env['ir.attachment'].sudo().search([
+                ('res_model', '=', self._name),
+                ('res_field', '=', 'backup_file'),
+                ('res_id', '=', self.id),
+            ], limit=1)
+            compression = 'none'
+            checksum = None
+            filename = self.backup_filename or 'backup.tar'
+        
+        if not attachment:
+            raise UserError(_("The backup file could not be found"))
+        if not compression_available(compression):
+            raise UserError(_("The zstandard Python package is required to restore Zstandard compressed backups."))
+        
+        with self._open_attachment(attachment) as fileobj:
+            if checksum:
+                actual_checksum = file_sha256(fileobj)
+                if actual_checksum != checksum:
+                    raise UserError(_("The backup file is corrupted: its SHA-256 checksum %s does not match the "
+                                      "checksum %s recorded when the backup was created.") % (actual_checksum, checksum))
+                _logger.info(f"Verified SHA-256 checksum of backup {filename}")
+            
+            if compression == 'none':
+                fileobj.seek(0, io.SEEK_END)
+                size = fileobj.tell()
+                fileobj.seek(0)
+                yield fileobj, size, filename
+                return
+            
+            fileobj.seek(0)
+            with tempfile.TemporaryFile() as archive:
+                size = decompress_stream(fileobj, archive, compression)
+                archive.seek(0)
+                yield archive, size, filename
+    
     def action_restore_backup(self):
         """Restore Portainer from backup file"""
         self.ensure_one()
@@ -42,7 +124,10 @@ class PortainerRestoreWizard(models.TransientModel):
         if not self.server_id:
             raise UserError(_("No server selected for restore"))
             
-        if not self.backup_file:
+        if self.source == 'history' and not self.backup_history_id:
+            raise UserError(_("Please select a stored backup"))
+            
+        if self.source == 'upload' and not self.backup_file:
             raise UserError(_("Backup file is required"))
             
         if not self.restore_password:
@@ -54,37 +139,42 @@ class PortainerRestoreWizard(models.TransientModel):
         try:
             _logger.info(f"Starting restore for Portainer server: {self.server_id.name}")
             
-            # Decode backup file from base64
-            backup_content = base64.b64decode(self.backup_file)
-            
-            # Prepare multipart form data for restore
-            files = {
-                'file': (self.backup_filename or 'backup.tar', backup_content, 'application/x-tar')
-            }
-            
-            data = {
-                'password': self.restore_password
-            }
-            
             # Make API request to restore backup
-            # Note: Using requests directly for multipart file upload
+            # Note: Using the pooled session directly for multipart file upload
             url = f"{self.server_id.url.rstrip('/')}/api/restore"
-            headers = {
-                'X-API-Key': self.server_id.api_key
-            }
-            
-            _logger.info(f"Uploading backup file for restore: {self.backup_filename} ({len(backup_content)} bytes)")
             
-            response = requests.post(
-                url,
-                files=files,
-                data=data,
-                headers=headers,
-                timeout=300  # 5 minutes timeout for restore operation
-            )
+            with self._open_backup_source() as (fileobj, size, filename):
+                _logger.info(f"Uploading backup file for restore: {filename} ({size} bytes)")
+                
+                start_time = time.monotonic()
+                progress = {'logged': 0}
+                
+                def log_progress(sent, total):
+                    # Log every 10% of the upload
+                    percent = int(sent * 100 / total) if total else 100
+                    if percent >= progress['logged'] + 10 or sent == total:
+                        progress['logged'] = percent
+                        _logger.info(f"Restore upload to {self.server_id.name}: {percent}% ({sent}/{total} bytes)")
+                
+                body = MultipartFileStream(
+                    {'password': self.restore_password}, 'file', filename, fileobj, size,
+                    content_type='application/x-tar', progress_callback=log_progress,
+                )
+                headers = {
+                    'X-API-Key': self.server_id._get_api_key_header(),
+                    'Content-Type': body.content_type,
+                }
+                response = self.server_id._get_http_session().post(
+                    url,
+                    data=body,
+                    headers=headers,
+                    timeout=300  # 5 minutes timeout for restore operation
+                )
+                duration = time.monotonic() - start_time
             
             if response.status_code == 200:
-                _logger.info(f"Restore completed successfully for server: {self.server_id.name}")
+                _logger.info(f"Restore completed successfully for server: {self.server_id.name} "
+                             f"({size} bytes uploaded in {duration:.1f} s)")
                 
                 # Clear any cached data in Odoo since Portainer data has changed
                 self._clear_server_cache()
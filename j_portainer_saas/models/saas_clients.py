@@ -6,6 +6,8 @@ from odoo.exceptions import UserError, ValidationError
 import logging
 import re
 
+from odoo.addons.j_portainer.tools.volume_usage import format_total_size
+
 _logger = logging.getLogger(__name__)
 
 
@@ -191,6 +193,12 @@ class SaasClient(models.Model):
         help='Number of volumes created for this client'
     )
     
+    sc_volume_size = fields.Char(
+        string='Volume Usage',
+        compute='_compute_volume_usage',
+        help='Measured disk usage of the volumes of the client stack'
+    )
+    
     sc_network_count = fields.Integer(
         string='Network Count',
         compute='_compute_deployment_stats',
@@ -536,6 +544,13 @@ class SaasClient(models.Model):
                 record.sc_volume_count = 0
                 record.sc_network_count = 0
     
+    @api.depends('sc_stack_id', 'sc_stack_id.total_volume_bytes')
+    def _compute_volume_usage(self):
+        """Compute the volume usage of the client stacks with a single aggregated query."""
+        totals = self.env['j_portainer.container.volume'].sudo()._get_usage_totals('stack', self.sc_stack_id.ids)
+        for record in self:
+            record.sc_volume_size = format_total_size(totals.get(record.sc_stack_id.id, (0, 0))[1])
+    
     @api.depends('sc_subscription_id', 'sc_subscription_id.invoice_ids')
     def _compute_invoice_count(self):
         """Compute the number of invoices related to this client's subscription."""